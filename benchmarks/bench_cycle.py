@@ -0,0 +1,178 @@
+"""
+Benchmarks the polling cycle against local stub exchanges.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cycle --symbols 50 --exchanges 8 --latency 20 --jitter 10 --error-rate 0.01
+"""
+import sys, json, time, argparse, threading, tracemalloc, configparser
+from config import read_config
+from core import EXCHANGES, metrics
+from main import arbitrage_main
+from benchmarks.stub_exchange import start_stub_exchanges
+
+def bench_config(stubs, symbols, interval, bulk, engine, shards=1):
+    """
+    Builds a config that points every enabled exchange at its stub and turns off storage,
+    notifications, rate limits and the metrics endpoint, so only the cycle itself is measured.
+    """
+    # read_config returns the shared parsed config, so the benchmark edits its own copy.
+    config = configparser.ConfigParser()
+    config.read_dict(read_config())
+    for section in ("Exchange Details", "Bulk Endpoints"):
+        if config.has_section(section):
+            config.remove_section(section)
+        config.add_section(section)
+    for exchange in EXCHANGES:
+        stub = stubs.get(exchange)
+        config.set("Exchange Details", exchange, stub.ticker_url if stub else "")
+        config.set("Exchange Details", exchange + "_Status", "1" if stub else "0")
+        if stub and stub.bulk_url:
+            config.set("Bulk Endpoints", exchange, stub.bulk_url)
+    if config.has_section("Rate Limits"):
+        config.remove_section("Rate Limits")
+    settings = {
+        "SYMBOLS": ",".join(symbols),
+        "ARBITRAGE_THRESHOLD": ",".join("0.5" for _ in symbols),
+        "SYMBOL_INTERVALS": ",".join(f"{symbol}:{interval}" for symbol in symbols),
+        "FETCH_MODE": "rest",
+        "SPREAD_ENGINE": engine,
+        "SHARDS": str(shards),
+        "BULK_FETCH": "1" if bulk else "0",
+        "PRICES_SAVE": "0",
+        "ARBITRAGE_SAVE": "0",
+        "ARBITRAGE_SUCCESS_SAVE": "0",
+    }
+    for option, value in settings.items():
+        config.set("Arbitrage Settings", option, value)
+    config.set("Telegram", "NOTIFICATION_STATUS", "0")
+    config.set("Discord", "NOTIFICATION_STATUS", "0")
+    if not config.has_section("Metrics"):
+        config.add_section("Metrics")
+    config.set("Metrics", "ENABLED", "0")
+    config.set("Metrics", "SUMMARY_INTERVAL", "0")
+    return config
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_benchmark(symbols=20, exchanges=8, cycles=50, warmup=3, latency=0.02, jitter=0.005, error_rate=0.0,
+                  interval=0.001, bulk=False, engine="incremental", timeout=300.0, trace_memory=False, shards=1):
+    """
+    Drives arbitrage_main.arbitrage_check for symbols x exchanges against stub exchanges. With shards above 1
+    the sharded mode is driven instead, and every shard's cycle counts as one cycle.
+
+    Returns:
+        dict: cycles/s, p50/p99 cycle latency, requests per cycle and memory over the measured cycles.
+    """
+    symbol_names = [f"SYM{n}-USDT" for n in range(symbols)]
+    stubs = start_stub_exchanges(EXCHANGES[:exchanges], symbol_names, latency, jitter, error_rate)
+    main = arbitrage_main(bench_config(stubs, symbol_names, interval, bulk, engine, shards))
+    if trace_memory:
+        tracemalloc.start()
+
+    latencies = []
+    marks = {}
+    done = threading.Event()
+    cycle_histogram = metrics.histogram("arbitrage_cycle_seconds")
+    observe = cycle_histogram.observe
+
+    def mark():
+        return time.perf_counter(), sum(stub.requests for stub in stubs.values())
+
+    def record(value, **labels):
+        observe(value, **labels)
+        latencies.append(value)
+        if len(latencies) == warmup:
+            marks["start"] = mark()
+        elif len(latencies) == warmup + cycles:
+            marks["end"] = mark()
+            main.thread_start = False
+            done.set()
+
+    if warmup <= 0:
+        marks["start"] = mark()
+    cycle_histogram.observe = record
+    main.thread_start = True
+    thread = threading.Thread(target=main.run, daemon=True)
+    try:
+        thread.start()
+        done.wait(timeout)
+        main.thread_start = False
+        thread.join()
+    finally:
+        cycle_histogram.observe = observe
+        main.writer.close()
+        main.dispatcher.close()
+        main.metrics_server.stop()
+        for stub in stubs.values():
+            stub.stop()
+
+    measured = latencies[max(warmup, 0):warmup + cycles]
+    end_time, end_requests = marks.get("end") or mark()
+    start_time, start_requests = marks.get("start", (end_time, end_requests))
+    elapsed = end_time - start_time
+    report = {
+        "symbols": symbols,
+        "exchanges": min(exchanges, len(EXCHANGES)),
+        "bulk": bulk,
+        "engine": engine,
+        "shards": shards,
+        "cycles": len(measured),
+        "cycles_per_sec": len(measured) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(measured, 0.50) * 1000,
+        "p99_ms": percentile(measured, 0.99) * 1000,
+        "requests_per_cycle": (end_requests - start_requests) / len(measured) if measured else 0.0,
+        "stub_errors": sum(stub.errors for stub in stubs.values()),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if trace_memory:
+        report["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the polling cycle against local stub exchanges.")
+    parser.add_argument("--symbols", type=int, default=20, help="number of symbols (N)")
+    parser.add_argument("--exchanges", type=int, default=len(EXCHANGES), help=f"number of exchanges (M, at most {len(EXCHANGES)})")
+    parser.add_argument("--cycles", type=int, default=50, help="measured cycles")
+    parser.add_argument("--warmup", type=int, default=3, help="cycles run before measuring")
+    parser.add_argument("--latency", type=float, default=20, help="mean stub latency in ms")
+    parser.add_argument("--jitter", type=float, default=5, help="stub latency jitter in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub requests failing with HTTP 500")
+    parser.add_argument("--interval", type=float, default=0.001, help="polling interval per symbol in seconds")
+    parser.add_argument("--bulk", action="store_true", help="use the bulk ticker endpoints")
+    parser.add_argument("--engine", choices=["incremental", "matrix"], default="incremental", help="spread engine")
+    parser.add_argument("--shards", type=int, default=1, help="worker processes; cycles are counted per shard")
+    parser.add_argument("--timeout", type=float, default=300, help="give up after this many seconds")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the traced Python heap peak (slower)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.symbols, args.exchanges, args.cycles, args.warmup, args.latency / 1000, args.jitter / 1000,
+                           args.error_rate, args.interval, args.bulk, args.engine, args.timeout, args.tracemalloc, args.shards)
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"\n{report['symbols']} symbols x {report['exchanges']} exchanges ({'bulk' if report['bulk'] else 'per-symbol'}, {report['engine']} engine, {report['shards']} shard(s))")
+    print(f"  cycles            : {report['cycles']}")
+    print(f"  cycles/sec        : {report['cycles_per_sec']:.2f}")
+    print(f"  cycle p50 / p99   : {report['p50_ms']:.1f} ms / {report['p99_ms']:.1f} ms")
+    print(f"  requests/cycle    : {report['requests_per_cycle']:.1f}")
+    print(f"  stub errors       : {report['stub_errors']}")
+    if report["peak_rss_mb"] is not None:
+        print(f"  peak RSS          : {report['peak_rss_mb']:.1f} MB")
+    if "traced_peak_mb" in report:
+        print(f"  traced heap peak  : {report['traced_peak_mb']:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import json, time, random, threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from core import format_symbol
+
+# Exchanges whose all-symbol endpoint is parsed by parse_bulk_prices.
+BULK_EXCHANGES = ["Binance", "Mexc", "KuCoin", "OKX", "Gate.io", "Bitget"]
+
+def ticker_body(exchange, symbol, bid, ask):
+    """
+    Builds a single-symbol ticker response in the exchange's own shape, as parsed by parse_quote.
+    """
+    if exchange in ["Binance", "Mexc"]:
+        return {"symbol": symbol, "bidPrice": bid, "askPrice": ask}
+    elif exchange == "KuCoin":
+        return {"code": "200000", "data": {"bestBid": bid, "bestAsk": ask}}
+    elif exchange == "Coinbase":
+        return {"bid": bid, "ask": ask}
+    elif exchange == "OKX":
+        return {"code": "0", "data": [{"instId": symbol, "bidPx": bid, "askPx": ask}]}
+    elif exchange == "Gate.io":
+        return [{"currency_pair": symbol, "highest_bid": bid, "lowest_ask": ask}]
+    elif exchange == "BingX":
+        return {"code": 0, "data": {"book_ticker": {"symbol": symbol, "bid_price": bid, "ask_price": ask}}}
+    elif exchange == "Bitget":
+        return {"code": "00000", "data": [{"symbol": symbol, "bidPr": bid, "askPr": ask}]}
+    raise KeyError(f"No ticker shape for {exchange}")
+
+def bulk_body(exchange, quotes):
+    """
+    Builds an all-symbol ticker response in the exchange's own shape, as parsed by parse_bulk_prices.
+
+    Args:
+        exchange (str): The exchange to imitate.
+        quotes (list): (symbol, bid, ask) tuples in the exchange's symbol notation.
+    """
+    if exchange in ["Binance", "Mexc"]:
+        return [{"symbol": symbol, "bidPrice": bid, "askPrice": ask} for symbol, bid, ask in quotes]
+    elif exchange == "KuCoin":
+        return {"code": "200000", "data": {"ticker": [{"symbol": symbol, "buy": bid, "sell": ask} for symbol, bid, ask in quotes]}}
+    elif exchange == "OKX":
+        return {"code": "0", "data": [{"instId": symbol, "bidPx": bid, "askPx": ask} for symbol, bid, ask in quotes]}
+    elif exchange == "Gate.io":
+        return [{"currency_pair": symbol, "highest_bid": bid, "lowest_ask": ask} for symbol, bid, ask in quotes]
+    elif exchange == "Bitget":
+        return {"code": "00000", "data": [{"symbol": symbol, "bidPr": bid, "askPr": ask} for symbol, bid, ask in quotes]}
+    raise KeyError(f"No bulk ticker shape for {exchange}")
+
+class StubExchangeServer:
+    """
+    Local HTTP server imitating one exchange's ticker API, for benchmarks.
+
+    Serves /ticker?symbol=<SYMBOL> and, for exchanges with a bulk endpoint, /tickers. Prices random-walk
+    around a per-symbol base so spreads between exchanges come and go. Each response is delayed by
+    latency ± jitter, and a share of requests fails with HTTP 500.
+    """
+    def __init__(self, exchange, symbols, latency=0.0, jitter=0.0, error_rate=0.0, seed=None, host="127.0.0.1", port=0):
+        """
+        Initializes the StubExchangeServer class.
+
+        Args:
+            exchange (str): The exchange whose response shapes are served.
+            symbols (list): Configured symbols (e.g. "BTC-USDT") the exchange lists.
+            latency (float): Mean response delay in seconds.
+            jitter (float): Maximum deviation from the mean delay in seconds.
+            error_rate (float): Fraction of requests answered with HTTP 500.
+            seed (int): Seed for prices, delays and errors.
+            host (str): Address to bind.
+            port (int): Port to bind; 0 picks a free one.
+        """
+        self.exchange = exchange
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.symbols = {format_symbol(exchange, symbol): symbol for symbol in symbols}
+        self.base_prices = {symbol: 10 ** self.random.uniform(-2, 4) for symbol in self.symbols}
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def ticker_url(self):
+        """
+        Single-symbol URL template with the SYMBOL placeholder used in [Exchange Details].
+        """
+        return f"{self.base_url}/ticker?symbol=SYMBOL"
+
+    @property
+    def bulk_url(self):
+        """
+        All-symbol URL for [Bulk Endpoints], or None if the exchange has no bulk parser.
+        """
+        return f"{self.base_url}/tickers" if self.exchange in BULK_EXCHANGES else None
+
+    def quote(self, symbol):
+        """
+        Returns the next (bid, ask) of a symbol as strings, like the exchanges send them.
+        """
+        mid = self.base_prices[symbol] * (1 + self.random.gauss(0, 0.002))
+        return f"{mid * 0.9999:.10g}", f"{mid * 1.0001:.10g}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests += 1
+                    delay = max(0.0, stub.latency + stub.random.uniform(-stub.jitter, stub.jitter))
+                    failed = stub.random.random() < stub.error_rate
+                    if failed:
+                        stub.errors += 1
+                time.sleep(delay)
+                url = urlsplit(self.path)
+                if failed:
+                    return self._send(500, {"msg": "stub error"})
+                if url.path == "/ticker":
+                    symbol = parse_qs(url.query).get("symbol", [""])[0]
+                    if symbol not in stub.symbols:
+                        return self._send(404, {"msg": f"unknown symbol {symbol}"})
+                    return self._send(200, ticker_body(stub.exchange, symbol, *stub.quote(symbol)))
+                if url.path == "/tickers" and stub.exchange in BULK_EXCHANGES:
+                    return self._send(200, bulk_body(stub.exchange, [(symbol, *stub.quote(symbol)) for symbol in stub.symbols]))
+                self._send(404, {"msg": "not found"})
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name=f"stub-{self.exchange}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def start_stub_exchanges(exchanges, symbols, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+    """
+    Starts one StubExchangeServer per exchange, each on its own port so every exchange gets its own connection pool.
+
+    Returns:
+        dict: Running servers keyed by exchange.
+    """
+    return {exchange: StubExchangeServer(exchange, symbols, latency, jitter, error_rate, seed=seed + n).start()
+            for n, exchange in enumerate(exchanges)}
@@ -0,0 +1,196 @@
+import json, time, random, asyncio, logging, argparse, threading
+import websockets
+from core import format_symbol, QuoteStream
+from core.stream_handler import STREAM_SPECS
+
+def ticker_frame(exchange, symbol, bid, ask):
+    """
+    Builds a WebSocket ticker message in the exchange's own shape, as parsed by the STREAM_SPECS parsers.
+    """
+    now = time.time()
+    if exchange == "Binance":
+        return {"u": int(now * 1000), "s": symbol, "b": bid, "B": "1", "a": ask, "A": "1"}
+    elif exchange == "OKX":
+        return {"arg": {"channel": "tickers", "instId": symbol}, "data": [{"instId": symbol, "bidPx": bid, "askPx": ask, "ts": str(int(now * 1000))}]}
+    elif exchange == "Gate.io":
+        return {"time": int(now), "time_ms": int(now * 1000), "channel": "spot.tickers", "event": "update",
+                "result": {"currency_pair": symbol, "highest_bid": bid, "lowest_ask": ask}}
+    elif exchange == "Bitget":
+        return {"action": "snapshot", "arg": {"instType": "SPOT", "channel": "ticker", "instId": symbol},
+                "data": [{"instId": symbol, "bidPr": bid, "askPr": ask, "ts": str(int(now * 1000))}]}
+    elif exchange == "Coinbase":
+        return {"type": "ticker", "product_id": symbol, "best_bid": bid, "best_ask": ask}
+    raise KeyError(f"No stream shape for {exchange}")
+
+def subscribed_symbols(exchange, message):
+    """
+    Returns the native symbols a subscribe message, as built by the STREAM_SPECS subscribers, asks for.
+    """
+    if exchange == "Binance":
+        return [param.split("@")[0].upper() for param in message.get("params", [])]
+    elif exchange in ["OKX", "Bitget"]:
+        return [arg["instId"] for arg in message.get("args", [])]
+    elif exchange == "Gate.io":
+        return list(message.get("payload", []))
+    elif exchange == "Coinbase":
+        return list(message.get("product_ids", []))
+    raise KeyError(f"No stream shape for {exchange}")
+
+class StubStreamServer:
+    """
+    Local WebSocket server imitating one exchange's public ticker feed, for benchmarks and checks.
+
+    Accepts the exchange's subscribe messages and pushes a ticker frame for every subscribed symbol each
+    interval, with prices random-walking around a per-symbol base. Text "ping" keepalives get a "pong".
+    With drop_after, every connection is closed after that many frames, so reconnects are exercised.
+    """
+    def __init__(self, exchange, symbols, interval=0.1, drop_after=None, seed=None, host="127.0.0.1", port=0):
+        """
+        Initializes the StubStreamServer class.
+
+        Args:
+            exchange (str): The exchange whose message shapes are served.
+            symbols (list): Configured symbols (e.g. "BTC-USDT") the exchange lists.
+            interval (float): Seconds between two rounds of ticker frames.
+            drop_after (int): Frames after which a connection is closed by the server; None keeps it open.
+            seed (int): Seed for prices.
+            host (str): Address to bind.
+            port (int): Port to bind; 0 picks a free one.
+        """
+        self.exchange = exchange
+        self.interval = interval
+        self.drop_after = drop_after
+        self.host = host
+        self.port = port
+        self.random = random.Random(seed)
+        self.symbols = {format_symbol(exchange, symbol): symbol for symbol in symbols}
+        self.base_prices = {symbol: 10 ** self.random.uniform(-2, 4) for symbol in self.symbols}
+        self.connections = 0
+        self.frames = 0
+        self.lock = threading.Lock()
+        self.loop = None
+        self.stopped = None
+        self.ready = threading.Event()
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    def quote(self, symbol):
+        """
+        Returns the next (bid, ask) of a symbol as strings, like the exchanges send them.
+        """
+        mid = self.base_prices[symbol] * (1 + self.random.gauss(0, 0.002))
+        return f"{mid * 0.9999:.10g}", f"{mid * 1.0001:.10g}"
+
+    async def _handler(self, ws, *args):
+        with self.lock:
+            self.connections += 1
+        subscribed = set()
+
+        async def receive():
+            async for message in ws:
+                if message == "ping":
+                    await ws.send("pong")
+                    continue
+                subscribed.update(symbol for symbol in subscribed_symbols(self.exchange, json.loads(message)) if symbol in self.symbols)
+
+        receiver = asyncio.ensure_future(receive())
+        sent = 0
+        try:
+            while not receiver.done():
+                for symbol in list(subscribed):
+                    await ws.send(json.dumps(ticker_frame(self.exchange, symbol, *self.quote(symbol))))
+                    sent += 1
+                with self.lock:
+                    self.frames += len(subscribed)
+                if self.drop_after is not None and sent >= self.drop_after:
+                    break
+                await asyncio.sleep(self.interval)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            receiver.cancel()
+
+    async def _serve(self):
+        self.stopped = asyncio.get_running_loop().create_future()
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            self.port = next(iter(server.sockets)).getsockname()[1]
+            self.ready.set()
+            await self.stopped
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self._serve(),), name=f"stub-stream-{self.exchange}", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.stopped.set_result, None)
+        self.thread.join()
+        self.loop.close()
+
+def start_stub_streams(exchanges, symbols, interval=0.1, drop_after=None, seed=0):
+    """
+    Starts one StubStreamServer per exchange with a WebSocket parser.
+
+    Returns:
+        dict: Running servers keyed by exchange.
+    """
+    return {exchange: StubStreamServer(exchange, symbols, interval, drop_after, seed=seed + n).start()
+            for n, exchange in enumerate(exchanges) if exchange in STREAM_SPECS}
+
+def run_stream_check(symbols=5, seconds=5.0, interval=0.05, drop_after=None):
+    """
+    Runs a QuoteStream against stub feeds of every exchange with a parser.
+
+    Returns:
+        dict: Per exchange the updates received, the symbols that got a quote, the server's connections,
+        and the stream's reconnect count.
+    """
+    symbol_names = [f"SYM{n}-USDT" for n in range(symbols)]
+    stubs = start_stub_streams(list(STREAM_SPECS), symbol_names, interval, drop_after)
+    updates = {exchange: 0 for exchange in stubs}
+    covered = {exchange: set() for exchange in stubs}
+
+    def on_update(symbol, exchange, quote):
+        updates[exchange] += 1
+        covered[exchange].add(symbol)
+
+    stream = QuoteStream({exchange: stub.url for exchange, stub in stubs.items()}, symbol_names, on_update, reconnect_delay=0.1)
+    deadline = time.monotonic() + seconds
+    try:
+        asyncio.run(stream.run(lambda: time.monotonic() >= deadline))
+    finally:
+        for stub in stubs.values():
+            stub.stop()
+    return {"exchanges": {exchange: {"updates": updates[exchange], "symbols": len(covered[exchange]), "connections": stub.connections}
+                          for exchange, stub in stubs.items()},
+            "symbols": symbols, "reconnects": stream.reconnects}
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the WebSocket stream parsers and reconnects against local stub feeds.")
+    parser.add_argument("--symbols", type=int, default=5, help="number of symbols")
+    parser.add_argument("--seconds", type=float, default=5, help="how long to stream")
+    parser.add_argument("--interval", type=float, default=50, help="ms between two rounds of ticker frames")
+    parser.add_argument("--drop-after", type=int, help="close every connection after this many frames")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    # Every dropped connection logs an error; the report already counts them.
+    logging.basicConfig(level=logging.CRITICAL)
+    report = run_stream_check(args.symbols, args.seconds, args.interval / 1000, args.drop_after)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"\n{report['symbols']} symbols, {report['reconnects']} reconnects")
+        for exchange, stats in report["exchanges"].items():
+            print(f"  {exchange:<10}: {stats['updates']} updates, {stats['symbols']}/{report['symbols']} symbols, {stats['connections']} connection(s)")
+    missing = [exchange for exchange, stats in report["exchanges"].items() if stats["symbols"] < report["symbols"]]
+    if missing:
+        raise SystemExit(f"No quotes parsed for every symbol on: {', '.join(missing)}")
+
+if __name__ == "__main__":
+    main()
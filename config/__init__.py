@@ -1,13 +1,19 @@
 import configparser
 import os
+import threading
 
+_configs = {}
+_lock = threading.Lock()
 
-
-def read_config(config_path="config/config.ini"):
+def read_config(config_path="config/config.ini", reload=False):
     """
     Reads the config.ini file at the specified file path.
+    The file is parsed once and the same ConfigParser is returned on later calls; pass reload=True to re-read it.
     """
-    config = configparser.ConfigParser()
-    # config.read(config_path) #if the config is in the config folder.
-    config.read(os.path.join(os.path.dirname(os.path.dirname(__file__)),config_path)) #if the config is in the Auto_Arbitration folder.
-    return config
\ No newline at end of file
+    with _lock:
+        if reload or config_path not in _configs:
+            config = configparser.ConfigParser()
+            # config.read(config_path) #if the config is in the config folder.
+            config.read(os.path.join(os.path.dirname(os.path.dirname(__file__)),config_path)) #if the config is in the Auto_Arbitration folder.
+            _configs[config_path] = config
+        return _configs[config_path]
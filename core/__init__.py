@@ -1,8 +1,27 @@
-from .arbitrage_handler import check_arbitrage
-from .exchange_handler import get_price_from_api
-from .data_handler import DataHandler
+from .arbitrage_handler import check_arbitrage, format_arbitrage_message, IncrementalEvaluator
+from .fee_handler import FeeTable, NO_FEES
+from .spread_matrix import SpreadMatrix
+from .spread_stats import SpreadStats, PairStats
+from .exchange_handler import EXCHANGES, Quote, as_quote, get_price_from_api, get_all_prices_from_api, format_symbol, canonical_exchange, ExchangeAdapter, UrlTemplate, register_adapter, get_adapter, compile_api_urls
+from .session_handler import SessionPool, get_session_pool
+from .health_handler import ExchangeHealth, HealthRegistry
+from .fetch_engine import FetchEngine
+from .quote_cache import QuoteCache, CachedQuote
+from .stream_handler import QuoteStream
+from .data_handler import DataHandler, create_data_handler
+from .data_handler_JSONL import JsonlDataHandler
+from .data_handler_SQL import SQLDataHandler
+from .price_history import PriceHistoryStore, PriceHistoryHandler
+from .query_handler import LogIndex, iter_pages
+from .persistence_writer import PersistenceWriter
 from .noti_handler import NotiHandler
+from .rate_limiter import TokenBucket
+from .noti_dispatcher import NotificationDispatcher
+from .scheduler import DeadlineScheduler, RateBudget
+from .metrics_handler import MetricsRegistry, MetricsServer, metrics
+from .replay_handler import ReplayEngine, best_spread, iter_price_log
+from .shard_handler import ShardPool, split_symbols
 
 
-__all__ = ['check_arbitrage', 'get_price_from_api', 'DataHandler', 'NotiHandler']
+__all__ = ['check_arbitrage', 'format_arbitrage_message', 'IncrementalEvaluator', 'FeeTable', 'NO_FEES', 'SpreadMatrix', 'SpreadStats', 'PairStats', 'EXCHANGES', 'Quote', 'as_quote', 'get_price_from_api', 'get_all_prices_from_api', 'format_symbol', 'canonical_exchange', 'ExchangeAdapter', 'UrlTemplate', 'register_adapter', 'get_adapter', 'compile_api_urls', 'SessionPool', 'get_session_pool', 'ExchangeHealth', 'HealthRegistry', 'FetchEngine', 'QuoteCache', 'CachedQuote', 'QuoteStream', 'DataHandler', 'JsonlDataHandler', 'SQLDataHandler', 'PriceHistoryStore', 'PriceHistoryHandler', 'LogIndex', 'iter_pages', 'create_data_handler', 'PersistenceWriter', 'NotiHandler', 'TokenBucket', 'NotificationDispatcher', 'DeadlineScheduler', 'RateBudget', 'MetricsRegistry', 'MetricsServer', 'metrics', 'ReplayEngine', 'best_spread', 'iter_price_log', 'ShardPool', 'split_symbols']
 __version__ = '0.1.0'
\ No newline at end of file
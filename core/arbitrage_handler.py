@@ -1,35 +1,159 @@
-def check_arbitrage(prices, ARBITRAGE_THRESHOLD):
+import bisect, logging, datetime
+from .exchange_handler import as_quote
+from .fee_handler import NO_FEES
+
+def check_arbitrage(prices, ARBITRAGE_THRESHOLD, fees=NO_FEES):
     """
-    Determines the lowest and highest prices from the fetched prices,
-    calculates the spread, and logs if there is an arbitrage opportunity above the set threshold.
+    Finds the best exchange to buy at (lowest ask after fees) and to sell at (highest bid after fees),
+    calculates the net spread, and flags an arbitrage opportunity above the set threshold.
+    Stale quotes are kept in the result's prices but never used as a leg.
     
     ARGS:
-        prices (dict): Dictionary containing prices from different exchanges.
-        ARBITRAGE_THRESHOLD (float): Minimum spread percentage required for arbitrage opportunity.
+        prices (dict): Quotes (or plain prices) from different exchanges.
+        ARBITRAGE_THRESHOLD (float): Minimum net spread percentage required for arbitrage opportunity.
+        fees (FeeTable): Precomputed fee multipliers. Defaults to no fees.
     """
-    valid_prices = {ex: price for ex, price in prices.items() if price is not None}
-    if not valid_prices:
-        valid_msg = "No valid prices were obtained."
-        return {"info_msg": valid_msg, "Arbitrage_detail_msg": "", "valid_price" : False }
-
-    min_exchange = min(valid_prices, key=valid_prices.get)
-    max_exchange = max(valid_prices, key=valid_prices.get)
-    min_price = valid_prices[min_exchange]
-    max_price = valid_prices[max_exchange]
-
-    spread = ((max_price - min_price) / min_price) * 100
-    Arbitrage_detail_msg = f"Lowest: {min_exchange} = {min_price:.4f}, Highest: {max_exchange} = {max_price:.4f}, Spread: {spread:.2f}%"
-
-    if spread >= ARBITRAGE_THRESHOLD:
-        info_msg = f"Arbitrage opportunity! Buy from {min_exchange}, sell at {max_exchange}. Spread: {spread:.2f}%"
-        success = True
-    else:
-        info_msg = "No significant arbitrage opportunity found."
-        success = False
-        
-    real_data = {"min_price" : min_price, "min_exchange" : min_exchange,
-                 "max_price" : max_price, "max_exchange" : max_exchange,
+    valid_prices = {ex: as_quote(price) for ex, price in prices.items() if price is not None}
+    fresh = {ex: quote for ex, quote in valid_prices.items() if not quote.stale}
+    if len(fresh) < 2:
+        return {"valid_price" : False}
+
+    buys = sorted((quote.ask * fees.buy_multiplier(ex), ex) for ex, quote in fresh.items())
+    sells = sorted((quote.bid * fees.sell_multiplier(ex), ex) for ex, quote in fresh.items())
+    return _arbitrage_result(valid_prices, buys, sells, ARBITRAGE_THRESHOLD)
+
+def _best_pair(buys, sells):
+    # buys and sells are sorted (effective price, exchange) lists; buying and selling must use different exchanges.
+    if buys[0][1] != sells[-1][1]:
+        return buys[0], sells[-1]
+    return max(((buys[0], sells[-2]), (buys[1], sells[-1])), key=lambda pair: pair[1][0] / pair[0][0])
+
+def _arbitrage_result(valid_prices, buys, sells, ARBITRAGE_THRESHOLD):
+    (buy_cost, min_exchange), (sell_value, max_exchange) = _best_pair(buys, sells)
+    spread = ((sell_value - buy_cost) / buy_cost) * 100
+
+    real_data = {"min_price" : valid_prices[min_exchange].ask, "min_exchange" : min_exchange,
+                 "max_price" : valid_prices[max_exchange].bid, "max_exchange" : max_exchange,
                  "arbitrage_percentage" : spread,
                  "prices" : valid_prices}
     
-    return {"info_msg": info_msg, "Arbitrage_detail_msg": Arbitrage_detail_msg, "valid_price" : True, "real_data" : real_data, "success": success}
\ No newline at end of file
+    return {"valid_price" : True, "real_data" : real_data, "success": spread >= ARBITRAGE_THRESHOLD}
+
+def format_arbitrage_message(real_data):
+    """
+    Builds the notification text for an arbitrage opportunity.
+    Only called when an alert actually fires.
+
+    ARGS:
+        real_data (dict): The "real_data" of a check_arbitrage result, including its symbol.
+    """
+    return (f"Arbitrage Opportunity Found!\nSymbol: {real_data['symbol']}\nBuy Price (ask): {real_data['min_price']}\n"
+            f"Sell Price (bid): {real_data['max_price']}\nBuy Exchange: {real_data['min_exchange']}\n"
+            f"Sell Exchange: {real_data['max_exchange']}\nNet Arbitrage Percentage: {round(real_data['arbitrage_percentage'],3)}%\n"
+            + (f"Z-Score: {round(real_data['z_score'],2)}\n" if 'z_score' in real_data else "")
+            + f"Datetime: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+class IncrementalEvaluator:
+    """
+    Keeps fee-adjusted ask and bid books per symbol, sorted and updated one quote at a time, and
+    re-evaluates only the symbols whose quotes changed since the last evaluation.
+    """
+    def __init__(self, thresholds, fees=NO_FEES):
+        """
+        Initializes the IncrementalEvaluator class.
+
+        ARGS:
+            thresholds (dict): Minimum net spread percentage per symbol.
+            fees (FeeTable): Precomputed fee multipliers. Defaults to no fees.
+        """
+        self.thresholds = dict(thresholds)
+        self.fees = fees
+        self.prices = {}
+        self.buys = {}
+        self.sells = {}
+        self.dirty = set()
+
+    def update(self, symbol, exchange, quote):
+        """
+        Applies one quote. A quote of None removes the exchange from the symbol's books; a stale
+        quote is kept in its prices but left out of the books, so it is never used as a leg.
+
+        Returns:
+            bool: True if the quote changed the books.
+        """
+        prices = self.prices.setdefault(symbol, {})
+        buys = self.buys.setdefault(symbol, [])
+        sells = self.sells.setdefault(symbol, [])
+        quote = None if quote is None else as_quote(quote)
+        old_quote = prices.get(exchange)
+        if old_quote == quote:
+            return False
+        if old_quote is not None and not old_quote.stale:
+            del buys[bisect.bisect_left(buys, (old_quote.ask * self.fees.buy_multiplier(exchange), exchange))]
+            del sells[bisect.bisect_left(sells, (old_quote.bid * self.fees.sell_multiplier(exchange), exchange))]
+        prices.pop(exchange, None)
+        if quote is not None and not quote.stale:
+            bisect.insort(buys, (quote.ask * self.fees.buy_multiplier(exchange), exchange))
+            bisect.insort(sells, (quote.bid * self.fees.sell_multiplier(exchange), exchange))
+        if quote is not None:
+            prices[exchange] = quote
+        self.dirty.add(symbol)
+        return True
+
+    def update_symbol(self, symbol, prices):
+        """
+        Applies a snapshot of a symbol's quotes. Exchanges mapped to None (failed requests) are removed;
+        exchanges missing from the snapshot (not requested this time) keep their last quote.
+
+        Returns:
+            bool: True if any quote changed.
+        """
+        changed = False
+        for exchange, quote in prices.items():
+            changed = self.update(symbol, exchange, quote) or changed
+        return changed
+
+    def reconfigure(self, thresholds, fees=None, exchanges=None):
+        """
+        Swaps in new thresholds and fees, e.g. after a config reload, keeping the quotes of the symbols
+        that stay. The books are rebuilt with the new fees, symbols no longer in thresholds are dropped,
+        and with exchanges given, so are the quotes of every other exchange. Kept symbols are re-evaluated.
+        """
+        old_prices = self.prices
+        self.thresholds = dict(thresholds)
+        self.fees = fees if fees is not None else self.fees
+        self.prices, self.buys, self.sells = {}, {}, {}
+        self.dirty = set()
+        for symbol, prices in old_prices.items():
+            if symbol in self.thresholds:
+                self.update_symbol(symbol, {exchange: quote for exchange, quote in prices.items() if exchanges is None or exchange in exchanges})
+
+    def evaluate(self, symbol):
+        """
+        Evaluates a symbol from its sorted books.
+
+        Returns:
+            dict: The same structure as check_arbitrage, with the symbol set in "real_data".
+        """
+        self.dirty.discard(symbol)
+        if len(self.buys.get(symbol, [])) < 2:
+            return {"valid_price" : False}
+        result = _arbitrage_result(dict(self.prices[symbol]), self.buys[symbol], self.sells[symbol], self.thresholds[symbol])
+        result["real_data"]["symbol"] = symbol
+        return result
+
+    def evaluate_dirty(self):
+        """
+        Evaluates every symbol whose quotes changed since it was last evaluated. A symbol that fails to
+        evaluate is logged and left out, so the others still get their results.
+
+        Returns:
+            list: (symbol, result) tuples.
+        """
+        results = []
+        for symbol in list(self.dirty):
+            try:
+                results.append((symbol, self.evaluate(symbol)))
+            except Exception as e:
+                logging.error(f"{e} - {symbol}")
+        return results
@@ -1,8 +1,39 @@
 import  os, json, datetime
 from config import read_config
+from .query_handler import match_record
+
+def create_data_handler(backend=None, config=None):
+    """
+    Creates the storage backend selected by BACKEND in the [Database] section of the config.ini file.
+    With PRICE_STORE = columnar, prices go to the columnar PriceHistoryStore instead of the backend.
+
+    Args:
+        backend (str): "json", "jsonl" or "sqlite". Defaults to the configured backend.
+        config (ConfigParser): Settings to use instead of the config.ini file.
+    Returns:
+        The data handler instance. Every backend has the same interface as DataHandler.
+    """
+    config = config if config is not None else read_config()
+    if backend is None:
+        backend = config.get('Database', 'BACKEND', fallback='json')
+    backend = backend.strip().lower()
+    if backend == "jsonl":
+        from .data_handler_JSONL import JsonlDataHandler
+        handler = JsonlDataHandler(config)
+    elif backend == "sqlite":
+        from .data_handler_SQL import SQLDataHandler
+        handler = SQLDataHandler(config)
+    elif backend == "json":
+        handler = DataHandler(config)
+    else:
+        raise ValueError(f"Unknown database backend: {backend}")
+    if config.get('Database', 'PRICE_STORE', fallback='backend').strip().lower() == "columnar":
+        from .price_history import PriceHistoryStore, PriceHistoryHandler
+        handler = PriceHistoryHandler(handler, PriceHistoryStore.from_config(config))
+    return handler
 
 class DataHandler:
-    def __init__(self):
+    def __init__(self, config=None):
         """
         Initializes the DataHandler class.
 
@@ -10,7 +41,7 @@ class DataHandler:
 
         :param config: The configuration read from the config.ini file
         """
-        self.config_data = read_config()
+        self.config_data = config if config is not None else read_config()
         DB_Name = self.config_data.get('Database', 'MAIN_FOLDER')
         self.db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), DB_Name)
     
@@ -38,13 +69,24 @@ class DataHandler:
             with open(self.prices_json, 'w') as f:
                 json.dump({}, f)
              
-    def insert_data(self, data):
+    def flush(self):
+        """
+        Every insert is written immediately, so there is nothing to flush.
+        """
+
+    def close(self):
+        """
+        The JSON files are not kept open, so there is nothing to close.
+        """
+
+    def insert_data(self, data, timestamp=None):
         """
         Inserts arbitrage data into the database.
         Args:
             data (dict): Dictionary containing arbitrage data.
+            timestamp (str): When the record was produced. Defaults to now.
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         with open(self.arbitrage_json, 'r') as f:
             arbitrage_data = json.load(f)
         with open(self.arbitrage_json, 'w') as f:
@@ -59,14 +101,15 @@ class DataHandler:
             }
             json.dump(arbitrage_data, f)
     
-    def insert_prices(self, prices, symbol):
+    def insert_prices(self, prices, symbol, timestamp=None):
         """
         Inserts prices into the database.
         Args:
             prices (dict): Dictionary containing prices from different exchanges.
             symbol (str): The symbol for which the prices are being inserted.
+            timestamp (str): When the prices were fetched. Defaults to now.
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         with open(self.prices_json, 'r') as f:
             prices_data = json.load(f)
         with open(self.prices_json, 'w') as f:
@@ -77,13 +120,14 @@ class DataHandler:
             }
             json.dump(prices_data, f)
             
-    def insert_success_data(self, data):
+    def insert_success_data(self, data, timestamp=None):
         """
         Inserts successful arbitrage data into the database.
         Args:
             data (dict): Dictionary containing arbitrage data.
+            timestamp (str): When the record was produced. Defaults to now.
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         with open(self.arbitrage_success, 'r') as f:
             success_data = json.load(f)
         with open(self.arbitrage_success, 'w') as f:
@@ -98,6 +142,21 @@ class DataHandler:
             }            
             json.dump(success_data, f)
         
+    def iter_records(self, json_file):
+        """
+        Yields the records of a JSON file one at a time.
+        The legacy format is a single JSON object, so the whole file is still loaded first.
+        Args:
+            json_file (str): "arbitrage", "success" or "prices".
+        """
+        with open(self._path(json_file), 'r') as f:
+            data = json.load(f)
+        yield from data.values()
+
+    def _path(self, json_file):
+        option = {"arbitrage": 'ARBITRAGE_JSON', "success": 'ARBITRAGE_SUCCESS', "prices": 'PRICES'}[json_file]
+        return os.path.join(self.db_path, self.config_data.get('Database', option))
+
     def fetch_all_data(self, json_file):
         """
         Fetches arbitrage data from the database. 
@@ -106,13 +165,21 @@ class DataHandler:
         Returns:
             dict: Dictionary containing arbitrage data.  
         """
-        if json_file == "arbitrage":
-            self.arbitrage_json = os.path.join(self.db_path, self.config_data.get('Database', 'ARBITRAGE_JSON'))
-        elif json_file == "success":
-            self.arbitrage_json = os.path.join(self.db_path, self.config_data.get('Database', 'ARBITRAGE_SUCCESS'))
-        elif json_file == "prices":
-            self.arbitrage_json = os.path.join(self.db_path, self.config_data.get('Database', 'PRICES'))
-            
-        with open(self.arbitrage_json, 'r') as f:
+        with open(self._path(json_file), 'r') as f:
             data = json.load(f)
         return data
+
+    def query(self, json_file, symbol=None, buy_exchange=None, sell_exchange=None, start=None, end=None, min_spread=None, limit=10, offset=0):
+        """
+        Finds arbitrage records, newest first. The legacy format has no index, so the whole file is loaded.
+        Takes the same filters as JsonlDataHandler.query.
+        """
+        matches = [record for record in reversed(list(self.iter_records(json_file)))
+                   if match_record(record, symbol, buy_exchange, sell_exchange, start, end, min_spread)]
+        return matches[offset:offset + limit] if limit is not None else matches[offset:]
+
+    def tail(self, json_file, count=10):
+        """
+        Returns the last records of a file, newest first.
+        """
+        return list(reversed(list(self.iter_records(json_file))))[:count]
@@ -0,0 +1,265 @@
+import os, json, time, datetime, threading, logging
+from config import read_config
+from .query_handler import LogIndex
+
+class JsonlDataHandler:
+    """
+    Append-only JSON Lines storage. Every insert appends one line, so its cost does not grow with
+    the history, and records written in the same second no longer overwrite each other.
+    """
+    def __init__(self, config=None):
+        """
+        Initializes the JsonlDataHandler class.
+
+        Reads the database folder and the fsync batching settings from the config.ini file.
+        Lines are flushed to disk after FSYNC_BATCH records or FSYNC_INTERVAL seconds, whichever comes first.
+
+        :param config: The configuration read from the config.ini file
+        """
+        self.config_data = config if config is not None else read_config()
+        DB_Name = self.config_data.get('Database', 'MAIN_FOLDER')
+        self.db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), DB_Name)
+        self.fsync_batch = self.config_data.getint('Database', 'FSYNC_BATCH', fallback=50)
+        self.fsync_interval = self.config_data.getfloat('Database', 'FSYNC_INTERVAL', fallback=1.0)
+        self.files = {}
+        self.sizes = {}
+        self.indexes = {}
+        self.pending = 0
+        self.last_sync = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _jsonl_path(self, option):
+        return os.path.join(self.db_path, os.path.splitext(self.config_data.get('Database', option))[0] + ".jsonl")
+
+    def create_files(self):
+        """
+        Creates the database folder and opens the JSON Lines files for appending.
+
+        If a JSON Lines file does not exist yet but its legacy JSON file does, the legacy records are
+        migrated once. The legacy JSON files are left untouched.
+
+        :return: None
+        """
+        os.makedirs(self.db_path, exist_ok=True)
+        self.arbitrage_json = self._jsonl_path('ARBITRAGE_JSON')
+        self.arbitrage_success = self._jsonl_path('ARBITRAGE_SUCCESS')
+        self.prices_json = self._jsonl_path('PRICES')
+        self.paths = {"arbitrage": self.arbitrage_json, "success": self.arbitrage_success, "prices": self.prices_json}
+
+        for name, option in (("arbitrage", 'ARBITRAGE_JSON'), ("success", 'ARBITRAGE_SUCCESS'), ("prices", 'PRICES')):
+            path = self.paths[name]
+            if not os.path.exists(path):
+                self.migrate(os.path.join(self.db_path, self.config_data.get('Database', option)), path)
+            self.files[name] = self._open_append(path)
+            self.files[name].flush()
+            self.sizes[name] = os.path.getsize(path)
+            if name != "prices":
+                self.indexes[name] = LogIndex(path)
+                self.indexes[name].open()
+
+    def _open_append(self, path):
+        torn = False
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        # newline='' keeps "\n" as one byte on Windows too, so the byte lengths the indexes record match the file.
+        f = open(path, 'a', encoding='utf-8', newline='')
+        # A crash can leave a torn last line; terminate it so new records start on a fresh line.
+        if torn:
+            f.write("\n")
+        return f
+
+    def migrate(self, json_path, jsonl_path):
+        """
+        Converts a legacy timestamp-keyed JSON file to JSON Lines.
+
+        The new file is written to a temporary path, synced and then renamed, so an interrupted
+        migration is simply retried on the next start.
+
+        Args:
+            json_path (str): The legacy JSON file.
+            jsonl_path (str): The JSON Lines file to create.
+        Returns:
+            int: The number of migrated records.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, 'r') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not migrate {json_path}: {e}")
+            return 0
+        tmp_path = jsonl_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            for key in sorted(legacy):
+                f.write(json.dumps(legacy[key], separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, jsonl_path)
+        return len(legacy)
+
+    def _append(self, name, record):
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        length = len(line.encode('utf-8'))
+        with self.lock:
+            self.files[name].write(line)
+            if name in self.indexes:
+                self.indexes[name].add(self.sizes[name], length, record)
+            self.sizes[name] += length
+            self.pending += 1
+            if self.pending >= self.fsync_batch or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        for f in self.files.values():
+            f.flush()
+            os.fsync(f.fileno())
+        for index in self.indexes.values():
+            index.flush()
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def flush(self):
+        """
+        Writes every buffered record to disk and fsyncs the files.
+        """
+        with self.lock:
+            if self.pending:
+                self._sync()
+
+    def close(self):
+        """
+        Flushes and closes the JSON Lines files.
+        """
+        self.flush()
+        with self.lock:
+            for f in self.files.values():
+                f.close()
+            for index in self.indexes.values():
+                index.close()
+            self.files = {}
+            self.indexes = {}
+
+    def insert_data(self, data, timestamp=None):
+        """
+        Appends arbitrage data to the database.
+        Args:
+            data (dict): Dictionary containing arbitrage data.
+            timestamp (str): When the record was produced. Defaults to now.
+        """
+        self._append("arbitrage", self._arbitrage_record(data, timestamp))
+
+    def insert_prices(self, prices, symbol, timestamp=None):
+        """
+        Appends prices to the database.
+        Args:
+            prices (dict): Dictionary containing prices from different exchanges.
+            symbol (str): The symbol for which the prices are being inserted.
+            timestamp (str): When the prices were fetched. Defaults to now.
+        """
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._append("prices", {'symbol': symbol, 'prices': prices, 'datetime': timestamp})
+
+    def insert_success_data(self, data, timestamp=None):
+        """
+        Appends successful arbitrage data to the database.
+        Args:
+            data (dict): Dictionary containing arbitrage data.
+            timestamp (str): When the record was produced. Defaults to now.
+        """
+        self._append("success", self._arbitrage_record(data, timestamp))
+
+    def _arbitrage_record(self, data, timestamp=None):
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return {
+            'symbol': data['symbol'],
+            'min_price': data['min_price'],
+            'min_exchange': data['min_exchange'],
+            'max_price': data['max_price'],
+            'max_exchange': data['max_exchange'],
+            'arbitrage_percentage': data['arbitrage_percentage'],
+            'datetime': timestamp
+        }
+
+    def iter_records(self, json_file):
+        """
+        Yields the records of a JSON Lines file one at a time, skipping torn lines.
+        Args:
+            json_file (str): "arbitrage", "success" or "prices".
+        """
+        self.flush()
+        with open(self.paths[json_file], 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def fetch_all_data(self, json_file):
+        """
+        Fetches arbitrage data from the database.
+        Args:
+            json_file (str): "arbitrage", "success" or "prices".
+        Returns:
+            dict: Dictionary containing the records, keyed by their position in the file.
+        """
+        return {n: record for n, record in enumerate(self.iter_records(json_file))}
+
+    def query(self, json_file, symbol=None, buy_exchange=None, sell_exchange=None, start=None, end=None, min_spread=None, limit=10, offset=0):
+        """
+        Finds arbitrage records through the log's index, newest first. Only the matching lines are read.
+        Args:
+            json_file (str): "arbitrage" or "success".
+            symbol (str): Only records of this symbol.
+            buy_exchange (str): Only records buying on this exchange.
+            sell_exchange (str): Only records selling on this exchange.
+            start (str | datetime): Only records at or after this time ("YYYY-MM-DD HH:MM:SS").
+            end (str | datetime): Only records before this time.
+            min_spread (float): Only records with at least this net spread percentage.
+            limit (int): Maximum number of records; None returns every match.
+            offset (int): Number of matching records to skip, for pagination.
+        Returns:
+            list: The matching records.
+        """
+        self.flush()
+        spans = self.indexes[json_file].select(symbol, buy_exchange, sell_exchange, start, end, min_spread, limit, offset)
+        records = []
+        with open(self.paths[json_file], 'rb') as f:
+            for position, length in spans:
+                f.seek(position)
+                records.append(json.loads(f.read(length)))
+        return records
+
+    def tail(self, json_file, count=10):
+        """
+        Returns the last records of a log, newest first, reading backwards from the end of the file.
+        Args:
+            json_file (str): "arbitrage", "success" or "prices".
+            count (int): Number of records.
+        """
+        if json_file in self.indexes:
+            return self.query(json_file, limit=count)
+        self.flush()
+        with open(self.paths[json_file], 'rb') as f:
+            position = f.seek(0, os.SEEK_END)
+            data = b""
+            while position > 0 and data.count(b"\n") <= count:
+                step = min(65536, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+        lines = data.split(b"\n")[:-1]
+        # The first line may be cut off by the block boundary.
+        if position > 0:
+            lines = lines[1:]
+        records = []
+        for line in reversed(lines):
+            if len(records) == count:
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
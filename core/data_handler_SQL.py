@@ -1,81 +1,229 @@
-import sqlite3, os, datetime
+import sqlite3, os, datetime, threading
 from config import read_config
+from .exchange_handler import as_quote
+from .query_handler import to_text
 
-class DataHandler:
-    def __init__(self):
-        self.config_data = read_config()
-        DB_Name = self.config_data.get('Database', 'DB_Name')
-        self.db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), DB_Name)
-        self.conn = sqlite3.connect(self.db_path)
-        self.cursor = self.conn.cursor()
+class SQLDataHandler:
+    """
+    SQLite storage with typed columns. Inserts are buffered and written with executemany in a
+    single transaction when flush() is called, once per polling cycle.
+    """
+    def __init__(self, config=None):
+        """
+        Initializes the SQLDataHandler class.
+
+        Reads the database file and table names from the [Database] section of the config.ini file.
+        The connection is opened by create_files.
+
+        :param config: The configuration read from the config.ini file
+        """
+        self.config_data = config if config is not None else read_config()
+        DB_Name = self.config_data.get('Database', 'MAIN_FOLDER')
+        self.db_folder = os.path.join(os.path.dirname(os.path.dirname(__file__)), DB_Name)
+        self.db_path = os.path.join(self.db_folder, self.config_data.get('Database', 'DB_NAME', fallback='arbitrage.db'))
+        self.table = self.config_data.get('Database', 'DB_TABLE', fallback='arbitrage')
+        self.table_success = self.config_data.get('Database', 'DB_TABLE_SUCCESS', fallback='arbitrage_success')
+        self.table_prices = self.config_data.get('Database', 'DB_TABLE_PRICES', fallback='prices')
+        self.tables = {"arbitrage": self.table, "success": self.table_success, "prices": self.table_prices}
+        self.conn = None
+        self.lock = threading.Lock()
+        self.pending = {"arbitrage": [], "success": [], "prices": []}
+
+    def create_files(self):
+        """
+        Opens the database in WAL mode and creates the tables and indexes if they don't already exist.
+        """
+        os.makedirs(self.db_folder, exist_ok=True)
+        # isolation_level=None leaves transaction control to flush(); the connection is shared with the bot thread.
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
         self.create_table()
-    
+
     def create_table(self):
         """
-        Creates a table to store arbitrage data if it doesn't already exist.
+        Creates the arbitrage, success and price tables with their (symbol, datetime) indexes.
         """
-        self.cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {self.config_data.get('Database', 'DB_TABLE')} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                min_price TEXT NOT NULL,
-                min_exchange TEXT NOT NULL,
-                max_price TEXT NOT NULL,
-                max_exchange TEXT NOT NULL,
-                arbitrage_percentage TEXT NOT NULL,
-                datetime TEXT NOT NULL
-            )
-        """)
-        self.cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {self.config_data.get('Database', 'DB_TABLE_SUCCESS')} (
+        for table in (self.table, self.table_success):
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    symbol TEXT NOT NULL,
+                    min_price REAL NOT NULL,
+                    min_exchange TEXT NOT NULL,
+                    max_price REAL NOT NULL,
+                    max_exchange TEXT NOT NULL,
+                    arbitrage_percentage REAL NOT NULL,
+                    datetime TEXT NOT NULL
+                )
+            """)
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_prices} (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                symbol TEXT NOT NULL,
-                min_price TEXT NOT NULL,
-                min_exchange TEXT NOT NULL,
-                max_price TEXT NOT NULL,
-                max_exchange TEXT NOT NULL,
-                arbitrage_percentage TEXT NOT NULL,
-                datetime TEXT NOT NULL
-            )
-        """)
-        self.cursor.execute(f"""
-            CREATE TABLE IF NOT EXISTS {self.config_data.get('Database', 'DB_TABLE_PRICES')} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                price TEXT NOT NULL,
+                bid REAL NOT NULL,
+                ask REAL NOT NULL,
+                stale INTEGER NOT NULL DEFAULT 0,
                 exchange TEXT NOT NULL,
                 symbol TEXT NOT NULL,
                 datetime TEXT NOT NULL
             )
-        """)             
-        self.conn.commit()
-        
-    def insert_data(self, data):
+        """)
+        # Price tables created before the stale flag was stored get the column, with earlier rows counted as fresh.
+        if "stale" not in [column[1] for column in self.conn.execute(f"PRAGMA table_info({self.table_prices})")]:
+            self.conn.execute(f"ALTER TABLE {self.table_prices} ADD COLUMN stale INTEGER NOT NULL DEFAULT 0")
+        for table in self.tables.values():
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_symbol_datetime ON {table} (symbol, datetime)")
+
+    def insert_data(self, data, timestamp=None):
         """
-        Inserts arbitrage data into the database.
+        Queues arbitrage data for the next flush.
         Args:
             data (dict): Dictionary containing arbitrage data.
+            timestamp (str): When the record was produced. Defaults to now.
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.cursor.execute(f"INSERT INTO {self.config_data.get('Database', 'DB_TABLE')} (symbol, min_price, min_exchange, max_price, max_exchange, arbitrage_percentage, datetime) VALUES (?, ?, ?, ?, ?, ?, ?)", (data['symbol'], data['min_price'], data['min_exchange'], data['max_price'], data['max_exchange'], data['arbitrage_percentage'], timestamp))
-        self.conn.commit()
-    
-    def insert_prices(self, prices, symbol):
+        self._queue("arbitrage", self._arbitrage_row(data, timestamp))
+
+    def insert_prices(self, prices, symbol, timestamp=None):
         """
-        Inserts prices into the database.
+        Queues prices for the next flush. Stale quotes keep their flag, so a replay never uses them as a leg.
         Args:
             prices (dict): Dictionary containing prices from different exchanges.
             symbol (str): The symbol for which the prices are being inserted.
+            timestamp (str): When the prices were fetched. Defaults to now.
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for exchange, price in prices.items():
-            self.cursor.execute(f"INSERT INTO {self.config_data.get('Database', 'DB_TABLE_PRICES')} (price, exchange, symbol, datetime) VALUES (?, ?, ?, ?)", (price, exchange, symbol, timestamp))
-            
-    def insert_success_data(self, data):
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        quotes = {exchange: as_quote(price) for exchange, price in prices.items()}
+        rows = [(quote.bid, quote.ask, int(quote.stale), exchange, symbol, timestamp) for exchange, quote in quotes.items()]
+        with self.lock:
+            self.pending["prices"].extend(rows)
+
+    def insert_success_data(self, data, timestamp=None):
         """
-        Inserts successful arbitrage data into the database.
+        Queues successful arbitrage data for the next flush.
         Args:
             data (dict): Dictionary containing arbitrage data.
+            timestamp (str): When the record was produced. Defaults to now.
+        """
+        self._queue("success", self._arbitrage_row(data, timestamp))
+
+    def _arbitrage_row(self, data, timestamp=None):
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return (data['symbol'], float(data['min_price']), data['min_exchange'], float(data['max_price']),
+                data['max_exchange'], float(data['arbitrage_percentage']), timestamp)
+
+    def _queue(self, name, row):
+        with self.lock:
+            self.pending[name].append(row)
+
+    def flush(self):
+        """
+        Writes every queued row in a single transaction.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {"arbitrage": [], "success": [], "prices": []}
+            if not any(pending.values()):
+                return
+            self.conn.execute("BEGIN")
+            try:
+                for name in ("arbitrage", "success"):
+                    if pending[name]:
+                        self.conn.executemany(f"INSERT INTO {self.tables[name]} (symbol, min_price, min_exchange, max_price, max_exchange, arbitrage_percentage, datetime) VALUES (?, ?, ?, ?, ?, ?, ?)", pending[name])
+                if pending["prices"]:
+                    self.conn.executemany(f"INSERT INTO {self.table_prices} (bid, ask, stale, exchange, symbol, datetime) VALUES (?, ?, ?, ?, ?, ?)", pending["prices"])
+                self.conn.execute("COMMIT")
+            except sqlite3.Error:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        """
+        Flushes the queued rows and closes the connection.
+        """
+        self.flush()
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def iter_records(self, json_file):
+        """
+        Yields the rows of a table one at a time from a separate read connection, so the writer is not blocked.
+        Price rows are grouped back into one snapshot per symbol and time, like the JSON backends store them,
+        with every quote as [bid, ask, stale].
+        Args:
+            json_file (str): "arbitrage", "success" or "prices".
+        """
+        self.flush()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            if json_file != "prices":
+                cursor = conn.execute(f"SELECT * FROM {self.tables[json_file]} ORDER BY id")
+                columns = [column[0] for column in cursor.description][1:]
+                for row in cursor:
+                    yield dict(zip(columns, row[1:]))
+                return
+            record = None
+            for bid, ask, stale, exchange, symbol, timestamp in conn.execute(f"SELECT bid, ask, stale, exchange, symbol, datetime FROM {self.table_prices} ORDER BY id"):
+                if record is None or record['symbol'] != symbol or record['datetime'] != timestamp:
+                    if record is not None:
+                        yield record
+                    record = {'symbol': symbol, 'prices': {}, 'datetime': timestamp}
+                record['prices'][exchange] = [bid, ask, bool(stale)]
+            if record is not None:
+                yield record
+        finally:
+            conn.close()
+
+    def fetch_all_data(self, json_file):
+        """
+        Fetches arbitrage data from the database.
+        Args:
+            json_file (str): "arbitrage", "success" or "prices".
+        Returns:
+            dict: Dictionary containing the rows, keyed by id.
+        """
+        self.flush()
+        with self.lock:
+            cursor = self.conn.execute(f"SELECT * FROM {self.tables[json_file]} ORDER BY id")
+            columns = [column[0] for column in cursor.description]
+            return {row[0]: dict(zip(columns[1:], row[1:])) for row in cursor}
+
+    def query(self, json_file, symbol=None, buy_exchange=None, sell_exchange=None, start=None, end=None, min_spread=None, limit=10, offset=0):
+        """
+        Finds arbitrage records with an indexed SQL query, newest first.
+        Takes the same filters as JsonlDataHandler.query.
+        """
+        conditions, params = [], []
+        for column, value in (("symbol = ?", symbol), ("min_exchange = ?", buy_exchange), ("max_exchange = ?", sell_exchange),
+                              ("datetime >= ?", to_text(start)), ("datetime < ?", to_text(end)), ("arbitrage_percentage >= ?", min_spread)):
+            if value is not None:
+                conditions.append(column)
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        self.flush()
+        with self.lock:
+            cursor = self.conn.execute(f"SELECT * FROM {self.tables[json_file]} {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                                       params + [-1 if limit is None else limit, offset])
+            columns = [column[0] for column in cursor.description][1:]
+            return [dict(zip(columns, row[1:])) for row in cursor]
+
+    def tail(self, json_file, count=10):
+        """
+        Returns the last records of a table, newest first. Price rows are grouped into snapshots.
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.cursor.execute(f"INSERT INTO {self.config_data.get('Database', 'DB_TABLE_SUCCESS')} (symbol, min_price, min_exchange, max_price, max_exchange, arbitrage_percentage, datetime) VALUES (?, ?, ?, ?, ?, ?, ?)", (data["symbol"], data['min_price'], data['min_exchange'], data['max_price'], data['max_exchange'], data['arbitrage_percentage'], timestamp))
-        self.conn.commit()
\ No newline at end of file
+        if json_file != "prices":
+            return self.query(json_file, limit=count)
+        self.flush()
+        records = []
+        with self.lock:
+            cursor = self.conn.execute(f"SELECT bid, ask, stale, exchange, symbol, datetime FROM {self.table_prices} ORDER BY id DESC")
+            for bid, ask, stale, exchange, symbol, timestamp in cursor:
+                if not records or records[-1]['symbol'] != symbol or records[-1]['datetime'] != timestamp:
+                    if len(records) == count:
+                        break
+                    records.append({'symbol': symbol, 'prices': {}, 'datetime': timestamp})
+                records[-1]['prices'][exchange] = [bid, ask, bool(stale)]
+            cursor.close()
+        for record in records:
+            record['prices'] = dict(reversed(list(record['prices'].items())))
+        return records
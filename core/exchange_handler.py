@@ -1,30 +1,250 @@
-import requests, logging
+import json, requests, logging
+from collections import namedtuple
+try:
+    # orjson decodes ticker responses several times faster; the standard library is used without it.
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+from .session_handler import get_session_pool
+from .metrics_handler import metrics
 
-def get_price_from_api(exchange, url):
+# stale marks the last good quote of an exchange that is currently failing or circuit-broken.
+Quote = namedtuple("Quote", ["bid", "ask", "stale"], defaults=[False])
+
+def as_quote(value):
     """
-    Attempts to fetch the price from the specified API URL.
-    Returns None in case of an error.
+    Converts a stored price to a Quote. Plain floats (a single last price) are used for both sides.
+    """
+    if isinstance(value, Quote):
+        return value
+    if isinstance(value, (list, tuple)):
+        return Quote(float(value[0]), float(value[1]), bool(value[2]) if len(value) > 2 else False)
+    return Quote(float(value), float(value))
+
+class ExchangeAdapter:
+    """
+    Base class of the exchange adapters. An adapter knows an exchange's symbol notation and how to
+    parse its ticker responses; adding a venue means registering a new adapter with register_adapter.
+    """
+    name = None
+    # Replaces the "-" of configured symbols, e.g. "" turns "BTC-USDT" into "BTCUSDT".
+    symbol_separator = "-"
+
+    def format_symbol(self, symbol):
+        """
+        Converts a configured symbol (e.g. "BTC-USDT") to the exchange's own notation.
+        """
+        return symbol.replace("-", self.symbol_separator)
+
+    def parse_quote(self, data):
+        """
+        Parses a decoded single-symbol ticker response into a Quote of the best bid and ask.
+        """
+        raise KeyError(f"No ticker parser for {self.name}")
+
+    def parse_bulk(self, data):
+        """
+        Parses a decoded all-symbol ticker response into Quotes keyed by the exchange's symbol notation.
+        """
+        raise KeyError(f"No bulk ticker parser for {self.name}")
+
+    def compile_url(self, template):
+        """
+        Precompiles a URL template with a SYMBOL placeholder for this exchange.
+        """
+        return UrlTemplate(self, template)
+
+class UrlTemplate:
+    """
+    A URL template split once around its SYMBOL placeholder, so building a URL is a concatenation.
+    """
+    __slots__ = ("adapter", "prefix", "suffix", "template")
+
+    def __init__(self, adapter, template):
+        self.adapter = adapter
+        self.template = template.strip()
+        self.prefix, _, self.suffix = self.template.partition("SYMBOL")
+
+    def build(self, symbol):
+        return self.prefix + self.adapter.format_symbol(symbol) + self.suffix
+
+ADAPTERS = {}
+EXCHANGES = []
+_EXCHANGE_NAMES = {}
+
+def register_adapter(cls):
+    """
+    Class decorator that registers an ExchangeAdapter under its name and adds it to EXCHANGES.
+    """
+    ADAPTERS[cls.name] = cls()
+    _EXCHANGE_NAMES[cls.name.lower()] = cls.name
+    if cls.name not in EXCHANGES:
+        EXCHANGES.append(cls.name)
+    return cls
+
+def get_adapter(exchange):
+    """
+    Returns the registered adapter of an exchange. Raises KeyError for unknown exchanges.
+    """
+    return ADAPTERS[exchange]
+
+@register_adapter
+class BinanceAdapter(ExchangeAdapter):
+    name = "Binance"
+    symbol_separator = ""
+
+    def parse_quote(self, data):
+        return Quote(float(data["bidPrice"]), float(data["askPrice"]))
+
+    def parse_bulk(self, data):
+        return {item["symbol"]: Quote(float(item["bidPrice"]), float(item["askPrice"])) for item in data if item.get("bidPrice") and item.get("askPrice")}
+
+@register_adapter
+class MexcAdapter(BinanceAdapter):
+    name = "Mexc"
+
+@register_adapter
+class KuCoinAdapter(ExchangeAdapter):
+    name = "KuCoin"
+
+    def parse_quote(self, data):
+        return Quote(float(data["data"]["bestBid"]), float(data["data"]["bestAsk"]))
+
+    def parse_bulk(self, data):
+        return {item["symbol"]: Quote(float(item["buy"]), float(item["sell"])) for item in data["data"]["ticker"] if item.get("buy") and item.get("sell")}
+
+@register_adapter
+class CoinbaseAdapter(ExchangeAdapter):
+    name = "Coinbase"
+
+    def parse_quote(self, data):
+        return Quote(float(data["bid"]), float(data["ask"]))
+
+@register_adapter
+class OKXAdapter(ExchangeAdapter):
+    name = "OKX"
+
+    def parse_quote(self, data):
+        return Quote(float(data["data"][0]["bidPx"]), float(data["data"][0]["askPx"]))
+
+    def parse_bulk(self, data):
+        return {item["instId"]: Quote(float(item["bidPx"]), float(item["askPx"])) for item in data["data"] if item.get("bidPx") and item.get("askPx")}
+
+@register_adapter
+class GateioAdapter(ExchangeAdapter):
+    name = "Gate.io"
+    symbol_separator = "_"
+
+    def parse_quote(self, data):
+        return Quote(float(data[0]["highest_bid"]), float(data[0]["lowest_ask"]))
+
+    def parse_bulk(self, data):
+        return {item["currency_pair"]: Quote(float(item["highest_bid"]), float(item["lowest_ask"])) for item in data if item.get("highest_bid") and item.get("lowest_ask")}
+
+@register_adapter
+class BingXAdapter(ExchangeAdapter):
+    name = "BingX"
+
+    def parse_quote(self, data):
+        return Quote(float(data["data"]["book_ticker"]["bid_price"]), float(data["data"]["book_ticker"]["ask_price"]))
+
+@register_adapter
+class BitgetAdapter(ExchangeAdapter):
+    name = "Bitget"
+    symbol_separator = ""
+
+    def parse_quote(self, data):
+        return Quote(float(data["data"][0]["bidPr"]), float(data["data"][0]["askPr"]))
+
+    def parse_bulk(self, data):
+        return {item["symbol"]: Quote(float(item["bidPr"]), float(item["askPr"])) for item in data["data"] if item.get("bidPr") and item.get("askPr")}
+
+def canonical_exchange(name):
+    """
+    Returns the canonical exchange name for a config option.
+    ConfigParser lowercases option names, so "okx" is mapped back to "OKX".
+    """
+    return _EXCHANGE_NAMES.get(name.lower(), name.capitalize())
+
+def format_symbol(exchange, symbol):
+    """
+    Converts a configured symbol (e.g. "BTC-USDT") to the exchange's own notation.
+    """
+    adapter = ADAPTERS.get(exchange)
+    return adapter.format_symbol(symbol) if adapter is not None else symbol
+
+def compile_api_urls(config):
+    """
+    Reads the enabled exchanges' URL templates from every [Exchange Details...] section once and
+    precompiles them with their adapters.
+
+    Returns:
+        dict: UrlTemplate per exchange.
+    """
+    templates = {}
+    for section in config.sections():
+        if not section.startswith("Exchange Details"):
+            continue
+        for option in config.options(section):
+            if option.find("_") != -1:
+                continue
+            exchange = canonical_exchange(option)
+            if exchange not in ADAPTERS:
+                logging.error(f"No exchange adapter registered for {exchange}")
+                continue
+            template = config.get(section, option)
+            if config.getboolean(section, exchange.upper() + "_STATUS") and template.strip():
+                templates[exchange] = get_adapter(exchange).compile_url(template)
+    return templates
+
+def get_price_from_api(exchange, url, timeout=None):
+    """
+    Attempts to fetch the best bid and ask from the specified API URL.
+    Returns a Quote, or None in case of an error.
+    A timeout in seconds overrides the session pool's default.
     """
     try:
-        response = requests.get(url, timeout=5)
-        data = response.json()
-
-        if exchange in ["Binance", "Mexc"]:
-            return float(data["price"])
-        elif exchange == "KuCoin":
-            return float(data["data"]["price"])
-        elif exchange == "Coinbase":
-            return float(data["price"])
-        elif exchange == "OKX":
-            return float(data["data"][0]["last"])
-        elif exchange == "Gate.io":
-            return float(data[0]["last"])
-        elif exchange == "BingX":
-            return float(data["data"]["book_ticker"]["ask_price"])  # Using ask price
-        elif exchange == "Bitget":
-            return float(data["data"][0]["askPr"])
+        with metrics.timed("arbitrage_request_seconds", exchange=exchange):
+            response = get_session_pool().get(url, **({"timeout": timeout} if timeout else {}))
+            return get_adapter(exchange).parse_quote(json_loads(response.content))
     except requests.exceptions.RequestException as e:
         logging.error(f"API request failed for {exchange}: {e}")
     except (KeyError, TypeError, ValueError) as e:
         logging.error(f"Failed to parse API response from {exchange}: {e}")
-    return None
\ No newline at end of file
+    metrics.counter("arbitrage_request_errors_total").inc(exchange=exchange)
+    return None
+
+def parse_quote(exchange, data):
+    """
+    Parses a single-symbol ticker response into a Quote of the best bid and ask.
+    """
+    return get_adapter(exchange).parse_quote(data)
+
+def parse_bulk_prices(exchange, data):
+    """
+    Parses an all-symbol ticker response into a dictionary of prices.
+
+    ARGS:
+        exchange (str): The exchange the response came from.
+        data (dict | list): The decoded JSON response.
+    Returns:
+        dict: Quotes keyed by the exchange's own symbol notation.
+    """
+    return get_adapter(exchange).parse_bulk(data)
+
+def get_all_prices_from_api(exchange, url, timeout=None):
+    """
+    Fetches every ticker of an exchange with a single bulk request.
+    Returns None in case of an error.
+    A timeout in seconds overrides the session pool's default.
+    """
+    try:
+        with metrics.timed("arbitrage_request_seconds", exchange=exchange):
+            response = get_session_pool().get(url, **({"timeout": timeout} if timeout else {}))
+            return get_adapter(exchange).parse_bulk(json_loads(response.content))
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Bulk API request failed for {exchange}: {e}")
+    except (KeyError, TypeError, ValueError) as e:
+        logging.error(f"Failed to parse bulk API response from {exchange}: {e}")
+    metrics.counter("arbitrage_request_errors_total").inc(exchange=exchange)
+    return None
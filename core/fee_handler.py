@@ -0,0 +1,45 @@
+from .exchange_handler import EXCHANGES, canonical_exchange
+
+class FeeTable:
+    """
+    Per-exchange taker and withdrawal fees, precomputed into price multipliers once at startup.
+
+    Buying on an exchange costs ask * buy_multiplier (taker fee plus the withdrawal needed to move the
+    coins to the selling venue); selling yields bid * sell_multiplier (taker fee).
+    """
+    def __init__(self, taker_fees=None, withdrawal_fees=None):
+        """
+        Initializes the FeeTable class.
+
+        Args:
+            taker_fees (dict): Taker fee percentage per exchange.
+            withdrawal_fees (dict): Withdrawal cost per exchange, as a percentage of the traded amount.
+        """
+        self.taker_fees = dict(taker_fees or {})
+        self.withdrawal_fees = dict(withdrawal_fees or {})
+        exchanges = set(EXCHANGES) | set(self.taker_fees) | set(self.withdrawal_fees)
+        self.buy_multipliers = {ex: (1 + self.taker_fees.get(ex, 0.0) / 100) * (1 + self.withdrawal_fees.get(ex, 0.0) / 100) for ex in exchanges}
+        self.sell_multipliers = {ex: 1 - self.taker_fees.get(ex, 0.0) / 100 for ex in exchanges}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a FeeTable from the <EXCHANGE>_TAKER and <EXCHANGE>_WITHDRAWAL options of the [Fees] section.
+        """
+        taker_fees, withdrawal_fees = {}, {}
+        if config.has_section("Fees"):
+            for option in config.options("Fees"):
+                exchange, _, kind = option.rpartition("_")
+                if kind == "taker":
+                    taker_fees[canonical_exchange(exchange)] = config.getfloat("Fees", option)
+                elif kind == "withdrawal":
+                    withdrawal_fees[canonical_exchange(exchange)] = config.getfloat("Fees", option)
+        return cls(taker_fees, withdrawal_fees)
+
+    def buy_multiplier(self, exchange):
+        return self.buy_multipliers.get(exchange, 1.0)
+
+    def sell_multiplier(self, exchange):
+        return self.sell_multipliers.get(exchange, 1.0)
+
+NO_FEES = FeeTable()
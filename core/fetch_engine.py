@@ -0,0 +1,190 @@
+import asyncio, functools, time, concurrent.futures
+from .exchange_handler import get_price_from_api
+from .health_handler import HealthRegistry
+from .quote_cache import QuoteCache
+
+class FetchEngine:
+    """
+    Sends every symbol x exchange request of a polling cycle in one concurrent asyncio batch.
+
+    The blocking HTTP calls run on a persistent worker pool, so a cycle takes about as long as
+    the slowest single response instead of the sum of them. Every request goes through its
+    exchange's circuit breaker and adaptive timeout, and may be hedged when it runs past the p95.
+    A hedge takes its own concurrency slots and rate budget like any other request, and is skipped
+    when neither is free. Each request also has a deadline of its exchange's timeout as a whole, retries
+    included; a request still running at the deadline is abandoned and counts as a failure, so one
+    degraded exchange can't hold up the cycle. Fetched quotes are written to the quote cache with the
+    time their request was sent.
+    """
+    def __init__(self, max_concurrency=32, exchange_concurrency=None, default_exchange_concurrency=8, health=None, quotes=None):
+        """
+        Initializes the FetchEngine class.
+
+        Args:
+            max_concurrency (int): Maximum number of requests in flight across all exchanges.
+            exchange_concurrency (dict): Per-exchange caps, keyed by exchange name.
+            default_exchange_concurrency (int): Cap used for exchanges missing from exchange_concurrency.
+            health (HealthRegistry): Circuit breakers and latency stats per exchange.
+            quotes (QuoteCache): Where fetched quotes are kept; also the source of last good quotes.
+        """
+        self.max_concurrency = max_concurrency
+        self.exchange_concurrency = exchange_concurrency or {}
+        self.default_exchange_concurrency = default_exchange_concurrency
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="fetch")
+        self.loop = asyncio.new_event_loop()
+        self.health = health or HealthRegistry()
+        self.quotes = quotes if quotes is not None else QuoteCache()
+        self.hedged = 0
+        self.expired = 0
+
+    @classmethod
+    def from_config(cls, config, quotes=None):
+        """
+        Creates a FetchEngine from the [Fetch Engine] section of the config.ini file.
+        Per-exchange caps are read from <EXCHANGE>_CONCURRENCY options.
+        """
+        section = "Fetch Engine"
+        health = HealthRegistry.from_config(config)
+        if not config.has_section(section):
+            return cls(health=health, quotes=quotes)
+        exchange_concurrency = {}
+        for option in config.options(section):
+            if option.endswith("_concurrency") and option != "exchange_concurrency":
+                exchange_concurrency[option[:-len("_concurrency")]] = config.getint(section, option)
+        return cls(max_concurrency=config.getint(section, 'MAX_CONCURRENCY', fallback=32),
+                   exchange_concurrency=exchange_concurrency,
+                   default_exchange_concurrency=config.getint(section, 'EXCHANGE_CONCURRENCY', fallback=8),
+                   health=health, quotes=quotes)
+
+    def _exchange_limit(self, exchange):
+        return self.exchange_concurrency.get(exchange.lower(), self.default_exchange_concurrency)
+
+    def _call(self, fetch_fn, exchange, url, timeout):
+        return asyncio.ensure_future(self.loop.run_in_executor(self.executor, functools.partial(fetch_fn, exchange, url, timeout=timeout)))
+
+    async def _try_hedge(self, fetch_fn, exchange, url, timeout, global_sem, exchange_sem, budget, bulk):
+        # A hedge is one more request to the exchange, so it needs free slots and budget right now.
+        if global_sem.locked() or exchange_sem.locked():
+            return None
+        if budget is not None and not budget.try_spend(exchange, bulk=bulk):
+            return None
+        # Neither semaphore is locked, so these acquire without waiting.
+        await global_sem.acquire()
+        await exchange_sem.acquire()
+        task = self._call(fetch_fn, exchange, url, timeout)
+        task.add_done_callback(lambda _: (global_sem.release(), exchange_sem.release()))
+        self.hedged += 1
+        return task
+
+    async def _fetch_one(self, fetch_fn, exchange, url, global_sem, exchange_sem, budget=None, bulk=False):
+        async with global_sem, exchange_sem:
+            health = self.health.get(exchange)
+            if not health.allow_request():
+                return None, None
+            timeout = health.timeout()
+            sent = time.time()
+            start = time.monotonic()
+            # The session retries connections and 5xx/429 responses, each with the full socket timeout,
+            # so the timeout also bounds the request as a whole.
+            deadline = start + timeout
+            tasks = [self._call(fetch_fn, exchange, url, timeout)]
+            hedge_delay = health.p95() if self.health.hedge else None
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    # The first request is past the p95 latency; race a duplicate against it.
+                    hedge = await self._try_hedge(fetch_fn, exchange, url, timeout, global_sem, exchange_sem, budget, bulk)
+                    if hedge is not None:
+                        tasks.append(hedge)
+            result = None
+            pending = set(tasks)
+            while pending and result is None:
+                done, pending = await asyncio.wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.expired += 1
+                    break
+                for task in done:
+                    if task.exception() is None and task.result() is not None:
+                        result = task.result()
+            # The loser or an expired request is dropped; one still queued on the worker pool is never sent.
+            for task in tasks:
+                task.cancel()
+            if result is None:
+                health.record_failure()
+            else:
+                health.record_success(time.monotonic() - start)
+            return result, sent
+
+    async def _fetch_batch(self, jobs, fetch_fn, budget=None, bulk=False):
+        global_sem = asyncio.Semaphore(self.max_concurrency)
+        exchange_sems = {}
+        tasks = []
+        for key, exchange, url, *job_fetch in jobs:
+            if exchange not in exchange_sems:
+                exchange_sems[exchange] = asyncio.Semaphore(self._exchange_limit(exchange))
+            job_fn, job_bulk = job_fetch if job_fetch else (fetch_fn, bulk)
+            tasks.append(self._fetch_one(job_fn, exchange, url, global_sem, exchange_sems[exchange], budget, job_bulk))
+        return await asyncio.gather(*tasks)
+
+    def run_batch(self, jobs, fetch_fn=get_price_from_api, budget=None, bulk=False):
+        """
+        Runs a batch of requests concurrently and waits for all of them.
+
+        Args:
+            jobs (list): (key, exchange, url) tuples, or (key, exchange, url, fetch_fn, bulk) for a job that
+                overrides fetch_fn and bulk, e.g. to send bulk and per-symbol requests in one batch.
+            fetch_fn (callable): Called as fetch_fn(exchange, url, timeout=seconds) on a worker thread.
+            budget (RateBudget): Charged for hedge requests; the jobs themselves are expected to be paid for.
+            bulk (bool): Whether the jobs are all-symbol requests, which weigh the bulk weight.
+        Returns:
+            list: (key, exchange, result, sent) tuples in the order of jobs; sent is when the request was
+            sent as a Unix timestamp, None if its circuit was open.
+        """
+        if not jobs:
+            return []
+        results = self.loop.run_until_complete(self._fetch_batch(jobs, fetch_fn, budget, bulk))
+        return [(job[0], job[1], result, sent) for job, (result, sent) in zip(jobs, results)]
+
+    def fetch_prices(self, api_urls, budget=None):
+        """
+        Fetches the prices of every symbol from every exchange in one batch.
+
+        Args:
+            api_urls (dict): Per-symbol API URLs, keyed by symbol, then by exchange.
+            budget (RateBudget): Charged for hedge requests.
+        Returns:
+            dict: Quotes keyed by symbol, then by exchange. A failed or circuit-broken request maps to
+            the exchange's last good quote marked stale, or to None if there is none.
+        """
+        jobs = [(symbol, exchange, url) for symbol, urls in api_urls.items() for exchange, url in urls.items()]
+        prices = {symbol: {} for symbol in api_urls}
+        for symbol, exchange, price, sent in self.run_batch(jobs, budget=budget):
+            prices[symbol][exchange] = self.resolve(symbol, exchange, price, sent)
+        return prices
+
+    def resolve(self, symbol, exchange, price, sent):
+        """
+        Handles the result of a per-symbol request: a quote is kept in the quote cache; a failure is
+        replaced by the exchange's last good quote marked stale, or None if there is none.
+
+        Returns:
+            Quote: The quote to evaluate.
+        """
+        if price is not None:
+            self.quotes.put(symbol, exchange, price, sent=sent)
+            return price
+        last_good = self.quotes.get(symbol, exchange)
+        return last_good.quote._replace(stale=True) if last_good is not None else None
+
+    def remember(self, symbol, exchange, quote, sent=None):
+        """
+        Records a quote obtained outside fetch_prices (e.g. from a bulk ticker) in the quote cache.
+        """
+        self.quotes.put(symbol, exchange, quote, source="bulk", sent=sent)
+
+    def close(self):
+        """
+        Shuts down the worker pool and the event loop.
+        """
+        self.executor.shutdown(wait=True)
+        self.loop.close()
@@ -0,0 +1,130 @@
+import time, threading
+from collections import deque
+
+class ExchangeHealth:
+    """
+    Circuit breaker and latency tracker for one exchange.
+
+    The breaker opens after `failure_threshold` consecutive failures or timeouts and rejects requests
+    for `open_seconds`. It then lets a single probe through (half-open): a success closes it again, a
+    failure reopens it. Timeouts adapt to the observed p95 latency.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=3, open_seconds=30.0, min_timeout=0.5, max_timeout=5.0, timeout_factor=2.0, window=100, min_samples=10):
+        """
+        Initializes the ExchangeHealth class.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker.
+            open_seconds (float): Seconds the breaker stays open before a probe is allowed.
+            min_timeout (float): Lower bound of the adaptive timeout.
+            max_timeout (float): Upper bound of the adaptive timeout, also used until enough samples exist.
+            timeout_factor (float): The timeout is p95 latency times this factor.
+            window (int): Number of recent latencies kept.
+            min_samples (int): Samples needed before the timeout adapts and hedging starts.
+        """
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        """
+        Returns True if a request may be sent now.
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+                self.probing = False
+            if self.state == self.HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
+            self.failures = 0
+            self.state = self.CLOSED
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+    def p95(self):
+        """
+        Returns the p95 of the recent latencies, or None without enough samples.
+        """
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def timeout(self):
+        """
+        Returns the request timeout: p95 latency times timeout_factor, clamped to [min_timeout, max_timeout].
+        """
+        p95 = self.p95()
+        if p95 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.timeout_factor))
+
+class HealthRegistry:
+    """
+    Holds the ExchangeHealth of every exchange, created on first use with shared settings.
+    """
+    def __init__(self, hedge=False, **settings):
+        """
+        Initializes the HealthRegistry class.
+
+        Args:
+            hedge (bool): Whether slow requests get a duplicate hedge request after the exchange's p95 latency.
+            settings: Keyword arguments for every ExchangeHealth.
+        """
+        self.hedge = hedge
+        self.settings = settings
+        self.exchanges = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a HealthRegistry from the [Health] section of the config.ini file.
+        """
+        section = "Health"
+        return cls(hedge=config.getboolean(section, 'HEDGE', fallback=False),
+                   failure_threshold=config.getint(section, 'FAILURE_THRESHOLD', fallback=3),
+                   open_seconds=config.getfloat(section, 'OPEN_SECONDS', fallback=30.0),
+                   min_timeout=config.getfloat(section, 'MIN_TIMEOUT', fallback=0.5),
+                   max_timeout=config.getfloat(section, 'MAX_TIMEOUT', fallback=5.0),
+                   timeout_factor=config.getfloat(section, 'TIMEOUT_FACTOR', fallback=2.0))
+
+    def get(self, exchange):
+        health = self.exchanges.get(exchange)
+        if health is None:
+            with self.lock:
+                health = self.exchanges.setdefault(exchange, ExchangeHealth(**self.settings))
+        return health
+
+    def status(self):
+        """
+        Returns {exchange: (state, p95 latency or None, current timeout)}.
+        """
+        return {exchange: (health.state, health.p95(), health.timeout()) for exchange, health in list(self.exchanges.items())}
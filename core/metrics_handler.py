@@ -0,0 +1,284 @@
+import time, logging, threading, contextlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+class Counter:
+    """
+    Monotonic counter, one value per label set.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def total(self):
+        return sum(self.values.values())
+
+    def render(self):
+        with self.lock:
+            return [f"{self.name}{_label_text(key)} {value}" for key, value in self.values.items()]
+
+class Gauge:
+    """
+    Point-in-time value, one per label set. Values can be set directly or read from a callback at scrape time.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+        self.callbacks = {}
+        self.lock = threading.Lock()
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[tuple(sorted(labels.items()))] = value
+
+    def set_function(self, fn, **labels):
+        with self.lock:
+            self.callbacks[tuple(sorted(labels.items()))] = fn
+
+    def value(self, **labels):
+        key = tuple(sorted(labels.items()))
+        if key in self.callbacks:
+            return self.callbacks[key]()
+        return self.values.get(key, 0)
+
+    def render(self):
+        with self.lock:
+            values = dict(self.values)
+            callbacks = dict(self.callbacks)
+        for key, fn in callbacks.items():
+            try:
+                values[key] = fn()
+            except Exception:
+                continue
+        return [f"{self.name}{_label_text(key)} {value}" for key, value in values.items()]
+
+class Histogram:
+    """
+    Latency histogram with cumulative buckets, one per label set.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            for n, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][n] += 1
+                    break
+            else:
+                series["counts"][-1] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def summary(self):
+        """
+        Returns (count, mean) over every label set.
+        """
+        with self.lock:
+            count = sum(series["count"] for series in self.series.values())
+            total = sum(series["sum"] for series in self.series.values())
+        return count, (total / count if count else 0.0)
+
+    def quantile(self, q):
+        """
+        Estimates a quantile over every label set from the bucket upper bounds.
+        """
+        with self.lock:
+            counts = [sum(series["counts"][n] for series in self.series.values()) for n in range(len(self.buckets) + 1)]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        running = 0
+        for n, count in enumerate(counts):
+            running += count
+            if running >= q * total:
+                return self.buckets[n] if n < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for key, series in self.series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_label_text(key + (('le', le),))} {cumulative}")
+                lines.append(f"{self.name}_sum{_label_text(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_label_text(key)} {series['count']}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Collects the bot's metrics and renders them in the Prometheus text format.
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, cls, name, help_text, *args):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, help_text, *args)
+            return self.metrics[name]
+
+    def counter(self, name, help_text=""):
+        return self._register(Counter, name, help_text)
+
+    def gauge(self, name, help_text=""):
+        return self._register(Gauge, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, buckets)
+
+    @contextlib.contextmanager
+    def timed(self, name, **labels):
+        """
+        Observes the duration of the with-block in the named histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+metrics.histogram("arbitrage_cycle_seconds", "Duration of a whole polling cycle.")
+metrics.histogram("arbitrage_fetch_seconds", "Duration of fetching the prices of a cycle.")
+metrics.histogram("arbitrage_request_seconds", "Duration of a single exchange request.")
+metrics.counter("arbitrage_request_errors_total", "Failed exchange requests.")
+metrics.histogram("arbitrage_evaluate_seconds", "Duration of evaluating the quotes of a cycle.")
+metrics.histogram("arbitrage_storage_seconds", "Duration of storage operations.")
+metrics.counter("arbitrage_storage_errors_total", "Failed storage operations.")
+metrics.histogram("arbitrage_notification_seconds", "Duration of sending a notification.")
+metrics.counter("arbitrage_notification_errors_total", "Failed notifications.")
+metrics.gauge("arbitrage_queue_depth", "Items waiting in the background queues.")
+metrics.counter("arbitrage_stale_quotes_total", "Quotes left out of evaluation for being past their maximum age.")
+metrics.gauge("arbitrage_quote_age_seconds", "Age of the oldest cached quote per exchange.")
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = metrics
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer:
+    """
+    Serves the metrics in the Prometheus text format on a local HTTP endpoint, and optionally logs
+    a one-line summary at a fixed interval.
+    """
+    def __init__(self, registry=metrics, host="127.0.0.1", port=9108, summary_interval=0):
+        """
+        Initializes the MetricsServer class.
+
+        Args:
+            registry (MetricsRegistry): The metrics to serve.
+            host (str): Address to bind; keep it on localhost.
+            port (int): Port to bind; 0 disables the endpoint.
+            summary_interval (float): Seconds between summary log lines; 0 disables them.
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.summary_interval = summary_interval
+        self.server = None
+        self.stop_event = threading.Event()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a MetricsServer from the [Metrics] section of the config.ini file.
+        """
+        section = "Metrics"
+        return cls(host=config.get(section, 'HOST', fallback='127.0.0.1'),
+                   port=config.getint(section, 'PORT', fallback=9108) if config.getboolean(section, 'ENABLED', fallback=False) else 0,
+                   summary_interval=config.getfloat(section, 'SUMMARY_INTERVAL', fallback=0))
+
+    def start(self):
+        """
+        Starts the HTTP endpoint and the summary logger in daemon threads. If the endpoint can't be
+        bound, e.g. because the port is in use, the error is logged and the bot runs without it.
+        """
+        if self.port:
+            handler = type("MetricsRequestHandler", (_MetricsRequestHandler,), {"registry": self.registry})
+            try:
+                self.server = ThreadingHTTPServer((self.host, self.port), handler)
+            except OSError as e:
+                logging.error(f"Metrics endpoint disabled, cannot listen on {self.host}:{self.port}: {e}")
+            else:
+                threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True).start()
+        if self.summary_interval > 0:
+            logging.getLogger("arbitrage.metrics").setLevel(logging.INFO)
+            threading.Thread(target=self._log_summaries, name="metrics-summary", daemon=True).start()
+
+    def summary(self):
+        """
+        Returns a one-line summary of the cycle, fetch, storage and notification metrics.
+        """
+        cycles, cycle_mean = self.registry.histogram("arbitrage_cycle_seconds").summary()
+        requests, request_mean = self.registry.histogram("arbitrage_request_seconds").summary()
+        depth = self.registry.gauge("arbitrage_queue_depth")
+        return (f"cycles={cycles} cycle_mean={cycle_mean * 1000:.1f}ms "
+                f"cycle_p99<={self.registry.histogram('arbitrage_cycle_seconds').quantile(0.99) * 1000:.0f}ms "
+                f"requests={requests} request_mean={request_mean * 1000:.1f}ms "
+                f"request_errors={self.registry.counter('arbitrage_request_errors_total').total()} "
+                f"storage_errors={self.registry.counter('arbitrage_storage_errors_total').total()} "
+                f"notification_errors={self.registry.counter('arbitrage_notification_errors_total').total()} "
+                f"writer_queue={depth.value(queue='writer')} notification_queue={depth.value(queue='notifications')}")
+
+    def _log_summaries(self):
+        while not self.stop_event.wait(self.summary_interval):
+            logging.getLogger("arbitrage.metrics").info(self.summary())
+
+    def stop(self):
+        self.stop_event.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,162 @@
+import time, queue, logging, threading, concurrent.futures
+from .arbitrage_handler import format_arbitrage_message
+from .rate_limiter import TokenBucket
+from .metrics_handler import metrics
+
+class NotificationDispatcher:
+    """
+    Sends arbitrage alerts off the polling loop.
+
+    Opportunities submitted during a cycle are coalesced into one message when the cycle ends. A
+    background worker hands each message to a small pool that sends it to every enabled channel,
+    each behind its own token bucket. An opportunity with the same (symbol, buy exchange, sell
+    exchange) is suppressed while its alert is on the way, and for `cooldown` seconds after it was
+    delivered to at least one channel. An alert that was dropped or failed everywhere starts no cooldown.
+    """
+    # Maximum message lengths accepted by the Telegram and Discord APIs.
+    MESSAGE_LIMITS = {"telegram": 4096, "discord": 2000}
+
+    def __init__(self, noti_handler, channels, cooldown=300.0, rates=None, workers=2, max_queue=100):
+        """
+        Initializes the NotificationDispatcher class and starts its worker thread.
+
+        Args:
+            noti_handler (NotiHandler): Sends the messages.
+            channels (list): Enabled channels, "telegram" and/or "discord".
+            cooldown (float): Seconds an alerted (symbol, buy exchange, sell exchange) stays suppressed.
+            rates (dict): (messages per second, burst) per channel.
+            workers (int): Size of the sending pool.
+            max_queue (int): Maximum number of messages waiting to be sent; newer messages are dropped beyond it.
+        """
+        rates = rates or {}
+        self.noti_handler = noti_handler
+        self.channels = list(channels)
+        self.cooldown = cooldown
+        self.buckets = {channel: TokenBucket(*rates.get(channel, (1.0, 1.0))) for channel in self.channels}
+        self.senders = {"telegram": noti_handler.telegram_send_message, "discord": noti_handler.discord_send_message}
+        self.pending = []
+        self.last_alert = {}
+        self.in_flight = set()
+        self.suppressed = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="notify")
+        self.thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_config(cls, noti_handler, config):
+        """
+        Creates a NotificationDispatcher from the [Telegram], [Discord] and [Arbitrage Settings] sections of the config.ini file.
+        """
+        channels = [channel for channel, section in (("telegram", "Telegram"), ("discord", "Discord"))
+                    if config.getboolean(section, 'NOTIFICATION_STATUS')]
+        rates = {"telegram": (config.getfloat('Telegram', 'RATE_LIMIT', fallback=1.0), config.getfloat('Telegram', 'BURST', fallback=3)),
+                 "discord": (config.getfloat('Discord', 'RATE_LIMIT', fallback=2.5), config.getfloat('Discord', 'BURST', fallback=5))}
+        return cls(noti_handler, channels, cooldown=config.getfloat('Arbitrage Settings', 'ALERT_COOLDOWN', fallback=300.0), rates=rates)
+
+    def submit(self, real_data):
+        """
+        Adds an opportunity to the current cycle unless it is still in its cooldown window.
+
+        Returns:
+            bool: True if the opportunity will be alerted.
+        """
+        key = (real_data["symbol"], real_data["min_exchange"], real_data["max_exchange"])
+        now = time.monotonic()
+        with self.lock:
+            if key in self.in_flight or now - self.last_alert.get(key, float("-inf")) < self.cooldown:
+                self.suppressed += 1
+                return False
+            self.in_flight.add(key)
+            self.pending.append((key, real_data))
+        return True
+
+    def end_cycle(self):
+        """
+        Coalesces the opportunities of the cycle into one message and queues it for sending.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, []
+            if not self.channels:
+                self.in_flight.difference_update(key for key, _ in pending)
+        if not pending or not self.channels:
+            return
+        try:
+            self.queue.put_nowait([(key, format_arbitrage_message(real_data)) for key, real_data in pending])
+        except queue.Full:
+            self.dropped += 1
+            self._finish(pending, set())
+            logging.error(f"Notification queue full, dropped {len(pending)} alerts")
+
+    def queue_depth(self):
+        """
+        Returns the number of messages waiting to be sent.
+        """
+        return self.queue.qsize()
+
+    def _chunks(self, alerts, limit):
+        # Yields (message, keys of the alerts in it).
+        chunk, keys = "", []
+        for key, alert in alerts:
+            text = alert if not chunk else "\n\n" + alert
+            if chunk and len(chunk) + len(text) > limit:
+                yield chunk, keys
+                chunk, keys, text = "", [], alert
+            chunk += text
+            keys.append(key)
+        if chunk:
+            yield chunk, keys
+
+    def _finish(self, alerts, delivered):
+        # Starts the cooldown of the delivered alerts; the others may alert again right away.
+        now = time.monotonic()
+        with self.lock:
+            for key, _ in alerts:
+                self.in_flight.discard(key)
+                if key in delivered:
+                    self.last_alert[key] = now
+
+    def _send(self, channel, message):
+        self.buckets[channel].acquire()
+        try:
+            with metrics.timed("arbitrage_notification_seconds", channel=channel):
+                sent = self.senders[channel](message)
+            if sent != True:
+                metrics.counter("arbitrage_notification_errors_total").inc(channel=channel)
+                logging.error(f"{channel.capitalize()} message failed")
+            return sent == True
+        except Exception as e:
+            metrics.counter("arbitrage_notification_errors_total").inc(channel=channel)
+            logging.error(f"{channel.capitalize()} message failed: {e}")
+            return False
+
+    def _run(self):
+        while True:
+            alerts = self.queue.get()
+            if alerts is None:
+                self.queue.task_done()
+                return
+            futures = {self.pool.submit(self._send, channel, message): keys
+                       for channel in self.channels
+                       for message, keys in self._chunks(alerts, self.MESSAGE_LIMITS[channel])}
+            concurrent.futures.wait(futures)
+            self._finish(alerts, {key for future, keys in futures.items() if future.result() for key in keys})
+            self.queue.task_done()
+
+    def drain(self):
+        """
+        Blocks until every queued message has been sent.
+        """
+        self.end_cycle()
+        self.queue.join()
+
+    def close(self):
+        """
+        Sends the remaining messages and stops the worker thread and the pool.
+        """
+        self.drain()
+        self.queue.put(None)
+        self.thread.join()
+        self.pool.shutdown(wait=True)
@@ -1,11 +1,11 @@
-import requests
 from config import read_config
+from .session_handler import get_session_pool
 
 class NotiHandler:
     """
     A class to handle notifications via Telegram.
     """
-    def __init__(self):
+    def __init__(self, config=None):
         """
         Initializes the NotiHandler class.
 
@@ -13,10 +13,11 @@ class NotiHandler:
 
         :param config: The configuration read from the config.ini file
         """
-        self.config_data = read_config()
+        self.config_data = config if config is not None else read_config()
         self.bot_token = self.config_data.get('Telegram', 'TELEGRAM_BOT_TOKEN')
         self.chat_id = self.config_data.get('Telegram', 'TELEGRAM_CHAT_ID')
         self.webhook_url = self.config_data.get('Discord', 'DISCORD_WEBHOOK_URL')
+        self.session_pool = get_session_pool()
         
     def telegram_send_message(self, bot_message):
         """
@@ -35,7 +36,7 @@ class NotiHandler:
             'text': bot_message
         }
 
-        response = requests.post(send_text, params=PARAMS)
+        response = self.session_pool.post(send_text, params=PARAMS)
 
         if response.status_code != 200:
             return False
@@ -48,7 +49,7 @@ class NotiHandler:
         If there are no updates, returns None.
         """
         url = f"https://api.telegram.org/bot{self.bot_token}/getUpdates"
-        response = requests.get(url)
+        response = self.session_pool.get(url)
         data = response.json()
         if 'result' not in data or len(data['result']) == 0:
             return None
@@ -80,7 +81,7 @@ class NotiHandler:
             "content": bot_message,
             "username": "Arbitrage Bot"
         }
-        response = requests.post(self.webhook_url, json=data)
+        response = self.session_pool.post(self.webhook_url, json=data)
         if response.status_code != 204:
             return False
         else :
@@ -0,0 +1,188 @@
+import os, json, queue, datetime, threading, logging
+from .metrics_handler import metrics
+
+_FLUSH = "flush"
+_STOP = "stop"
+
+class PersistenceWriter:
+    """
+    Moves storage off the polling loop. Inserts are put on a bounded queue and applied to the
+    data handler by a dedicated writer thread, which flushes the handler once per polling cycle.
+
+    When the queue is full, the backpressure policy decides what happens:
+        block        - the polling loop waits for the writer.
+        drop_oldest  - the oldest queued record is discarded; flush and stop markers are kept.
+        spill        - the record is appended to a spill file and written once the queue has drained.
+    """
+    POLICIES = ("block", "drop_oldest", "spill")
+
+    def __init__(self, db_handler, max_queue=10000, policy="block", spill_path=None):
+        """
+        Initializes the PersistenceWriter class and starts the writer thread.
+
+        Args:
+            db_handler: The data handler the records are written to.
+            max_queue (int): Maximum number of queued records.
+            policy (str): Backpressure policy, one of POLICIES.
+            spill_path (str): Spill file used by the "spill" policy.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown write queue policy: {policy}")
+        if policy == "spill" and not spill_path:
+            raise ValueError("The spill policy requires a spill_path")
+        self.db_handler = db_handler
+        self.policy = policy
+        self.spill_path = spill_path
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.spill_lock = threading.Lock()
+        self.dropped = 0
+        self.spilled = 0
+        self.thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_config(cls, db_handler, config):
+        """
+        Creates a PersistenceWriter from the WRITE_QUEUE_* options of the [Database] section.
+        """
+        spill_path = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                  config.get('Database', 'MAIN_FOLDER'), "spill.jsonl")
+        return cls(db_handler,
+                   max_queue=config.getint('Database', 'WRITE_QUEUE_SIZE', fallback=10000),
+                   policy=config.get('Database', 'WRITE_QUEUE_POLICY', fallback='block').strip().lower(),
+                   spill_path=spill_path)
+
+    def insert_data(self, data):
+        """
+        Queues arbitrage data for the writer thread.
+        """
+        self._put(("insert_data", [dict(data)], self._timestamp()))
+
+    def insert_prices(self, prices, symbol):
+        """
+        Queues prices for the writer thread.
+        """
+        self._put(("insert_prices", [dict(prices), symbol], self._timestamp()))
+
+    def insert_success_data(self, data):
+        """
+        Queues successful arbitrage data for the writer thread.
+        """
+        self._put(("insert_success_data", [dict(data)], self._timestamp()))
+
+    def end_cycle(self):
+        """
+        Marks the end of a polling cycle; the writer flushes everything queued before it in one go.
+        """
+        self.queue.put(_FLUSH)
+
+    def queue_depth(self):
+        """
+        Returns the number of queued items.
+        """
+        return self.queue.qsize()
+
+    def _timestamp(self):
+        return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _put(self, item):
+        if self.policy == "block":
+            self.queue.put(item)
+            return
+        try:
+            self.queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        if self.policy == "spill":
+            with self.spill_lock:
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(item) + "\n")
+                self.spilled += 1
+            return
+        # The oldest record makes room in place; flush and stop markers are never evicted, or a
+        # flush() or close() waiting on them would hang.
+        with self.queue.mutex:
+            queued = self.queue.queue
+            if len(queued) >= self.queue.maxsize:
+                for n, oldest in enumerate(queued):
+                    if oldest not in (_FLUSH, _STOP):
+                        del queued[n]
+                        queued.append(item)
+                        self.dropped += 1
+                        return
+        # The writer made room meanwhile, or only markers are queued; wait for the writer to take one.
+        self.queue.put(item)
+
+    def _apply(self, item):
+        method, args, timestamp = item
+        try:
+            with metrics.timed("arbitrage_storage_seconds", operation=method):
+                getattr(self.db_handler, method)(*args, timestamp=timestamp)
+        except Exception as e:
+            metrics.counter("arbitrage_storage_errors_total").inc(operation=method)
+            logging.error(f"Persistence writer failed on {method}: {e}")
+
+    def _flush(self):
+        try:
+            with metrics.timed("arbitrage_storage_seconds", operation="flush"):
+                self.db_handler.flush()
+        except Exception as e:
+            metrics.counter("arbitrage_storage_errors_total").inc(operation="flush")
+            logging.error(f"Persistence writer flush failed: {e}")
+
+    def _replay_spill(self):
+        with self.spill_lock:
+            if not self.spill_path or not os.path.exists(self.spill_path):
+                return
+            replay_path = self.spill_path + ".replay"
+            os.replace(self.spill_path, replay_path)
+        with open(replay_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    self._apply(json.loads(line))
+                except ValueError:
+                    continue
+        self._flush()
+        os.remove(replay_path)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            flush = False
+            for item in batch:
+                if item == _STOP:
+                    stop = flush = True
+                elif item == _FLUSH:
+                    flush = True
+                else:
+                    self._apply(item)
+            if flush:
+                self._flush()
+            if self.queue.empty():
+                self._replay_spill()
+            for _ in batch:
+                self.queue.task_done()
+
+    def drain(self):
+        """
+        Blocks until every queued record, including spilled ones, has been written and flushed.
+        """
+        self.end_cycle()
+        self.queue.join()
+
+    def close(self):
+        """
+        Drains the queue, stops the writer thread and closes the data handler.
+        """
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.queue.join()
+            self.thread.join()
+        self.db_handler.close()
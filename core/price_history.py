@@ -0,0 +1,310 @@
+import os, bisect, datetime, threading
+import numpy as np
+from .exchange_handler import as_quote
+
+COLUMNS = ("bid", "ask", "time")
+DTYPE = np.dtype("<f8")
+
+class PriceHistoryStore:
+    """
+    Columnar price history. Each (symbol, exchange) keeps fixed-width float64 columns of time, bid and
+    ask, split into time-partitioned chunk files:
+
+        <folder>/<symbol>/<exchange>/<chunk start>.time|.bid|.ask
+
+    Chunk files are raw little-endian arrays, so they are memory-mapped and sliced as zero-copy NumPy
+    views. The chunk start times of each series form a sparse time index: a range query opens only the
+    chunks that overlap it and finds its rows with a binary search on the time column. Rows of a chunk are
+    in time order unless older snapshots were appended late (e.g. replayed from the writer's spill file);
+    such chunks are filtered with a mask instead.
+    """
+    def __init__(self, folder, chunk_seconds=3600):
+        """
+        Initializes the PriceHistoryStore class.
+
+        Args:
+            folder (str): Root folder of the history.
+            chunk_seconds (int): Time span of one chunk.
+        """
+        self.folder = folder
+        self.chunk_seconds = int(chunk_seconds)
+        self.index = {}
+        self.pending = {}
+        self.ordered = {}
+        self.lock = threading.Lock()
+        self._timestamp = (None, 0.0)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a PriceHistoryStore from HISTORY_FOLDER and HISTORY_CHUNK_HOURS in the [Database] section,
+        placed inside MAIN_FOLDER.
+        """
+        folder = os.path.join(os.path.dirname(os.path.dirname(__file__)), config.get('Database', 'MAIN_FOLDER'),
+                              config.get('Database', 'HISTORY_FOLDER', fallback='history'))
+        return cls(folder, config.getfloat('Database', 'HISTORY_CHUNK_HOURS', fallback=1) * 3600)
+
+    def create_files(self):
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _seconds(self, timestamp):
+        if timestamp is None:
+            return datetime.datetime.now().timestamp()
+        # Every quote of a snapshot shares one timestamp string, so the last parse is cached.
+        if self._timestamp[0] != timestamp:
+            self._timestamp = (timestamp, datetime.datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").timestamp())
+        return self._timestamp[1]
+
+    def insert_prices(self, prices, symbol, timestamp=None):
+        """
+        Queues a snapshot's quotes for the next flush. Failed and stale quotes are not stored; a stale
+        quote only repeats the exchange's last good one.
+        Args:
+            prices (dict): Quotes from different exchanges.
+            symbol (str): The symbol the prices belong to.
+            timestamp (str): When the prices were fetched. Defaults to now.
+        """
+        seconds = self._seconds(timestamp)
+        chunk = int(seconds // self.chunk_seconds * self.chunk_seconds)
+        with self.lock:
+            for exchange, price in prices.items():
+                if price is None:
+                    continue
+                quote = as_quote(price)
+                if quote.stale:
+                    continue
+                rows = self.pending.setdefault((symbol, exchange, chunk), ([], [], []))
+                rows[0].append(quote.bid)
+                rows[1].append(quote.ask)
+                rows[2].append(seconds)
+
+    def flush(self):
+        """
+        Appends the queued rows to their chunk files, one write per column and chunk.
+        The time column is written last, so readers never see a time without its prices. A crash between
+        the column writes leaves some columns longer than others; before appending, every column is cut
+        back to the rows they all have, so the rows stay aligned.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for (symbol, exchange, chunk), columns in pending.items():
+            path = self._series_path(symbol, exchange)
+            os.makedirs(path, exist_ok=True)
+            files = [os.path.join(path, f"{chunk}.{name}") for name in COLUMNS]
+            sizes = [os.path.getsize(file) if os.path.exists(file) else 0 for file in files]
+            common = min(sizes) // DTYPE.itemsize * DTYPE.itemsize
+            for file, size, values in zip(files, sizes, columns):
+                with open(file, 'ab') as f:
+                    if size != common:
+                        f.truncate(common)
+                    f.write(np.asarray(values, dtype=DTYPE).tobytes())
+            chunks = self.index.get((symbol, exchange))
+            if chunks is not None and chunk not in chunks:
+                bisect.insort(chunks, chunk)
+
+    def close(self):
+        self.flush()
+
+    def _series_path(self, symbol, exchange):
+        return os.path.join(self.folder, symbol, exchange)
+
+    def symbols(self):
+        """
+        Returns the symbols with recorded history.
+        """
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(name for name in os.listdir(self.folder) if os.path.isdir(os.path.join(self.folder, name)))
+
+    def exchanges(self, symbol):
+        """
+        Returns the exchanges with recorded history for a symbol.
+        """
+        path = os.path.join(self.folder, symbol)
+        return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+    def chunks(self, symbol, exchange):
+        """
+        Returns the sorted chunk start times of a series; the sparse time index.
+        """
+        key = (symbol, exchange)
+        if key not in self.index:
+            path = self._series_path(symbol, exchange)
+            names = os.listdir(path) if os.path.isdir(path) else []
+            self.index[key] = sorted({int(name.split(".")[0]) for name in names if name.endswith(".time")})
+        return self.index[key]
+
+    def _load_chunk(self, symbol, exchange, chunk):
+        path = self._series_path(symbol, exchange)
+        files = [os.path.join(path, f"{chunk}.{name}") for name in COLUMNS]
+        rows = min(os.path.getsize(file) for file in files) // DTYPE.itemsize
+        if not rows:
+            return None
+        bid, ask, time = (np.memmap(file, dtype=DTYPE, mode='r', shape=(rows,)) for file in files)
+        return time, bid, ask
+
+    def _is_ordered(self, key, time):
+        # Only rows appended since the last check are compared, so repeated queries stay cheap.
+        rows, ordered = self.ordered.get(key, (0, True))
+        if rows > len(time):
+            rows, ordered = 0, True
+        if ordered and len(time) > rows:
+            new = time[max(rows - 1, 0):]
+            ordered = bool(np.all(new[1:] >= new[:-1]))
+        self.ordered[key] = (len(time), ordered)
+        return ordered
+
+    def iter_chunks(self, symbol, exchange, start=None, end=None):
+        """
+        Yields (time, bid, ask) zero-copy views of every chunk overlapping [start, end), trimmed to the range.
+        Chunks whose rows are out of time order yield copies of the matching rows instead.
+
+        Args:
+            symbol (str): The symbol, e.g. "ETH-USDT".
+            exchange (str): The exchange, e.g. "Binance".
+            start (float): Range start as a Unix timestamp; None reads from the beginning.
+            end (float): Range end as a Unix timestamp; None reads to the end.
+        """
+        chunks = self.chunks(symbol, exchange)
+        first = 0 if start is None else max(bisect.bisect_right(chunks, start) - 1, 0)
+        last = len(chunks) if end is None else bisect.bisect_left(chunks, end)
+        for chunk in chunks[first:last]:
+            columns = self._load_chunk(symbol, exchange, chunk)
+            if columns is None:
+                continue
+            time = columns[0]
+            if not self._is_ordered((symbol, exchange, chunk), time):
+                mask = np.ones(len(time), dtype=bool)
+                if start is not None:
+                    mask &= time >= start
+                if end is not None:
+                    mask &= time < end
+                if mask.any():
+                    yield tuple(column[mask] for column in columns)
+                continue
+            lo = 0 if start is None else int(np.searchsorted(time, start, side='left'))
+            hi = len(time) if end is None else int(np.searchsorted(time, end, side='left'))
+            if lo < hi:
+                yield tuple(column[lo:hi] for column in columns)
+
+    def query(self, symbol, exchanges=None, start=None, end=None):
+        """
+        Reads the history of a symbol on several exchanges, e.g. ETH-USDT on Binance and OKX over the last 24h:
+
+            store.query("ETH-USDT", ["Binance", "OKX"], start=time.time() - 86400)
+
+        Returns:
+            dict: (time, bid, ask) arrays per exchange. A range within one chunk is returned as views;
+            ranges spanning several chunks are concatenated.
+        """
+        result = {}
+        for exchange in exchanges or self.exchanges(symbol):
+            parts = list(self.iter_chunks(symbol, exchange, start, end))
+            if len(parts) == 1:
+                result[exchange] = parts[0]
+            elif parts:
+                result[exchange] = tuple(np.concatenate(column) for column in zip(*parts))
+            else:
+                result[exchange] = tuple(np.empty(0, dtype=DTYPE) for _ in COLUMNS)
+        return result
+
+    def _chunk_records(self, symbol, exchanges, chunk):
+        parts = []
+        for exchange in exchanges:
+            columns = self._load_chunk(symbol, exchange, chunk) if chunk in self.chunks(symbol, exchange) else None
+            if columns is not None:
+                parts.append((exchange, columns))
+        if not parts:
+            return
+        times = np.concatenate([columns[0] for _, columns in parts])
+        bids = np.concatenate([columns[1] for _, columns in parts])
+        asks = np.concatenate([columns[2] for _, columns in parts])
+        names = np.concatenate([np.full(len(columns[0]), n) for n, (_, columns) in enumerate(parts)])
+        order = np.argsort(times, kind='stable')
+        record = None
+        for t, n, bid, ask in zip(times[order].tolist(), names[order].tolist(), bids[order].tolist(), asks[order].tolist()):
+            exchange = parts[n][0]
+            if record is None or record[0] != t or exchange in record[1]['prices']:
+                if record is not None:
+                    yield record[1]
+                record = (t, {'symbol': symbol, 'prices': {},
+                              'datetime': datetime.datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S")})
+            record[1]['prices'][exchange] = [bid, ask]
+        if record is not None:
+            yield record[1]
+
+    def _symbol_chunks(self, symbol):
+        exchanges = self.exchanges(symbol)
+        return exchanges, sorted({chunk for exchange in exchanges for chunk in self.chunks(symbol, exchange)})
+
+    def iter_records(self, json_file="prices"):
+        """
+        Yields the history as price snapshots, {"symbol", "prices": {exchange: [bid, ask]}, "datetime"},
+        symbol by symbol and chunk by chunk in time order, like the other backends' price logs.
+        """
+        if json_file != "prices":
+            return
+        self.flush()
+        for symbol in self.symbols():
+            exchanges, chunks = self._symbol_chunks(symbol)
+            for chunk in chunks:
+                yield from self._chunk_records(symbol, exchanges, chunk)
+
+    def tail(self, count=10):
+        """
+        Returns the last snapshots over all symbols, newest first, reading only each symbol's latest chunks.
+        """
+        self.flush()
+        records = []
+        for symbol in self.symbols():
+            exchanges, chunks = self._symbol_chunks(symbol)
+            found = []
+            for chunk in reversed(chunks):
+                found = list(self._chunk_records(symbol, exchanges, chunk)) + found
+                if len(found) >= count:
+                    break
+            records.extend(found[-count:])
+        records.sort(key=lambda record: record['datetime'], reverse=True)
+        return records[:count]
+
+class PriceHistoryHandler:
+    """
+    Wraps a data handler so prices go to a PriceHistoryStore, while arbitrage and success records stay
+    in the wrapped backend. Every other method is forwarded to the wrapped handler.
+    """
+    def __init__(self, handler, history):
+        self.handler = handler
+        self.history = history
+
+    def __getattr__(self, name):
+        return getattr(self.handler, name)
+
+    def create_files(self):
+        self.handler.create_files()
+        self.history.create_files()
+
+    def insert_prices(self, prices, symbol, timestamp=None):
+        self.history.insert_prices(prices, symbol, timestamp=timestamp)
+
+    def flush(self):
+        self.handler.flush()
+        self.history.flush()
+
+    def close(self):
+        self.handler.close()
+        self.history.close()
+
+    def iter_records(self, json_file):
+        if json_file == "prices":
+            return self.history.iter_records(json_file)
+        return self.handler.iter_records(json_file)
+
+    def tail(self, json_file, count=10):
+        if json_file == "prices":
+            return self.history.tail(count)
+        return self.handler.tail(json_file, count)
+
+    def fetch_all_data(self, json_file):
+        if json_file == "prices":
+            return {n: record for n, record in enumerate(self.history.iter_records(json_file))}
+        return self.handler.fetch_all_data(json_file)
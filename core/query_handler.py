@@ -0,0 +1,200 @@
+import os, json, datetime, threading
+import numpy as np
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def to_text(value):
+    """
+    Converts a time filter (datetime or "YYYY-MM-DD HH:MM:SS" string) to the stored datetime text.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime(TIME_FORMAT)
+
+def to_epoch(value):
+    """
+    Converts a time filter (datetime or "YYYY-MM-DD HH:MM:SS" string) to a Unix timestamp.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.datetime.strptime(value, TIME_FORMAT)
+    return value.timestamp()
+
+def match_record(record, symbol=None, buy_exchange=None, sell_exchange=None, start=None, end=None, min_spread=None):
+    """
+    Checks an arbitrage record against the query filters. start is inclusive, end exclusive.
+    """
+    return ((symbol is None or record['symbol'] == symbol)
+            and (buy_exchange is None or record['min_exchange'] == buy_exchange)
+            and (sell_exchange is None or record['max_exchange'] == sell_exchange)
+            and (start is None or record['datetime'] >= to_text(start))
+            and (end is None or record['datetime'] < to_text(end))
+            and (min_spread is None or record['arbitrage_percentage'] >= min_spread))
+
+def iter_pages(db_handler, json_file, page_size=100, **filters):
+    """
+    Yields the matching records of an arbitrage log page by page, newest first.
+
+    Args:
+        db_handler: Any data handler with a query method.
+        json_file (str): "arbitrage" or "success".
+        page_size (int): Records per page.
+        **filters: symbol, buy_exchange, sell_exchange, start, end and min_spread, as for query.
+    """
+    offset = 0
+    while True:
+        page = db_handler.query(json_file, limit=page_size, offset=offset, **filters)
+        if not page:
+            return
+        yield page
+        offset += len(page)
+
+class LogIndex:
+    """
+    Maintained binary index of a JSON Lines arbitrage log, stored next to it as <log>.idx with the
+    symbol and exchange names in <log>.keys.
+
+    Every record gets one fixed-width entry: its byte offset and length in the log, the symbol and
+    exchange ids, its time and its spread. Queries filter the memory-mapped entries with NumPy and then
+    read only the matching lines, so a tail or a filtered lookup never scans the log itself. Records
+    are normally appended in time order, so a time range is found by binary search. Once an older
+    record follows a newer one, e.g. a spilled record replayed after a backlog, time ranges are
+    filtered with the other columns instead.
+    """
+    DTYPE = np.dtype([('offset', '<i8'), ('length', '<i4'), ('symbol', '<i4'), ('buy', '<i2'), ('sell', '<i2'),
+                      ('time', '<f8'), ('spread', '<f8')])
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.index_path = log_path + ".idx"
+        self.keys_path = log_path + ".keys"
+        self.keys = []
+        self.ids = {}
+        self.pending = []
+        self.index_file = None
+        self.keys_file = None
+        self.lock = threading.Lock()
+        self._timestamp = (None, 0.0)
+        self.sorted = True
+        self.last_time = float("-inf")
+
+    def open(self):
+        """
+        Loads the index and brings it up to date with the log: entries past the end of the log are
+        dropped and records appended since the last run (or before the index existed) are indexed.
+        """
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        key = json.loads(line)
+                        self.ids[key] = len(self.keys)
+                        self.keys.append(key)
+            # Rewrite the keys file so a torn last name is dropped.
+            with open(self.keys_path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(key) + "\n" for key in self.keys)
+        log_size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+        index_size = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+        count = index_size // self.DTYPE.itemsize
+        entries = np.memmap(self.index_path, dtype=self.DTYPE, mode='r', shape=(count,)) if count else np.empty(0, dtype=self.DTYPE)
+        # A crash can leave a torn entry, or entries for lines that never reached the log.
+        while count and entries['offset'][count - 1] + entries['length'][count - 1] > log_size:
+            count -= 1
+        covered = int(entries['offset'][count - 1] + entries['length'][count - 1]) if count else 0
+        if count:
+            times = entries['time'][:count]
+            self.sorted = bool(np.all(times[1:] >= times[:-1]))
+            self.last_time = float(times[-1])
+        del entries
+        if index_size != count * self.DTYPE.itemsize:
+            with open(self.index_path, 'ab') as f:
+                f.truncate(count * self.DTYPE.itemsize)
+        self.index_file = open(self.index_path, 'ab')
+        self.keys_file = open(self.keys_path, 'a', encoding='utf-8')
+        if covered < log_size:
+            with open(self.log_path, 'rb') as f:
+                f.seek(covered)
+                offset = covered
+                for line in f:
+                    if line.endswith(b"\n"):
+                        try:
+                            self.add(offset, len(line), json.loads(line))
+                        except (ValueError, KeyError, TypeError):
+                            pass
+                    offset += len(line)
+            self.flush()
+
+    def _id(self, name):
+        if name not in self.ids:
+            self.ids[name] = len(self.keys)
+            self.keys.append(name)
+            self.keys_file.write(json.dumps(name) + "\n")
+        return self.ids[name]
+
+    def add(self, offset, length, record):
+        """
+        Queues the index entry of a record written at offset with the given byte length.
+        """
+        with self.lock:
+            # Records of one cycle share a timestamp, so the last parse is cached.
+            if self._timestamp[0] != record['datetime']:
+                self._timestamp = (record['datetime'], to_epoch(record['datetime']))
+            if self._timestamp[1] < self.last_time:
+                self.sorted = False
+            self.last_time = self._timestamp[1]
+            self.pending.append((offset, length, self._id(record['symbol']), self._id(record['min_exchange']),
+                                 self._id(record['max_exchange']), self._timestamp[1], float(record['arbitrage_percentage'])))
+
+    def flush(self):
+        """
+        Writes the queued entries. The index can always be rebuilt from the log, so it is not fsynced.
+        """
+        with self.lock:
+            if self.pending:
+                self.index_file.write(np.array(self.pending, dtype=self.DTYPE).tobytes())
+                self.pending = []
+            self.keys_file.flush()
+            self.index_file.flush()
+
+    def close(self):
+        self.flush()
+        self.index_file.close()
+        self.keys_file.close()
+
+    def select(self, symbol=None, buy_exchange=None, sell_exchange=None, start=None, end=None, min_spread=None, limit=10, offset=0):
+        """
+        Finds the matching records, newest first.
+
+        Returns:
+            list: (offset, length) of each matching line in the log.
+        """
+        self.flush()
+        ids = []
+        for name in (symbol, buy_exchange, sell_exchange):
+            if name is not None and name not in self.ids:
+                return []
+            ids.append(None if name is None else self.ids[name])
+        if not os.path.getsize(self.index_path):
+            return []
+        entries = np.memmap(self.index_path, dtype=self.DTYPE, mode='r')
+        times = entries['time']
+        if self.sorted:
+            lo = 0 if start is None else int(np.searchsorted(times, to_epoch(start), side='left'))
+            hi = len(entries) if end is None else int(np.searchsorted(times, to_epoch(end), side='left'))
+            window = entries[lo:hi]
+            mask = np.ones(len(window), dtype=bool)
+        else:
+            window = entries
+            mask = np.ones(len(window), dtype=bool)
+            if start is not None:
+                mask &= times >= to_epoch(start)
+            if end is not None:
+                mask &= times < to_epoch(end)
+        for field, value in zip(('symbol', 'buy', 'sell'), ids):
+            if value is not None:
+                mask &= window[field] == value
+        if min_spread is not None:
+            mask &= window['spread'] >= min_spread
+        matches = np.flatnonzero(mask)[::-1][offset:offset + limit] if limit is not None else np.flatnonzero(mask)[::-1][offset:]
+        return [(int(window['offset'][n]), int(window['length'][n])) for n in matches]
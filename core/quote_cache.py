@@ -0,0 +1,158 @@
+import time, threading
+from collections import namedtuple
+from .exchange_handler import canonical_exchange
+from .metrics_handler import metrics
+
+CachedQuote = namedtuple("CachedQuote", ["quote", "exchange_time", "received", "sent", "source"])
+
+class QuoteCache:
+    """
+    Latest quote per (symbol, exchange) with its freshness: the exchange's own timestamp when the feed
+    provides one, when the request was sent, when the quote was received, and its source ("rest",
+    "bulk" or "stream").
+
+    A quote's age counts from the exchange timestamp, or else from when its request was sent, so a
+    response that took 4.9 s is already 4.9 s old when it arrives. Quotes past their exchange's maximum
+    age are handed to the evaluator marked stale: they are still stored and shown, but never used as an
+    arbitrage leg. WebSocket feeds only push changes, so a quiet book is not outdated; streamed quotes
+    get the longer stream_max_age. Entries not refreshed within ttl seconds are evicted.
+    """
+    def __init__(self, ttl=300.0, max_ages=None, default_max_age=3.0, stream_max_age=60.0, clock=time.time):
+        """
+        Initializes the QuoteCache class.
+
+        Args:
+            ttl (float): Seconds after which an entry that was not refreshed is evicted.
+            max_ages (dict): Maximum quote age in seconds per exchange.
+            default_max_age (float): Maximum quote age for exchanges missing from max_ages.
+            stream_max_age (float): Maximum age of streamed quotes.
+            clock (callable): Wall clock in Unix seconds, comparable to exchange timestamps.
+        """
+        self.ttl = ttl
+        self.max_ages = dict(max_ages or {})
+        self.default_max_age = default_max_age
+        self.stream_max_age = stream_max_age
+        self.clock = clock
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.last_evict = clock()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a QuoteCache from the [Quote Cache] section: TTL, MAX_AGE and STREAM_MAX_AGE in seconds,
+        and <EXCHANGE>_MAX_AGE to override the maximum age of one exchange.
+        """
+        section = "Quote Cache"
+        max_ages = {}
+        if config.has_section(section):
+            for option in config.options(section):
+                if option.endswith("_max_age") and option != "stream_max_age":
+                    max_ages[canonical_exchange(option[:-len("_max_age")])] = config.getfloat(section, option)
+        return cls(ttl=config.getfloat(section, 'TTL', fallback=300.0), max_ages=max_ages,
+                   default_max_age=config.getfloat(section, 'MAX_AGE', fallback=3.0),
+                   stream_max_age=config.getfloat(section, 'STREAM_MAX_AGE', fallback=60.0))
+
+    def max_age(self, exchange, source="rest"):
+        if source == "stream":
+            return self.stream_max_age
+        return self.max_ages.get(exchange, self.default_max_age)
+
+    def put(self, symbol, exchange, quote, source="rest", sent=None, exchange_time=None):
+        """
+        Stores the latest quote of a symbol on an exchange.
+
+        Args:
+            quote (Quote): The quote.
+            source (str): Where it came from: "rest", "bulk" or "stream".
+            sent (float): When its request was sent, as a Unix timestamp; None for pushed quotes.
+            exchange_time (float): The exchange's timestamp of the quote, if the feed provides one.
+        """
+        entry = CachedQuote(quote, exchange_time, self.clock(), sent, source)
+        with self.lock:
+            self.entries.setdefault(symbol, {})[exchange] = entry
+        return entry
+
+    def get(self, symbol, exchange):
+        """
+        Returns the CachedQuote of a symbol on an exchange, or None if there is none or it expired.
+        """
+        entry = self.entries.get(symbol, {}).get(exchange)
+        if entry is None or self.clock() - entry.received > self.ttl:
+            return None
+        return entry
+
+    def age(self, entry, now=None):
+        """
+        Returns the age of a cached quote in seconds.
+        """
+        now = self.clock() if now is None else now
+        reference = entry.exchange_time if entry.exchange_time is not None else entry.sent if entry.sent is not None else entry.received
+        return max(now - reference, 0.0)
+
+    def snapshot(self, symbol, exchanges, prices=None):
+        """
+        Returns the quotes of a symbol for evaluation, straight from the cache.
+
+        Every exchange gets its cached quote, marked stale if it is past the exchange's maximum age, or
+        None if nothing fresh enough to keep is cached. Quotes in prices that are already stale, such as
+        the last good quote of a failed request, are kept as they are.
+
+        Args:
+            symbol (str): The symbol.
+            exchanges (iterable): The exchanges to include.
+            prices (dict): Quotes just fetched for the symbol, keyed by exchange.
+        Returns:
+            dict: Quotes keyed by exchange.
+        """
+        now = self.clock()
+        cached = self.entries.get(symbol, {})
+        result = {}
+        for exchange in exchanges:
+            quote = prices.get(exchange) if prices else None
+            if quote is not None and quote.stale:
+                result[exchange] = quote
+                continue
+            entry = cached.get(exchange)
+            if entry is None or now - entry.received > self.ttl:
+                result[exchange] = None
+            elif not entry.quote.stale and self.age(entry, now) > self.max_age(exchange, entry.source):
+                metrics.counter("arbitrage_stale_quotes_total").inc(exchange=exchange)
+                result[exchange] = entry.quote._replace(stale=True)
+            else:
+                result[exchange] = entry.quote
+        return result
+
+    def quotes(self, symbol):
+        """
+        Returns the cached, unexpired entries of a symbol, keyed by exchange.
+        """
+        now = self.clock()
+        with self.lock:
+            entries = dict(self.entries.get(symbol, {}))
+        return {exchange: entry for exchange, entry in entries.items() if now - entry.received <= self.ttl}
+
+    def oldest_age(self, exchange):
+        """
+        Returns the age of the exchange's oldest cached quote, 0 if none is cached.
+        """
+        now = self.clock()
+        with self.lock:
+            entries = [symbol_entries[exchange] for symbol_entries in self.entries.values() if exchange in symbol_entries]
+        return max((self.age(entry, now) for entry in entries), default=0.0)
+
+    def evict(self):
+        """
+        Drops the entries that were not refreshed within ttl. Runs at most once per ttl / 2 seconds.
+        """
+        now = self.clock()
+        if now - self.last_evict < self.ttl / 2:
+            return
+        self.last_evict = now
+        with self.lock:
+            for symbol, symbol_entries in list(self.entries.items()):
+                for exchange, entry in list(symbol_entries.items()):
+                    if now - entry.received > self.ttl:
+                        del symbol_entries[exchange]
+                if not symbol_entries:
+                    del self.entries[symbol]
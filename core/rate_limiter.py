@@ -0,0 +1,52 @@
+import threading, time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: tokens refill continuously at `rate` per second, up to `capacity`.
+    """
+    def __init__(self, rate, capacity):
+        """
+        Initializes the TokenBucket class.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum number of tokens, i.e. the allowed burst.
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1.0):
+        """
+        Takes tokens if they are available right now.
+
+        Returns:
+            bool: True if the tokens were taken.
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens=1.0):
+        """
+        Returns the seconds until the requested tokens will be available.
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def acquire(self, tokens=1.0):
+        """
+        Blocks until the requested tokens are available, then takes them.
+        """
+        while not self.try_acquire(tokens):
+            time.sleep(self.wait_time(tokens))
@@ -0,0 +1,156 @@
+import json, bisect, datetime
+from .fee_handler import NO_FEES
+
+def iter_price_log(path):
+    """
+    Yields the snapshots of a recorded price log one at a time, so histories of any size are streamed.
+    JSON Lines files are read line by line and torn lines are skipped; a legacy .json file is loaded whole.
+
+    Args:
+        path (str): Path to a prices .jsonl or .json file.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if not path.endswith(".jsonl"):
+            yield from json.load(f).values()
+            return
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def best_spread(prices, fees=NO_FEES):
+    """
+    Finds the best net spread of a stored price snapshot, the same way check_arbitrage does, without
+    building Quote objects. Values may be [bid, ask], [bid, ask, stale] or a single last price.
+
+    Returns:
+        tuple: (net spread percentage, buy exchange, sell exchange), or None with fewer than two fresh quotes.
+    """
+    buy_multipliers = fees.buy_multipliers
+    sell_multipliers = fees.sell_multipliers
+    buy1 = buy2 = sell1 = sell2 = None
+    for exchange, value in prices.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            if len(value) > 2 and value[2]:
+                continue
+            bid, ask = float(value[0]), float(value[1])
+        else:
+            bid = ask = float(value)
+        buy = (ask * buy_multipliers.get(exchange, 1.0), exchange)
+        sell = (bid * sell_multipliers.get(exchange, 1.0), exchange)
+        if buy1 is None or buy < buy1:
+            buy1, buy2 = buy, buy1
+        elif buy2 is None or buy < buy2:
+            buy2 = buy
+        if sell1 is None or sell > sell1:
+            sell1, sell2 = sell, sell1
+        elif sell2 is None or sell > sell2:
+            sell2 = sell
+    if buy2 is None:
+        return None
+    # Buying and selling must use different exchanges; same tie-breaking as _best_pair.
+    if buy1[1] != sell1[1]:
+        buy, sell = buy1, sell1
+    elif sell1[0] / buy2[0] > sell2[0] / buy1[0]:
+        buy, sell = buy2, sell1
+    else:
+        buy, sell = buy1, sell2
+    return (sell[0] - buy[0]) / buy[0] * 100, buy[1], sell[1]
+
+class ReplayEngine:
+    """
+    Replays recorded price snapshots against several thresholds per symbol at once.
+
+    Each snapshot's best net spread is computed once; a bisect into the symbol's sorted thresholds then
+    counts it for every threshold it reaches, so the cost per snapshot does not grow with the number of
+    settings. With a cooldown, alerts are also counted the way NotificationDispatcher would send them:
+    at most one per (symbol, buy exchange, sell exchange) per cooldown.
+    """
+    def __init__(self, thresholds, fees=NO_FEES, cooldown=0.0, default_thresholds=None):
+        """
+        Initializes the ReplayEngine class.
+
+        Args:
+            thresholds (dict): Thresholds to try per symbol, as lists of net spread percentages.
+            fees (FeeTable): Precomputed fee multipliers. Defaults to no fees.
+            cooldown (float): Seconds between alerts for the same opportunity; 0 counts every opportunity.
+            default_thresholds (list): Thresholds for symbols not in thresholds; None skips them.
+        """
+        self.fees = fees
+        self.cooldown = cooldown
+        self.default_thresholds = sorted(set(default_thresholds)) if default_thresholds else None
+        self.grids = {symbol: sorted(set(values)) for symbol, values in thresholds.items()}
+        # hits[symbol][n] counts snapshots whose spread reached exactly the n lowest thresholds.
+        self.hits = {symbol: [0] * (len(grid) + 1) for symbol, grid in self.grids.items()}
+        self.alerts = {symbol: [0] * len(grid) for symbol, grid in self.grids.items()}
+        self.last_alerts = {symbol: [{} for _ in grid] for symbol, grid in self.grids.items()}
+        self.snapshots = 0
+        self.skipped = 0
+        self._timestamp = (None, 0.0)
+
+    def _grid(self, symbol):
+        grid = self.grids.get(symbol)
+        if grid is None and self.default_thresholds is not None:
+            grid = self.grids[symbol] = self.default_thresholds
+            self.hits[symbol] = [0] * (len(grid) + 1)
+            self.alerts[symbol] = [0] * len(grid)
+            self.last_alerts[symbol] = [{} for _ in grid]
+        return grid
+
+    def _seconds(self, timestamp):
+        # Consecutive snapshots usually share a timestamp, so only the last one is cached.
+        if self._timestamp[0] != timestamp:
+            self._timestamp = (timestamp, datetime.datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").timestamp())
+        return self._timestamp[1]
+
+    def feed(self, record):
+        """
+        Replays one snapshot: {"symbol": ..., "prices": {exchange: [bid, ask, stale]}, "datetime": ...}.
+        """
+        self.snapshots += 1
+        symbol = record.get("symbol")
+        grid = self._grid(symbol)
+        result = best_spread(record.get("prices") or {}, self.fees) if grid is not None else None
+        if result is None:
+            self.skipped += 1
+            return
+        spread, buy, sell = result
+        reached = bisect.bisect_right(grid, spread)
+        self.hits[symbol][reached] += 1
+        if not reached or self.cooldown <= 0:
+            return
+        now = self._seconds(record["datetime"])
+        alerts = self.alerts[symbol]
+        for n, last_alerts in enumerate(self.last_alerts[symbol][:reached]):
+            last = last_alerts.get((buy, sell))
+            if last is None or now - last >= self.cooldown:
+                last_alerts[(buy, sell)] = now
+                alerts[n] += 1
+
+    def run(self, records):
+        """
+        Replays every snapshot of an iterable, typically a generator over the price log.
+
+        Returns:
+            dict: The report, see report().
+        """
+        feed = self.feed
+        for record in records:
+            feed(record)
+        return self.report()
+
+    def report(self):
+        """
+        Returns:
+            dict: (threshold, opportunities, alerts) tuples per symbol, in ascending threshold order.
+        """
+        report = {}
+        for symbol, grid in self.grids.items():
+            hits = self.hits[symbol]
+            opportunities = [sum(hits[n + 1:]) for n in range(len(grid))]
+            alerts = self.alerts[symbol] if self.cooldown > 0 else opportunities
+            report[symbol] = list(zip(grid, opportunities, alerts))
+        return report
@@ -0,0 +1,147 @@
+import math, time
+from .exchange_handler import canonical_exchange
+from .rate_limiter import TokenBucket
+
+class DeadlineScheduler:
+    """
+    Runs symbols on fixed deadlines. Each symbol's deadlines are start + k * interval, so the time spent
+    fetching, storing and notifying never accumulates into drift. Missed deadlines are skipped, not caught up.
+    """
+    def __init__(self, intervals, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initializes the DeadlineScheduler class. Every symbol is due immediately.
+
+        Args:
+            intervals (dict): Polling interval in seconds per symbol.
+            clock (callable): Monotonic clock.
+            sleep (callable): Sleep function.
+        """
+        self.intervals = dict(intervals)
+        self.clock = clock
+        self.sleep = sleep
+        start = clock()
+        self.deadlines = {symbol: start for symbol in self.intervals}
+
+    def set_intervals(self, intervals):
+        """
+        Swaps in new polling intervals, e.g. after a config reload. Symbols that stay keep their next
+        deadline, moved earlier if their new interval is shorter; new symbols are due immediately.
+        """
+        now = self.clock()
+        deadlines = {}
+        for symbol, interval in intervals.items():
+            deadline = self.deadlines.get(symbol)
+            deadlines[symbol] = now if deadline is None else min(deadline, now + interval)
+        self.intervals = dict(intervals)
+        self.deadlines = deadlines
+
+    def next_deadline(self):
+        """
+        Returns the earliest pending deadline.
+        """
+        return min(self.deadlines.values())
+
+    def due(self):
+        """
+        Returns the symbols whose deadline has passed and moves their deadlines forward.
+        """
+        now = self.clock()
+        due = []
+        for symbol, deadline in self.deadlines.items():
+            if deadline <= now:
+                interval = self.intervals[symbol]
+                self.deadlines[symbol] = deadline + (math.floor((now - deadline) / interval) + 1) * interval
+                due.append(symbol)
+        return due
+
+    def wait_next(self, should_stop=lambda: False, max_wait=1.0):
+        """
+        Sleeps until the next deadline and returns the symbols due then.
+        Sleeps in slices of at most max_wait seconds so a stop request is noticed; returns [] when stopped.
+        """
+        while not should_stop():
+            if not self.deadlines:
+                self.sleep(max_wait)
+                continue
+            remaining = self.next_deadline() - self.clock()
+            if remaining <= 0:
+                return self.due()
+            self.sleep(min(remaining, max_wait))
+        return []
+
+class RateBudget:
+    """
+    Tracks each exchange's request-weight budget with a token bucket refilled at HEADROOM times its
+    per-minute limit, so requests are spread to stay just under the venue's rate limit instead of hitting 429s.
+    """
+    def __init__(self, limits, weights=None, bulk_weights=None, headroom=0.9, burst_seconds=10.0):
+        """
+        Initializes the RateBudget class.
+
+        Args:
+            limits (dict): Request-weight limit per minute, per exchange. Exchanges without a limit are not throttled.
+            weights (dict): Weight of a single-symbol request per exchange (default 1).
+            bulk_weights (dict): Weight of an all-symbol request per exchange (default 1).
+            headroom (float): Fraction of each limit the bot may use.
+            burst_seconds (float): Seconds of budget that may be spent at once.
+        """
+        self.weights = dict(weights or {})
+        self.bulk_weights = dict(bulk_weights or {})
+        self.buckets = {}
+        for exchange, limit in limits.items():
+            rate = limit * headroom / 60
+            self.buckets[exchange] = TokenBucket(rate, max(rate * burst_seconds, self.bulk_weights.get(exchange, 1), self.weights.get(exchange, 1)))
+        self.deferred = 0
+
+    @classmethod
+    def from_config(cls, config, share=1.0):
+        """
+        Creates a RateBudget from the [Rate Limits] section: <EXCHANGE> = weight per minute,
+        <EXCHANGE>_WEIGHT and <EXCHANGE>_BULK_WEIGHT = request weights, HEADROOM = usable fraction.
+        share is the fraction of every limit this budget gets, e.g. 1/4 for each of four shard processes.
+        """
+        section = "Rate Limits"
+        limits, weights, bulk_weights = {}, {}, {}
+        if config.has_section(section):
+            for option in config.options(section):
+                if option == "headroom":
+                    continue
+                if option.endswith("_bulk_weight"):
+                    bulk_weights[canonical_exchange(option[:-len("_bulk_weight")])] = config.getfloat(section, option)
+                elif option.endswith("_weight"):
+                    weights[canonical_exchange(option[:-len("_weight")])] = config.getfloat(section, option)
+                else:
+                    limits[canonical_exchange(option)] = config.getfloat(section, option) * share
+        return cls(limits, weights, bulk_weights, headroom=config.getfloat(section, 'HEADROOM', fallback=0.9))
+
+    def inherit(self, previous):
+        """
+        Takes over the current token levels of a previous budget, e.g. after a config reload, so a reload
+        doesn't refill every bucket and allow a burst past the exchanges' limits. Levels are capped at the
+        new capacities; exchanges new to this budget start full.
+        """
+        now = time.monotonic()
+        for exchange, bucket in self.buckets.items():
+            old = previous.buckets.get(exchange)
+            if old is not None:
+                with old.lock:
+                    old._refill(now)
+                    bucket.tokens = min(bucket.capacity, old.tokens)
+                bucket.updated = now
+        self.deferred = previous.deferred
+
+    def try_spend(self, exchange, bulk=False):
+        """
+        Spends the weight of one request if the exchange's budget allows it now.
+
+        Returns:
+            bool: True if the request may be sent; False if it should be deferred.
+        """
+        bucket = self.buckets.get(exchange)
+        if bucket is None:
+            return True
+        weight = self.bulk_weights.get(exchange, 1) if bulk else self.weights.get(exchange, 1)
+        if bucket.try_acquire(weight):
+            return True
+        self.deferred += 1
+        return False
@@ -0,0 +1,125 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import read_config
+
+class SessionPool:
+    """
+    Keeps one pooled keep-alive requests.Session per host, so repeated calls to an exchange
+    or notification API reuse their TCP/TLS connections instead of opening new ones.
+    """
+    def __init__(self, pool_size=10, connect_timeout=3.0, read_timeout=5.0, retries=2, backoff_factor=0.3):
+        """
+        Initializes the SessionPool class.
+
+        Args:
+            pool_size (int): Maximum number of keep-alive connections kept per host.
+            connect_timeout (float): Seconds to wait for a connection to be established.
+            read_timeout (float): Seconds to wait for the server to send a response.
+            retries (int): Retries for failed connections and 429/5xx responses on idempotent requests.
+            backoff_factor (float): Exponential backoff factor between retries.
+        """
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a SessionPool from the [HTTP] section of the config.ini file.
+        """
+        section = "HTTP"
+        return cls(pool_size=config.getint(section, 'POOL_SIZE', fallback=10),
+                   connect_timeout=config.getfloat(section, 'CONNECT_TIMEOUT', fallback=3.0),
+                   read_timeout=config.getfloat(section, 'READ_TIMEOUT', fallback=5.0),
+                   retries=config.getint(section, 'RETRIES', fallback=2),
+                   backoff_factor=config.getfloat(section, 'BACKOFF_FACTOR', fallback=0.3))
+
+    def _create_session(self):
+        # Read timeouts are not retried: the exchange's health tracker adapts the timeout instead,
+        # and a quote that arrives after several timeouts would be stale anyway. A 429's Retry-After
+        # is not waited out either; the rate budget already paces the exchange, and a sleep of the
+        # server's choosing would hold up the whole cycle.
+        retry = Retry(total=self.retries, connect=self.retries, read=0, status=self.retries,
+                      backoff_factor=self.backoff_factor, status_forcelist=(429, 500, 502, 503, 504),
+                      respect_retry_after_header=False, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def session(self, url):
+        """
+        Returns the session that owns the connection pool of the URL's host.
+        """
+        host = urlsplit(url).netloc
+        session = self.sessions.get(host)
+        if session is None:
+            with self.lock:
+                session = self.sessions.get(host)
+                if session is None:
+                    session = self.sessions[host] = self._create_session()
+        return session
+
+    def get(self, url, **kwargs):
+        """
+        Sends a GET request over the host's pooled session, using the configured timeouts by default.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session(url).get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """
+        Sends a POST request over the host's pooled session, using the configured timeouts by default.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session(url).post(url, **kwargs)
+
+    def stats(self):
+        """
+        Reports connection reuse for every host.
+
+        Returns:
+            dict: {host: {"requests": int, "connections": int, "reused": int}}
+        """
+        stats = {}
+        for host, session in list(self.sessions.items()):
+            requests_count = connections = 0
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is not None:
+                        requests_count += pool.num_requests
+                        connections += pool.num_connections
+            stats[host] = {"requests": requests_count, "connections": connections, "reused": requests_count - connections}
+        return stats
+
+    def close(self):
+        """
+        Closes every session and its pooled connections.
+        """
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+_session_pool = None
+_session_pool_lock = threading.Lock()
+
+def get_session_pool():
+    """
+    Returns the process-wide SessionPool shared by the price fetcher and the notifier.
+    """
+    global _session_pool
+    if _session_pool is None:
+        with _session_pool_lock:
+            if _session_pool is None:
+                _session_pool = SessionPool.from_config(read_config())
+    return _session_pool
@@ -0,0 +1,153 @@
+import time, queue, heapq, signal, logging, multiprocessing
+
+def split_symbols(symbols, shards, intervals=None):
+    """
+    Splits the symbols into at most `shards` groups of similar load. A symbol's load is its polling
+    rate (1 / interval), so hot symbols are spread over the shards instead of piling up in one.
+
+    Args:
+        symbols (list): The symbols to split.
+        shards (int): Number of groups.
+        intervals (dict): Polling interval in seconds per symbol; missing symbols count as 1 second.
+    Returns:
+        list: One list of symbols per shard, each in the original order.
+    """
+    intervals = intervals or {}
+    count = max(1, min(int(shards), len(symbols)))
+    rate = lambda symbol: 1.0 / max(intervals.get(symbol, 1.0), 1e-3)
+    groups = [[] for _ in range(count)]
+    loads = [(0.0, n) for n in range(count)]
+    # Heaviest symbol first into the lightest shard.
+    for symbol in sorted(symbols, key=rate, reverse=True):
+        load, n = heapq.heappop(loads)
+        groups[n].append(symbol)
+        heapq.heappush(loads, (load + rate(symbol), n))
+    position = {symbol: n for n, symbol in enumerate(symbols)}
+    return [sorted(group, key=position.get) for group in groups]
+
+def _run_worker(target, *args):
+    # Ctrl+C reaches the whole process group; only the coordinator decides when workers stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    target(*args)
+
+class ShardPool:
+    """
+    Runs shards of the symbol universe in worker processes and collects their results.
+
+    Every worker runs target(shard, shards, symbols, config, results, stop_event, control) and puts its
+    result batches on one shared queue. The coordinator is the only reader of that queue, so storage and
+    notifications keep a single writer. New settings reach a running worker as (config, symbols) on its
+    control queue. Workers are started with "spawn" so they don't inherit the coordinator's threads, and
+    a worker that dies is restarted after restart_delay seconds.
+    """
+    def __init__(self, target, shards, config, queue_size=1000, restart_delay=5.0):
+        """
+        Initializes the ShardPool class.
+
+        Args:
+            target (callable): Module-level worker entry point.
+            shards (list): The symbols of every shard, e.g. from split_symbols; one worker is started per entry.
+            config (ConfigParser): The settings passed to every worker.
+            queue_size (int): Result batches that may wait before workers block.
+            restart_delay (float): Seconds before a dead worker is restarted.
+        """
+        self.target = target
+        self.shards = shards
+        self.config = config
+        self.restart_delay = restart_delay
+        self.context = multiprocessing.get_context("spawn")
+        self.results = self.context.Queue(queue_size)
+        self.stop_event = self.context.Event()
+        self.controls = [self.context.Queue() for _ in shards]
+        self.processes = {}
+        self.restarts = {}
+        self.last_check = 0.0
+
+    def _start(self, shard):
+        process = self.context.Process(target=_run_worker, name=f"arbitrage-shard-{shard}", daemon=True,
+                                       args=(self.target, shard, len(self.shards), self.shards[shard], self.config, self.results, self.stop_event, self.controls[shard]))
+        process.start()
+        self.processes[shard] = process
+
+    def start(self):
+        """
+        Starts one worker process per shard.
+        """
+        for shard in range(len(self.shards)):
+            self._start(shard)
+
+    def reconfigure(self, config, shards):
+        """
+        Sends new settings and symbols to the running workers without restarting them. Workers beyond
+        the new shards get no symbols; restarted workers start with the new settings.
+
+        Args:
+            config (ConfigParser): The new settings.
+            shards (list): The new symbols of every shard, at most one entry per worker.
+        """
+        self.config = config
+        self.shards = [shards[shard] if shard < len(shards) else [] for shard in range(len(self.shards))]
+        for control, symbols in zip(self.controls, self.shards):
+            control.put((config, symbols))
+
+    def check(self):
+        """
+        Restarts workers that exited while the pool is running.
+        """
+        now = time.monotonic()
+        for shard, process in list(self.processes.items()):
+            if process.is_alive() or self.stop_event.is_set():
+                continue
+            if shard not in self.restarts:
+                logging.error(f"Shard {shard} exited with code {process.exitcode}, restarting in {self.restart_delay:g} s")
+                self.restarts[shard] = now + self.restart_delay
+            elif now >= self.restarts[shard]:
+                del self.restarts[shard]
+                self._start(shard)
+
+    def get_batches(self, timeout=0.5):
+        """
+        Waits up to timeout for a result batch and returns it with every other batch already queued,
+        so results the shards produced at the same time are handled together.
+
+        Returns:
+            list: The batches; empty if none arrived.
+        """
+        if time.monotonic() - self.last_check >= 1.0:
+            self.last_check = time.monotonic()
+            self.check()
+        try:
+            batches = [self.results.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                batches.append(self.results.get_nowait())
+            except queue.Empty:
+                return batches
+
+    def queue_depth(self):
+        try:
+            return self.results.qsize()
+        except NotImplementedError:
+            return 0
+
+    def stop(self, timeout=10.0):
+        """
+        Stops the workers, waiting up to timeout for them to finish their cycle.
+
+        Returns:
+            list: The batches they sent before exiting.
+        """
+        self.stop_event.set()
+        batches = []
+        deadline = time.monotonic() + timeout
+        # Keep reading while the workers exit, so none of them blocks on a full queue.
+        while any(process.is_alive() for process in self.processes.values()) and time.monotonic() < deadline:
+            batches.extend(self.get_batches(timeout=0.1))
+        batches.extend(self.get_batches(timeout=0.1))
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        return batches
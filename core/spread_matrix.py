@@ -0,0 +1,154 @@
+import numpy as np
+from .exchange_handler import Quote, as_quote
+from .fee_handler import NO_FEES
+
+class SpreadMatrix:
+    """
+    Keeps (symbols x exchanges) bid and ask matrices and computes every pairwise cross-exchange net
+    spread in one vectorized pass, with the per-symbol thresholds applied as a vector.
+    """
+    def __init__(self, symbols, exchanges, thresholds, fees=NO_FEES):
+        """
+        Initializes the SpreadMatrix class.
+
+        ARGS:
+            symbols (list): The symbols, one matrix row each.
+            exchanges (list): The exchanges, one matrix column each.
+            thresholds (list): Minimum net spread percentage per symbol, in the order of symbols.
+            fees (FeeTable): Precomputed fee multipliers. Defaults to no fees.
+        """
+        self.symbols = list(symbols)
+        self.exchanges = list(exchanges)
+        self.symbol_index = {symbol: n for n, symbol in enumerate(self.symbols)}
+        self.exchange_index = {exchange: n for n, exchange in enumerate(self.exchanges)}
+        self.bids = np.full((len(self.symbols), len(self.exchanges)), np.nan)
+        self.asks = np.full((len(self.symbols), len(self.exchanges)), np.nan)
+        self.thresholds = np.asarray(thresholds, dtype=float)
+        self.buy_multipliers = np.array([fees.buy_multiplier(ex) for ex in self.exchanges])
+        self.sell_multipliers = np.array([fees.sell_multiplier(ex) for ex in self.exchanges])
+        self._off_diagonal = ~np.eye(len(self.exchanges), dtype=bool)
+
+    def update(self, symbol, exchange, quote):
+        """
+        Sets one quote. A quote of None, or a stale one, marks it as missing.
+        """
+        s, e = self.symbol_index[symbol], self.exchange_index[exchange]
+        quote = None if quote is None else as_quote(quote)
+        if quote is None or quote.stale:
+            self.bids[s, e] = self.asks[s, e] = np.nan
+        else:
+            self.bids[s, e], self.asks[s, e] = quote.bid, quote.ask
+
+    def update_symbol(self, symbol, prices):
+        """
+        Applies a snapshot of a symbol's quotes. Exchanges mapped to None (failed requests) are marked
+        missing; exchanges missing from the snapshot (not requested this time) keep their last quote.
+        """
+        for exchange, quote in prices.items():
+            if exchange in self.exchange_index:
+                self.update(symbol, exchange, quote)
+
+    def _pair_spreads(self, rows, exclude=()):
+        buy = (self.asks[rows] * self.buy_multipliers)[:, :, None]
+        sell = (self.bids[rows] * self.sell_multipliers)[:, None, :]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            spreads = np.where(self._off_diagonal, (sell - buy) / buy * 100, np.nan)
+        excluded = [self.exchange_index[ex] for ex in exclude if ex in self.exchange_index]
+        if excluded:
+            spreads[:, excluded, :] = np.nan
+            spreads[:, :, excluded] = np.nan
+        return spreads
+
+    def spreads(self):
+        """
+        Computes the net spread of buying at the ask on exchange i and selling at the bid on exchange j for every symbol.
+
+        Returns:
+            numpy.ndarray: (symbols, exchanges, exchanges) spread percentages, NaN where a quote is missing or i == j.
+        """
+        return self._pair_spreads(slice(None))
+
+    def opportunities(self, top_k=10, exclude=(), symbols=None):
+        """
+        Ranks the exchange pairs whose net spread reaches their symbol's threshold.
+
+        ARGS:
+            top_k (int): Maximum number of opportunities returned.
+            exclude (iterable): Exchanges that can't be used; pairs involving them are skipped,
+                so the next-best, non-extreme pairs are returned instead.
+            symbols (list): Only rank the pairs of these symbols. Defaults to every symbol.
+        Returns:
+            list: Opportunity dicts ordered by descending spread.
+        """
+        rows = np.arange(len(self.symbols)) if symbols is None else np.array([self.symbol_index[symbol] for symbol in symbols], dtype=int)
+        spreads = self._pair_spreads(rows, exclude)
+        with np.errstate(invalid='ignore'):
+            hits = np.flatnonzero(spreads >= self.thresholds[rows][:, None, None])
+        if hits.size == 0 or top_k <= 0:
+            return []
+        values = spreads.ravel()[hits]
+        if hits.size > top_k:
+            keep = np.argpartition(-values, top_k - 1)[:top_k]
+            hits, values = hits[keep], values[keep]
+        order = np.argsort(-values, kind='stable')
+        r, i, j = np.unravel_index(hits[order], spreads.shape)
+        return [{"symbol": self.symbols[a], "buy_exchange": self.exchanges[b], "sell_exchange": self.exchanges[c],
+                 "buy_price": float(self.asks[a, b]), "sell_price": float(self.bids[a, c]),
+                 "spread": float(spread), "threshold": float(self.thresholds[a])}
+                for a, b, c, spread in zip(rows[r], i, j, values[order])]
+
+    def evaluate(self, symbols, top_k=10, exclude=()):
+        """
+        Evaluates the given symbols only. Every symbol gets a result for its best exchange pair, flagged as
+        a success when it reaches the symbol's threshold. The top_k pairs of the cycle above their threshold
+        are ranked as well; those that aren't their symbol's best pair are returned as extra results marked
+        "ranked", ahead of the per-symbol ones.
+
+        ARGS:
+            symbols (list): The symbols to evaluate, e.g. the ones due this cycle.
+            top_k (int): Maximum number of ranked pairs.
+            exclude (iterable): Exchanges that can't be used as a leg.
+        Returns:
+            list: (symbol, result) tuples in the structure of check_arbitrage.
+        """
+        rows = [self.symbol_index[symbol] for symbol in symbols]
+        flat = self._pair_spreads(rows, exclude).reshape(len(rows), -1)
+        valid = ~np.isnan(flat).all(axis=1)
+        best = np.argmax(np.where(np.isnan(flat), -np.inf, flat), axis=1)
+        values = flat[np.arange(len(rows)), best]
+        with np.errstate(invalid='ignore'):
+            success = valid & (values >= self.thresholds[rows])
+        results = []
+        best_pairs = set()
+        for n, symbol in enumerate(symbols):
+            if not valid[n]:
+                results.append((symbol, {"valid_price" : False}))
+                continue
+            i, j = divmod(int(best[n]), len(self.exchanges))
+            s = rows[n]
+            best_pairs.add((symbol, self.exchanges[i], self.exchanges[j]))
+            opportunity = {"symbol": symbol, "buy_exchange": self.exchanges[i], "sell_exchange": self.exchanges[j],
+                           "buy_price": float(self.asks[s, i]), "sell_price": float(self.bids[s, j]), "spread": float(values[n])}
+            result = self.as_result(opportunity)
+            result["success"] = bool(success[n])
+            results.append((symbol, result))
+        ranked = []
+        for opportunity in self.opportunities(top_k, exclude, symbols):
+            if (opportunity["symbol"], opportunity["buy_exchange"], opportunity["sell_exchange"]) not in best_pairs:
+                result = self.as_result(opportunity)
+                result["ranked"] = True
+                ranked.append((opportunity["symbol"], result))
+        return ranked + results
+
+    def as_result(self, opportunity):
+        """
+        Converts an opportunity to the result structure of check_arbitrage, so it can be stored and notified the same way.
+        """
+        s = self.symbol_index[opportunity["symbol"]]
+        prices = {exchange: Quote(float(self.bids[s, n]), float(self.asks[s, n]))
+                  for n, exchange in enumerate(self.exchanges) if not np.isnan(self.asks[s, n])}
+        real_data = {"min_price" : opportunity["buy_price"], "min_exchange" : opportunity["buy_exchange"],
+                     "max_price" : opportunity["sell_price"], "max_exchange" : opportunity["sell_exchange"],
+                     "arbitrage_percentage" : opportunity["spread"], "prices" : prices,
+                     "symbol" : opportunity["symbol"]}
+        return {"valid_price" : True, "real_data" : real_data, "success": True}
@@ -0,0 +1,176 @@
+import math, threading
+from array import array
+from .exchange_handler import as_quote
+from .fee_handler import NO_FEES
+
+class PairStats:
+    """
+    Rolling statistics of one (symbol, buy exchange, sell exchange) spread series: an exponentially
+    weighted mean and variance, updated in O(1), and the last `window` spreads in a fixed ring buffer
+    for percentiles. Its memory does not grow with the number of samples.
+    """
+    __slots__ = ("mean", "var", "count", "last_z", "ring", "position")
+
+    def __init__(self, window):
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+        self.last_z = 0.0
+        self.ring = array('d', bytes(8 * window))
+        self.position = 0
+
+    def update(self, value, alpha):
+        if self.count:
+            delta = value - self.mean
+            self.mean += alpha * delta
+            self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+        else:
+            self.mean = value
+        self.ring[self.position] = value
+        self.position = (self.position + 1) % len(self.ring)
+        self.count += 1
+
+    def std(self):
+        return math.sqrt(self.var)
+
+    def zscore(self, value, min_std=0.0):
+        """
+        Returns how many standard deviations value lies above the mean. min_std keeps a flat series
+        from turning tiny moves into huge scores.
+        """
+        std = max(self.std(), min_std)
+        if std <= 0:
+            return 0.0
+        return (value - self.mean) / std
+
+    def percentile(self, q):
+        """
+        Returns the q-th percentile (0-100) of the spreads in the ring buffer.
+        """
+        values = sorted(self.ring[:min(self.count, len(self.ring))])
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+class SpreadStats:
+    """
+    Keeps PairStats for every (symbol, buy exchange, sell exchange) pair of fresh quotes in the evaluation
+    results and decides alerts from them. Every pair is sampled on every evaluation, not only the best
+    one, so a pair's normal level is not learned from its extremes.
+
+    With mode "threshold", alerts still follow ARBITRAGE_THRESHOLD and the statistics are only kept.
+    With "zscore", a pair alerts when its net spread lies z_threshold standard deviations above its own
+    rolling mean; with "percentile", when it exceeds the pair's rolling percentile. Both also need a net
+    spread of at least min_spread. A persistent structural spread between two venues becomes the pair's
+    normal and stops alerting. Until a pair has min_samples spreads, the threshold decides.
+    """
+    def __init__(self, alpha=0.05, window=128, min_samples=30, mode="threshold", z_threshold=3.0, percentile=99.0, min_spread=0.0, min_std=0.01):
+        """
+        Initializes the SpreadStats class.
+
+        Args:
+            alpha (float): Weight of a new spread in the moving mean and variance.
+            window (int): Spreads kept per pair for percentiles.
+            min_samples (int): Spreads a pair needs before its statistics decide alerts.
+            mode (str): "threshold", "zscore" or "percentile".
+            z_threshold (float): Z-score a spread needs to alert in "zscore" mode.
+            percentile (float): Rolling percentile a spread must exceed in "percentile" mode.
+            min_spread (float): Minimum net spread percentage of an anomaly alert.
+            min_std (float): Lower bound of the standard deviation used for z-scores, in percentage points.
+        """
+        self.alpha = alpha
+        self.window = window
+        self.min_samples = min_samples
+        self.mode = mode
+        self.z_threshold = z_threshold
+        self.percentile = percentile
+        self.min_spread = min_spread
+        self.min_std = min_std
+        self.pairs = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a SpreadStats from the [Spread Stats] section of the config.ini file.
+        """
+        section = "Spread Stats"
+        return cls(alpha=config.getfloat(section, 'ALPHA', fallback=0.05),
+                   window=config.getint(section, 'WINDOW', fallback=128),
+                   min_samples=config.getint(section, 'MIN_SAMPLES', fallback=30),
+                   mode=config.get(section, 'ALERT_MODE', fallback='threshold').strip().lower(),
+                   z_threshold=config.getfloat(section, 'Z_THRESHOLD', fallback=3.0),
+                   percentile=config.getfloat(section, 'PERCENTILE', fallback=99.0),
+                   min_spread=config.getfloat(section, 'MIN_SPREAD', fallback=0.0),
+                   min_std=config.getfloat(section, 'MIN_STD', fallback=0.01))
+
+    def _pair(self, key):
+        pair = self.pairs.get(key)
+        if pair is None:
+            pair = self.pairs[key] = PairStats(self.window)
+        return pair
+
+    def _alert(self, pair, spread, z, success, real_data):
+        if self.mode not in ("zscore", "percentile") or pair.count < self.min_samples:
+            return success
+        real_data["z_score"] = z
+        if self.mode == "zscore":
+            return spread >= self.min_spread and z >= self.z_threshold
+        return spread >= self.min_spread and spread > pair.percentile(self.percentile)
+
+    def score(self, real_data, success):
+        """
+        Decides whether a result's spread should be alerted, like check, without adding it to the statistics.
+        Used for the ranked pairs of the matrix engine, whose spreads check already samples with their
+        symbol's best pair.
+
+        Returns:
+            bool: Whether the result should be alerted.
+        """
+        key = (real_data["symbol"], real_data["min_exchange"], real_data["max_exchange"])
+        spread = float(real_data["arbitrage_percentage"])
+        with self.lock:
+            pair = self._pair(key)
+            z = pair.zscore(spread, self.min_std) if pair.count else 0.0
+            return self._alert(pair, spread, z, success, real_data)
+
+    def check(self, real_data, success, fees=NO_FEES):
+        """
+        Scores a result's best spread against its pair's statistics, then adds the net spread of every
+        pair of fresh quotes in the result to the statistics.
+
+        Args:
+            real_data (dict): The "real_data" of an evaluation result, including its symbol. Its z-score
+                is added as "z_score" once the pair has min_samples spreads.
+            success (bool): Whether the spread reached ARBITRAGE_THRESHOLD.
+            fees (FeeTable): The fees the result's spread was computed with.
+        Returns:
+            bool: Whether the result should be alerted.
+        """
+        symbol = real_data["symbol"]
+        key = (symbol, real_data["min_exchange"], real_data["max_exchange"])
+        spread = float(real_data["arbitrage_percentage"])
+        quotes = [(exchange, as_quote(quote)) for exchange, quote in real_data["prices"].items() if quote is not None]
+        legs = [(exchange, quote.ask * fees.buy_multiplier(exchange), quote.bid * fees.sell_multiplier(exchange))
+                for exchange, quote in quotes if not quote.stale]
+        with self.lock:
+            pair = self._pair(key)
+            z = pair.last_z = pair.zscore(spread, self.min_std) if pair.count else 0.0
+            alert = self._alert(pair, spread, z, success, real_data)
+            pair.update(spread, self.alpha)
+            for buy_exchange, buy, _ in legs:
+                for sell_exchange, _, sell in legs:
+                    if buy_exchange != sell_exchange and (buy_exchange, sell_exchange) != key[1:]:
+                        self._pair((symbol, buy_exchange, sell_exchange)).update((sell - buy) / buy * 100, self.alpha)
+        return alert
+
+    def summary(self, symbol=None):
+        """
+        Returns the statistics of every pair, optionally of one symbol only.
+
+        Returns:
+            list: (symbol, buy exchange, sell exchange, samples, mean, std, p50, p95, last z-score) tuples.
+        """
+        with self.lock:
+            return [(*key, pair.count, pair.mean, pair.std(), pair.percentile(50), pair.percentile(95), pair.last_z)
+                    for key, pair in sorted(self.pairs.items()) if symbol is None or key[0] == symbol]
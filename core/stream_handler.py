@@ -0,0 +1,183 @@
+import asyncio, json, time, logging
+import websockets
+from .exchange_handler import Quote, format_symbol
+
+def _ms(value):
+    return float(value) / 1000 if value else None
+
+def _subscribe_binance(symbols):
+    return [{"method": "SUBSCRIBE", "params": [f"{s.lower()}@bookTicker" for s in symbols], "id": 1}]
+
+def _parse_binance(msg):
+    if "u" in msg and "b" in msg and "a" in msg:
+        return [(msg["s"], Quote(float(msg["b"]), float(msg["a"])), None)]
+    return []
+
+def _subscribe_okx(symbols):
+    return [{"op": "subscribe", "args": [{"channel": "tickers", "instId": s} for s in symbols]}]
+
+def _parse_okx(msg):
+    if msg.get("arg", {}).get("channel") == "tickers" and "data" in msg:
+        return [(item["instId"], Quote(float(item["bidPx"]), float(item["askPx"])), _ms(item.get("ts"))) for item in msg["data"]]
+    return []
+
+def _subscribe_gateio(symbols):
+    return [{"time": int(time.time()), "channel": "spot.tickers", "event": "subscribe", "payload": list(symbols)}]
+
+def _parse_gateio(msg):
+    if msg.get("channel") == "spot.tickers" and msg.get("event") == "update":
+        return [(msg["result"]["currency_pair"], Quote(float(msg["result"]["highest_bid"]), float(msg["result"]["lowest_ask"])), _ms(msg.get("time_ms")))]
+    return []
+
+def _subscribe_bitget(symbols):
+    return [{"op": "subscribe", "args": [{"instType": "SPOT", "channel": "ticker", "instId": s} for s in symbols]}]
+
+def _parse_bitget(msg):
+    if msg.get("arg", {}).get("channel") == "ticker" and "data" in msg:
+        return [(item["instId"], Quote(float(item["bidPr"]), float(item["askPr"])), _ms(item.get("ts"))) for item in msg["data"]]
+    return []
+
+def _subscribe_coinbase(symbols):
+    return [{"type": "subscribe", "product_ids": list(symbols), "channels": ["ticker"]}]
+
+def _parse_coinbase(msg):
+    if msg.get("type") == "ticker":
+        return [(msg["product_id"], Quote(float(msg["best_bid"]), float(msg["best_ask"])), None)]
+    return []
+
+# exchange: (subscribe messages builder, message parser, text keepalive message or None)
+# Parsers return (native symbol, quote, exchange timestamp or None) tuples.
+STREAM_SPECS = {
+    "Binance": (_subscribe_binance, _parse_binance, None),
+    "OKX": (_subscribe_okx, _parse_okx, "ping"),
+    "Gate.io": (_subscribe_gateio, _parse_gateio, None),
+    "Bitget": (_subscribe_bitget, _parse_bitget, "ping"),
+    "Coinbase": (_subscribe_coinbase, _parse_coinbase, None),
+}
+
+class QuoteStream:
+    """
+    Subscribes to the public ticker WebSocket feeds of the exchanges and keeps an in-memory table of
+    the latest quote per symbol and exchange. on_update(symbol, exchange, quote) is called only when a quote changes.
+    Every received quote, changed or not, refreshes its entry in the quote cache.
+    """
+    def __init__(self, stream_urls, symbols, on_update, reconnect_delay=1.0, max_reconnect_delay=30.0, keepalive_interval=20.0, quotes=None):
+        """
+        Initializes the QuoteStream class.
+
+        Args:
+            stream_urls (dict): WebSocket URLs keyed by exchange name. Exchanges without a STREAM_SPECS entry are ignored.
+            symbols (list): Configured symbols, e.g. ["BTC-USDT"].
+            on_update (callable): Called with the symbol, exchange and new Quote of every changed quote.
+            reconnect_delay (float): Initial delay before reconnecting; doubled after every failed attempt.
+            max_reconnect_delay (float): Upper bound for the reconnect delay.
+            keepalive_interval (float): Seconds between text keepalive messages for exchanges that need them.
+            quotes (QuoteCache): Where received quotes are kept with their timestamps.
+        """
+        self.stream_urls = {exchange: url for exchange, url in stream_urls.items() if exchange in STREAM_SPECS}
+        self.symbols = list(symbols)
+        self.on_update = on_update
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.keepalive_interval = keepalive_interval
+        self.quotes = {symbol: {} for symbol in self.symbols}
+        self.quote_cache = quotes
+        self.reconnects = 0
+
+    def prices(self, symbol):
+        """
+        Returns a copy of the latest quotes of a symbol, keyed by exchange.
+        """
+        return dict(self.quotes.get(symbol, {}))
+
+    def update(self, stream_urls, symbols):
+        """
+        Swaps in new feeds and symbols while the stream runs, e.g. after a config reload. Feeds whose URL
+        is unchanged keep their connection: added symbols are subscribed on it and removed ones ignored.
+        Added feeds are connected and removed or changed ones closed within half a second.
+        """
+        for symbol in symbols:
+            self.quotes.setdefault(symbol, {})
+        self.symbols = list(symbols)
+        self.stream_urls = {exchange: url for exchange, url in stream_urls.items() if exchange in STREAM_SPECS}
+
+    async def run(self, should_stop, on_idle=None):
+        """
+        Runs every exchange feed until should_stop() returns True, calling on_idle() about twice a second.
+        """
+        tasks = {}
+        while not should_stop():
+            if on_idle is not None:
+                on_idle()
+            for exchange, (url, task) in list(tasks.items()):
+                if self.stream_urls.get(exchange) != url or task.done():
+                    task.cancel()
+                    del tasks[exchange]
+            for exchange, url in self.stream_urls.items():
+                if exchange not in tasks:
+                    tasks[exchange] = (url, asyncio.ensure_future(self._run_exchange(exchange, url, should_stop)))
+            await asyncio.sleep(0.5)
+        await asyncio.gather(*(task for _, task in tasks.values()), return_exceptions=True)
+
+    async def _subscribe(self, ws, exchange, subscribe, subscribed):
+        # Subscribes the symbols added since the last call and returns the current native symbol map.
+        native_to_symbol = {format_symbol(exchange, symbol): symbol for symbol in self.symbols}
+        added = [native for native in native_to_symbol if native not in subscribed]
+        if added:
+            for message in subscribe(added):
+                await ws.send(json.dumps(message))
+            subscribed.update(added)
+        return native_to_symbol
+
+    async def _run_exchange(self, exchange, url, should_stop):
+        subscribe, parse, keepalive = STREAM_SPECS[exchange]
+        delay = self.reconnect_delay
+        while not should_stop():
+            try:
+                async with websockets.connect(url, ping_interval=20) as ws:
+                    symbols = self.symbols
+                    subscribed = set()
+                    native_to_symbol = await self._subscribe(ws, exchange, subscribe, subscribed)
+                    delay = self.reconnect_delay
+                    last_keepalive = time.monotonic()
+                    while not should_stop():
+                        if self.symbols is not symbols:
+                            symbols = self.symbols
+                            native_to_symbol = await self._subscribe(ws, exchange, subscribe, subscribed)
+                        if keepalive and time.monotonic() - last_keepalive >= self.keepalive_interval:
+                            await ws.send(keepalive)
+                            last_keepalive = time.monotonic()
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        self._handle_message(exchange, parse, native_to_symbol, raw)
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                logging.error(f"WebSocket feed for {exchange} disconnected: {e}")
+            if should_stop():
+                break
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _handle_message(self, exchange, parse, native_to_symbol, raw):
+        try:
+            updates = parse(json.loads(raw))
+        except ValueError:
+            return  # keepalive replies such as "pong"
+        except (KeyError, TypeError, IndexError) as e:
+            logging.error(f"Failed to parse WebSocket message from {exchange}: {e}")
+            return
+        for native_symbol, quote, exchange_time in updates:
+            symbol = native_to_symbol.get(native_symbol)
+            if symbol is None:
+                continue
+            if self.quote_cache is not None:
+                self.quote_cache.put(symbol, exchange, quote, source="stream", exchange_time=exchange_time)
+            if self.quotes[symbol].get(exchange) == quote:
+                continue
+            self.quotes[symbol][exchange] = quote
+            try:
+                self.on_update(symbol, exchange, quote)
+            except Exception as e:
+                logging.error(f"{e} - {symbol}")
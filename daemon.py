@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+"""
+Runs the arbitrage check headless, for systemd, Docker or a terminal multiplexer.
+
+    python daemon.py
+    kill -HUP <pid>     # re-read config/config.ini between cycles
+    kill -TERM <pid>    # finish the current cycle, flush storage and alerts, exit
+
+Progress and reloads are logged to logs/arbitrage.log.
+"""
+import signal, logging
+from main import arbitrage_main
+
+def main():
+    bot = arbitrage_main()
+    logging.getLogger("arbitrage").setLevel(logging.INFO)
+    log = logging.getLogger("arbitrage.daemon")
+
+    def stop(signum, frame):
+        log.info(f"Received {signal.Signals(signum).name}, stopping after the current cycle")
+        bot.thread_start = False
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda signum, frame: bot.request_reload())
+
+    log.info(f"Started with {len(bot.SYMBOLS)} symbols in {bot.FETCH_MODE} mode")
+    bot.thread_start = True
+    try:
+        bot.run()
+    finally:
+        bot.thread_start = False
+        bot.close()
+        log.info("Stopped")
+
+if __name__ == "__main__":
+    main()
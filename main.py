@@ -1,132 +1,480 @@
 # -*- coding: UTF-8 -*-
-import concurrent.futures
 from threading import Thread
-import time, logging, datetime
+import os, copy, time, queue, logging, asyncio, configparser
 from config import read_config
-from core import get_price_from_api, check_arbitrage, DataHandler, NotiHandler
+from core import EXCHANGES, get_all_prices_from_api, format_symbol, canonical_exchange, compile_api_urls, IncrementalEvaluator, FeeTable, SpreadMatrix, DeadlineScheduler, RateBudget, get_session_pool, FetchEngine, QuoteCache, SpreadStats, create_data_handler, PersistenceWriter, QuoteStream, NotiHandler, NotificationDispatcher, MetricsServer, metrics, ShardPool, split_symbols
 
 class arbitrage_main:
-    def __init__(self):
+    def __init__(self, config=None):
         """
         Initializes the arbitrage_main class.
 
         This constructor reads the configuration from the config.ini file, initializes the database and notification handlers, sets up logging, and prepares the class for operation.
 
+        Args:
+            config (ConfigParser): Settings to use instead of the config.ini file, e.g. for benchmarks.
+
         Attributes:
             config (ConfigParser): The configuration object with settings from the config.ini file.
-            db_handler (DataHandler): An instance of the DataHandler class to manage data operations.
+            db_handler (DataHandler): The configured storage backend, used to manage data operations.
+            writer (PersistenceWriter): The background writer that applies inserts to db_handler off the polling loop.
             noti_handler (NotiHandler): An instance of the NotiHandler class to handle notifications.
+            dispatcher (NotificationDispatcher): Coalesces, rate-limits and sends alerts from a background worker.
+            quotes (QuoteCache): The latest quote of every symbol and exchange with its timestamps; evaluation reads from it.
+            fetch_engine (FetchEngine): The concurrent engine used to fetch prices from the exchanges.
+            fees (FeeTable): Taker and withdrawal fees per exchange, loaded once.
+            spread_stats (SpreadStats): Rolling spread statistics per symbol and exchange pair; decides alerts in the anomaly modes.
+            budget (RateBudget): Request-weight budget per exchange; requests over budget are deferred.
+            metrics_server (MetricsServer): Serves the hot-path metrics on localhost and logs periodic summaries.
             thread_start (bool): A flag to indicate the start status of the threading operations.
+            reload_requested (bool): Set by request_reload; the running loop then re-reads config.ini before its next cycle.
         """
 
-        self.config = read_config()
-        self.db_handler = DataHandler()
+        self.config = config if config is not None else read_config()
+        self.db_handler = create_data_handler(config=self.config)
         self.db_handler.create_files()
-        self.noti_handler = NotiHandler()
-        logging.basicConfig(filename='.\\logs\\arbitrage.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.writer = PersistenceWriter.from_config(self.db_handler, self.config)
+        self.noti_handler = NotiHandler(self.config)
+        self.dispatcher = NotificationDispatcher.from_config(self.noti_handler, self.config)
+        self.quotes = QuoteCache.from_config(self.config)
+        self.fetch_engine = FetchEngine.from_config(self.config, self.quotes)
+        self.fees = FeeTable.from_config(self.config)
+        self.spread_stats = SpreadStats.from_config(self.config)
+        self.budget_share = 1.0
+        self.budget = RateBudget.from_config(self.config)
+        os.makedirs('logs', exist_ok=True)
+        logging.basicConfig(filename=os.path.join('logs', 'arbitrage.log'), level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+        metrics.gauge("arbitrage_queue_depth").set_function(self.writer.queue_depth, queue="writer")
+        metrics.gauge("arbitrage_queue_depth").set_function(self.dispatcher.queue_depth, queue="notifications")
+        self.metrics_server = MetricsServer.from_config(self.config)
+        self.metrics_server.start()
         self.config_setup()
+        for exchange in self.API_TEMPLATES:
+            metrics.gauge("arbitrage_quote_age_seconds").set_function(lambda exchange=exchange: self.quotes.oldest_age(exchange), exchange=exchange)
         self.thread_start = False
+        self.reload_requested = False
 
    
     def config_setup(self):
         """
         Reads the configuration from the config.ini file and sets up the class variables.
+        Raises ValueError when ARBITRAGE_THRESHOLD doesn't give one threshold per symbol.
 
         :param self: The instance of the class
         """
         self.SYMBOLS = self.config.get('Arbitrage Settings', 'SYMBOLS').replace(' ', '').split(',')
         self.SAVE_SMI = self.config.getboolean('Arbitrage Settings', 'PRICES_SAVE')
         self.ARBITRAGE_THRESHOLD = self.config.get('Arbitrage Settings', 'ARBITRAGE_THRESHOLD').replace(' ', '').split(',')
+        if len(self.ARBITRAGE_THRESHOLD) != len(self.SYMBOLS):
+            raise ValueError(f"ARBITRAGE_THRESHOLD has {len(self.ARBITRAGE_THRESHOLD)} values for {len(self.SYMBOLS)} SYMBOLS")
         self.TIMER_INTERVAL = self.config.getint('Arbitrage Settings', 'TIMER_INTERVAL')
+        self.SYMBOL_INTERVALS = dict((item.split(':')[0], float(item.split(':')[1])) for item in self.config.get('Arbitrage Settings', 'SYMBOL_INTERVALS', fallback='').replace(' ', '').split(',') if item)
+        self.FETCH_MODE = self.config.get('Arbitrage Settings', 'FETCH_MODE', fallback='rest').strip().lower()
+        self.SHARDS = self.config.getint('Arbitrage Settings', 'SHARDS', fallback=1)
+        self.BULK_FETCH = self.config.getboolean('Arbitrage Settings', 'BULK_FETCH', fallback=False)
+        self.SPREAD_ENGINE = self.config.get('Arbitrage Settings', 'SPREAD_ENGINE', fallback='incremental').strip().lower()
+        self.TOP_K = self.config.getint('Arbitrage Settings', 'TOP_K', fallback=10)
+        self.EXCLUDED_EXCHANGES = [canonical_exchange(ex) for ex in self.config.get('Arbitrage Settings', 'EXCLUDED_EXCHANGES', fallback='').replace(' ', '').split(',') if ex]
         self.ARBITRAGE_SAVE = self.config.getboolean('Arbitrage Settings', 'ARBITRAGE_SAVE')
         self.ARBITRAGE_SUCCESS = self.config.getboolean('Arbitrage Settings', 'ARBITRAGE_SUCCESS_SAVE')
         self.TELEGRAM_STATUS = self.config.getboolean('Telegram', 'NOTIFICATION_STATUS')
         self.DISCORD_STATUS = self.config.getboolean('Discord', 'NOTIFICATION_STATUS')
+        self.API_TEMPLATES = compile_api_urls(self.config)
+        self.BULK_URLS = self.read_endpoints("Bulk Endpoints")
+        self.STREAM_URLS = self.read_endpoints("Stream Endpoints")
               
+    def request_reload(self):
+        """
+        Asks the running loop to re-read config.ini before its next cycle. Safe to call from a signal handler.
+        """
+        self.reload_requested = True
+
+    def reload_pending(self):
+        return self.reload_requested
+
+    def take_reload(self):
+        """
+        Applies a requested reload; called by the running loop between cycles.
+
+        :return: True if new settings were applied
+        """
+        if not self.reload_requested:
+            return False
+        self.reload_requested = False
+        return self.reload_config()
+
+    def reload_config(self, config=None):
+        """
+        Re-reads the config.ini file and swaps in the new symbols, thresholds, intervals, enabled exchanges,
+        fees, rate limits, quote ages and alert settings as a whole. A config that fails to parse is logged and
+        the current settings are kept. FETCH_MODE and SHARDS, and the storage, notification, [HTTP],
+        [Fetch Engine], [Health] and [Metrics] settings, take effect after a restart.
+
+        :param config: Settings to use instead of re-reading config.ini
+        :return: True if the new settings were applied
+        """
+        try:
+            config = config if config is not None else read_config(reload=True)
+            # Every setting is staged on a copy first, so a broken config leaves the running ones untouched.
+            staged = copy.copy(self)
+            staged.config = config
+            staged.config_setup()
+            staged.symbol_thresholds()
+            fees = FeeTable.from_config(config)
+            budget = RateBudget.from_config(config, share=self.budget_share)
+            quotes = QuoteCache.from_config(config)
+            spread_stats = SpreadStats.from_config(config)
+        except (configparser.Error, ValueError, KeyError, IndexError) as e:
+            logging.error(f"Config reload failed, keeping the current settings: {e}")
+            return False
+        settings = {name: value for name, value in vars(staged).items() if name.isupper()}
+        for name in ("FETCH_MODE", "SHARDS"):
+            if settings[name] != getattr(self, name):
+                logging.error(f"{name} changes take effect after a restart")
+            settings[name] = getattr(self, name)
+        vars(self).update(settings)
+        self.config = config
+        self.fees = fees
+        budget.inherit(self.budget)
+        self.budget = budget
+        # The caches keep their contents; only their settings change.
+        for name in ("ttl", "max_ages", "default_max_age", "stream_max_age"):
+            setattr(self.quotes, name, getattr(quotes, name))
+        if getattr(self, "spread_stats", None) is not None:
+            for name in ("alpha", "window", "min_samples", "mode", "z_threshold", "percentile", "min_spread", "min_std"):
+                setattr(self.spread_stats, name, getattr(spread_stats, name))
+        logging.getLogger("arbitrage.daemon").info(f"Config reloaded: {len(self.SYMBOLS)} symbols on {len(self.API_TEMPLATES)} exchanges")
+        return True
+
+    def close(self):
+        """
+        Stops the background workers once the arbitrage check has stopped: flushes storage and alerts,
+        then shuts down the metrics endpoint, the fetch engine and the pooled HTTP sessions.
+        """
+        self.writer.close()
+        self.dispatcher.close()
+        self.metrics_server.stop()
+        self.fetch_engine.close()
+        get_session_pool().close()
+
     def get_api_urls(self, SYMBOL):
         """
-        Builds a dictionary of API URLs for the given SYMBOL.
+        Builds a dictionary of API URLs for the given SYMBOL from the precompiled URL templates.
 
         :param SYMBOL: The symbol to fetch API URLs for
         :return: A dictionary of API URLs, keyed by exchange name
         """
-        API_URLS = {}
-        for section in self.config.sections():
-            if not section.startswith("Exchange Details"):
+        return {exchange: template.build(SYMBOL) for exchange, template in self.API_TEMPLATES.items()}
+
+    def read_endpoints(self, section):
+        """
+        Reads the URLs of the enabled exchanges listed in a config section, such as [Bulk Endpoints].
+
+        :param section: The config section to read
+        :return: A dictionary of URLs, keyed by exchange name
+        """
+        URLS = {}
+        if not self.config.has_section(section):
+            return URLS
+        for exchange in self.config.options(section):
+            exchange = canonical_exchange(exchange)
+            if self.config.getboolean("Exchange Details", exchange.upper() + "_STATUS", fallback=False):
+                URL = self.config.get(section, exchange).strip()
+                if URL:
+                    URLS[exchange] = URL
+        return URLS
+
+    def get_bulk_urls(self):
+        """
+        Returns the all-symbol ticker URLs of the enabled exchanges that provide one.
+
+        :return: A dictionary of bulk API URLs, keyed by exchange name
+        """
+        return self.BULK_URLS
+
+    def fetch_bulk_prices(self, api_urls):
+        """
+        Fetches the prices of every symbol with one request per exchange.
+
+        Exchanges with a bulk endpoint are queried once for their whole ticker list, which is then
+        mapped back to the configured symbols. Exchanges without one are queried per symbol in the same
+        batch, so they add no round-trip. Only the symbols of an exchange whose bulk request failed are
+        retried per symbol afterwards. Exchanges whose rate budget can't afford the bulk request are
+        skipped this time.
+
+        Args:
+            api_urls (dict): Per-symbol API URLs, as built by get_api_urls.
+        Returns:
+            dict: Quotes keyed by symbol, then by exchange. Failed requests map to None.
+        """
+        bulk_urls = self.get_bulk_urls()
+        bulk_jobs = [(exchange, exchange, url, get_all_prices_from_api, True) for exchange, url in bulk_urls.items() if self.budget.try_spend(exchange, bulk=True)]
+        symbol_urls = self.within_budget({symbol: {exchange: url for exchange, url in urls.items() if exchange not in bulk_urls}
+                                          for symbol, urls in api_urls.items()})
+        symbol_jobs = [(symbol, exchange, url) for symbol, urls in symbol_urls.items() for exchange, url in urls.items()]
+        results = self.fetch_engine.run_batch(bulk_jobs + symbol_jobs, budget=self.budget)
+
+        symbol_prices = {symbol: {} for symbol in api_urls}
+        for symbol, exchange, price, sent in results[len(bulk_jobs):]:
+            symbol_prices[symbol][exchange] = self.fetch_engine.resolve(symbol, exchange, price, sent)
+        failed = set()
+        for exchange, _, tickers, sent in results[:len(bulk_jobs)]:
+            if tickers is None:
+                failed.add(exchange)
                 continue
-            for exchange in self.config.options(section):
-                if exchange.find("_") != -1 :
-                    continue
-                
-                exchange = exchange.capitalize()
-                
-                SELECT_EXCHANGES = self.config.getboolean(section, exchange.upper() + "_STATUS")
-                if SELECT_EXCHANGES:
-                    API_URL = self.config.get(section, exchange)
-                    if exchange == "Binance" or exchange == "Mexc" or exchange == "Bitget":
-                        API_URL = API_URL.replace("SYMBOL", SYMBOL.replace("-", ""))
-                    elif exchange == "Gate.io":
-                        API_URL = API_URL.replace("SYMBOL", SYMBOL.replace("-", "_"))
-                    else :
-                        API_URL = API_URL.replace("SYMBOL", SYMBOL)
-                        
-                    if API_URL:
-                        API_URLS[exchange] = API_URL
-        return API_URLS
+            for symbol, urls in api_urls.items():
+                price = tickers.get(format_symbol(exchange, symbol)) if exchange in urls else None
+                if price is not None:
+                    symbol_prices[symbol][exchange] = price
+                    self.fetch_engine.remember(symbol, exchange, price, sent=sent)
+        if failed:
+            retry_urls = {symbol: {exchange: url for exchange, url in urls.items() if exchange in failed} for symbol, urls in api_urls.items()}
+            for symbol, prices in self.fetch_engine.fetch_prices(self.within_budget(retry_urls), self.budget).items():
+                symbol_prices[symbol].update(prices)
+        return symbol_prices
+
+    def within_budget(self, api_urls):
+        """
+        Drops the per-symbol requests that the exchanges' rate budgets can't afford right now.
+
+        Args:
+            api_urls (dict): Per-symbol API URLs, keyed by symbol, then by exchange.
+        Returns:
+            dict: The affordable URLs, in the same structure.
+        """
+        return {symbol: {exchange: url for exchange, url in urls.items() if self.budget.try_spend(exchange)}
+                for symbol, urls in api_urls.items()}
+
+    def symbol_intervals(self):
+        """
+        Returns the polling interval of every symbol: SYMBOL_INTERVALS overrides, TIMER_INTERVAL otherwise.
+        """
+        return {symbol: self.SYMBOL_INTERVALS.get(symbol, self.TIMER_INTERVAL) for symbol in self.SYMBOLS}
 
     def fetch_all_prices(self, api_urls):
         """
-        Fetches price data from all exchanges concurrently.
+        Fetches price data of a single symbol from all exchanges concurrently.
         """
-        prices = {}
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(api_urls)) as executor:
-            future_to_exchange = {executor.submit(get_price_from_api, exchange, url): exchange for exchange, url in api_urls.items()}
-            for future in concurrent.futures.as_completed(future_to_exchange):
-                exchange = future_to_exchange[future]
-                price = future.result()
-                if price is not None:
-                    prices[exchange] = price
-        return prices
+        with metrics.timed("arbitrage_fetch_seconds"):
+            return self.fetch_engine.fetch_prices({None: api_urls}, self.budget)[None]
+
+    def handle_result(self, symbol, data):
+        """
+        Queues the arbitrage result of one symbol for storage and, if it is an opportunity, for notification.
+        Whether it is an opportunity is decided by spread_stats: the threshold, or in the anomaly modes its deviation from the pair's normal spread.
+
+        Args:
+            symbol (str): The symbol the result belongs to.
+            data (dict): The result of check_arbitrage, IncrementalEvaluator.evaluate or SpreadMatrix.evaluate.
+                Results marked "ranked" are only alerted; they are not stored as the symbol's evaluation.
+        """
+        if data["valid_price"] :
+            data["real_data"]["symbol"] = symbol
+            if data.get("ranked"):
+                # A ranked runner-up pair of the matrix engine; its symbol's own result is stored and sampled.
+                if self.spread_stats.score(data["real_data"], data["success"]) and self.ARBITRAGE_SUCCESS:
+                    self.writer.insert_success_data(data["real_data"])
+                    self.dispatcher.submit(data["real_data"])
+                return
+            data["success"] = self.spread_stats.check(data["real_data"], data["success"], self.fees)
+            if self.ARBITRAGE_SAVE:
+                self.writer.insert_data(data["real_data"])
+            if self.SAVE_SMI:
+                self.writer.insert_prices(data["real_data"]["prices"], symbol)
+            if data["success"] and self.ARBITRAGE_SUCCESS:
+                self.writer.insert_success_data(data["real_data"])
+                self.dispatcher.submit(data["real_data"])
+
+    def symbol_thresholds(self):
+        """
+        Returns the configured arbitrage threshold of every symbol.
+        """
+        return {symbol: float(threshold) for symbol, threshold in zip(self.SYMBOLS, self.ARBITRAGE_THRESHOLD)}
+
+    def create_evaluator(self):
+        """
+        Creates an IncrementalEvaluator with the configured threshold of every symbol.
+        """
+        return IncrementalEvaluator(self.symbol_thresholds(), self.fees)
+
+    def create_spread_matrix(self):
+        """
+        Creates a SpreadMatrix over the configured symbols and all supported exchanges.
+        """
+        return SpreadMatrix(self.SYMBOLS, EXCHANGES, [float(threshold) for threshold in self.ARBITRAGE_THRESHOLD], self.fees)
 
     def arbitrage_check(self):
         """
-        Fetches price data and checks for arbitrage at specified intervals.
+        Fetches price data and checks for arbitrage on each symbol's fixed deadlines.
+        A config reload is applied between cycles; the quotes and books of the symbols that stay are kept.
         """
         api_urls = {symbol: self.get_api_urls(symbol) for symbol in self.SYMBOLS}
+        evaluator = self.create_evaluator()
+        matrix = self.create_spread_matrix() if self.SPREAD_ENGINE == "matrix" else None
+        scheduler = DeadlineScheduler(self.symbol_intervals())
         print("SYMBOLS : ", self.SYMBOLS)
         while self.thread_start:
             try :
-                symbol_list = list(api_urls.keys())
-                n = 0
-                for symbol in symbol_list:
+                if self.take_reload():
+                    api_urls = {symbol: self.get_api_urls(symbol) for symbol in self.SYMBOLS}
+                    evaluator.reconfigure(self.symbol_thresholds(), self.fees, self.API_TEMPLATES)
+                    if self.SPREAD_ENGINE == "matrix":
+                        matrix = self.create_spread_matrix()
+                        for symbol in self.SYMBOLS:
+                            matrix.update_symbol(symbol, self.quotes.snapshot(symbol, api_urls[symbol]))
+                    else:
+                        matrix = None
+                    scheduler.set_intervals(self.symbol_intervals())
+                symbol_list = scheduler.wait_next(lambda: not self.thread_start or self.reload_pending())
+                if not symbol_list:
+                    continue
+                cycle_start = time.perf_counter()
+                due_urls = {symbol: api_urls[symbol] for symbol in symbol_list}
+                with metrics.timed("arbitrage_fetch_seconds"):
+                    if self.BULK_FETCH:
+                        symbol_prices = self.fetch_bulk_prices(due_urls)
+                    else:
+                        symbol_prices = self.fetch_engine.fetch_prices(self.within_budget(due_urls), self.budget)
+                with metrics.timed("arbitrage_evaluate_seconds", engine=self.SPREAD_ENGINE):
+                    # Evaluate every enabled exchange's cached quote, so outdated legs are marked stale.
+                    symbol_prices = {symbol: self.quotes.snapshot(symbol, api_urls[symbol], symbol_prices[symbol]) for symbol in symbol_list}
+                    if matrix is not None:
+                        for symbol in symbol_list:
+                            matrix.update_symbol(symbol, symbol_prices[symbol])
+                        results = matrix.evaluate(symbol_list, self.TOP_K, self.EXCLUDED_EXCHANGES)
+                    else:
+                        for symbol in symbol_list:
+                            evaluator.update_symbol(symbol, symbol_prices[symbol])
+                        results = evaluator.evaluate_dirty()
+                for symbol, data in results:
                     try :
-                        prices = self.fetch_all_prices(api_urls[symbol])
-                        data = check_arbitrage(prices,float(self.ARBITRAGE_THRESHOLD[n]))
-                        data["real_data"]["symbol"] = symbol
-                        if data["valid_price"] :
-                            if self.ARBITRAGE_SAVE:
-                                self.db_handler.insert_data(data["real_data"])
-                            if self.SAVE_SMI:
-                                self.db_handler.insert_prices(data["real_data"]["prices"], symbol)
-                            if data["success"] and self.ARBITRAGE_SUCCESS:
-                                self.db_handler.insert_success_data(data["real_data"])
-
-                                message = f"Arbitrage Opportunity Found!\nSymbol: {symbol}\nMin Price: {data['real_data']['min_price']}\nMax Price: {data['real_data']['max_price']}\nMin Exchange: {data['real_data']['min_exchange']}\nMax Exchange: {data['real_data']['max_exchange']}\nArbitrage Percentage: {round(data['real_data']['arbitrage_percentage'],3)}%\nDatetime: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                                if self.DISCORD_STATUS:
-                                    res = self.noti_handler.discord_send_message(str(message))
-                                    if res != True:
-                                        logging.error(f"Discord message failed for {symbol}")
-                                if self.TELEGRAM_STATUS:
-                                    res = self.noti_handler.telegram_send_message(str(message))
-                                    if res != True:
-                                        logging.error(f"Telegram message failed for {symbol}")
-                        n+=1
+                        self.handle_result(symbol, data)
                     except Exception as e:
                         logging.error(f"{e} - {symbol}")
-                time.sleep(self.TIMER_INTERVAL)
+                self.end_cycle(time.perf_counter() - cycle_start)
+                self.quotes.evict()
             except Exception as e:
-                logging.error(f"{e} - {symbol}")
+                # Not per symbol: fetching and evaluating fail for the cycle's symbols as a whole.
+                logging.error(f"Arbitrage cycle failed: {e}")
+        self.drain()
+
+    def end_cycle(self, cycle_seconds=None, store=True):
+        """
+        Ends a cycle: flushes the queued inserts and sends the queued alerts as one message.
+
+        Args:
+            cycle_seconds (float): Duration of the cycle, recorded in the cycle metric.
+            store (bool): Whether to flush the queued inserts now; the stream mode flushes them every TIMER_INTERVAL.
+        """
+        if store:
+            self.writer.end_cycle()
+        self.dispatcher.end_cycle()
+        if cycle_seconds is not None:
+            metrics.histogram("arbitrage_cycle_seconds").observe(cycle_seconds)
+
+    def drain(self):
+        """
+        Waits until the queued inserts are written and the queued alerts are sent.
+        """
+        self.writer.drain()
+        self.dispatcher.drain()
       
+    def get_stream_urls(self):
+        """
+        Returns the WebSocket URLs of the enabled exchanges listed in [Stream Endpoints].
+
+        :return: A dictionary of WebSocket URLs, keyed by exchange name
+        """
+        return self.STREAM_URLS
+
+    def arbitrage_stream(self):
+        """
+        Streams quotes from the exchanges' WebSocket feeds and checks a symbol for arbitrage whenever one of its quotes changes.
+        A config reload keeps the connections of the feeds whose URL is unchanged and subscribes added symbols on them.
+        """
+        evaluator = self.create_evaluator()
+        last_flush = time.monotonic()
+
+        def on_update(symbol, exchange, price):
+            nonlocal last_flush
+            with metrics.timed("arbitrage_evaluate_seconds", engine="stream"):
+                evaluator.update_symbol(symbol, self.quotes.snapshot(symbol, stream.stream_urls))
+                result = evaluator.evaluate(symbol)
+            self.handle_result(symbol, result)
+            store = time.monotonic() - last_flush >= self.TIMER_INTERVAL
+            self.end_cycle(store=store)
+            if store:
+                last_flush = time.monotonic()
+                self.quotes.evict()
+
+        def on_idle():
+            if self.take_reload():
+                evaluator.reconfigure(self.symbol_thresholds(), self.fees, self.get_stream_urls())
+                stream.update(self.get_stream_urls(), self.SYMBOLS)
+
+        stream = QuoteStream(self.get_stream_urls(), self.SYMBOLS, on_update, quotes=self.quotes)
+        print("SYMBOLS : ", self.SYMBOLS)
+        print("STREAMS : ", list(stream.stream_urls.keys()))
+        try:
+            asyncio.run(stream.run(lambda: not self.thread_start, on_idle))
+        except Exception as e:
+            logging.error(f"Quote stream stopped: {e}")
+        self.drain()
+
+    def arbitrage_sharded(self):
+        """
+        Splits SYMBOLS over SHARDS worker processes that fetch and evaluate their own symbols in the configured
+        FETCH_MODE. This process merges their results and stays the only one storing and notifying.
+        A config reload re-splits the symbols and hands them to the running workers.
+        """
+        shards = split_symbols(self.SYMBOLS, self.SHARDS, self.symbol_intervals())
+        # One worker per configured shard, so a reload that adds symbols has somewhere to put them.
+        pool = ShardPool(run_shard, shards + [[] for _ in range(self.SHARDS - len(shards))], self.config)
+        metrics.gauge("arbitrage_queue_depth").set_function(pool.queue_depth, queue="shards")
+        pool.start()
+        print("SYMBOLS : ", self.SYMBOLS)
+        print("SHARDS : ", [len(symbols) for symbols in shards])
+        try:
+            while self.thread_start:
+                if self.take_reload():
+                    pool.reconfigure(self.config, split_symbols(self.SYMBOLS, self.SHARDS, self.symbol_intervals()))
+                self.merge_batches(pool.get_batches())
+        finally:
+            self.merge_batches(pool.stop())
+        self.drain()
+
+    def merge_batches(self, batches):
+        """
+        Stores and notifies the results of shard batches, sending the opportunities of all of them as one cycle.
+
+        Args:
+            batches (list): (shard, results, cycle seconds, store) tuples sent by arbitrage_shard.end_cycle.
+        """
+        if not batches:
+            return
+        store = False
+        for shard, results, cycle_seconds, flush in batches:
+            for symbol, data in results:
+                try :
+                    self.handle_result(symbol, data)
+                except Exception as e:
+                    logging.error(f"{e} - {symbol}")
+            if cycle_seconds is not None:
+                metrics.histogram("arbitrage_cycle_seconds").observe(cycle_seconds, shard=str(shard))
+            store = store or flush
+        self.end_cycle(store=store)
+
+    def run(self):
+        """
+        Runs the arbitrage check in the configured FETCH_MODE until thread_start is cleared, sharded over SHARDS processes if above 1.
+        """
+        if self.SHARDS > 1:
+            self.arbitrage_sharded()
+        elif self.FETCH_MODE == "stream":
+            self.arbitrage_stream()
+        else:
+            self.arbitrage_check()
+
     def get_arbitrage_data(self,json_file):
         """
         Fetches arbitrage data from the database.
@@ -134,12 +482,106 @@ class arbitrage_main:
             json_file (str): The JSON file to fetch data from.
         """
         try:
+            self.writer.drain()
             data = self.db_handler.fetch_all_data(json_file)
             return data
         except Exception as e:
             logging.error(f"Error fetching data: {e}")
             return None
 
+    def query_arbitrage_data(self, json_file, count=10, offset=0, **filters):
+        """
+        Fetches the newest matching records through the storage backend's index, without loading the whole log.
+        Args:
+            json_file (str): "arbitrage", "success" or "prices".
+            count (int): Number of records.
+            offset (int): Number of newer matching records to skip, for paging. Ignored for prices.
+            **filters: symbol, buy_exchange, sell_exchange, start, end and min_spread. Ignored for prices.
+        Returns:
+            list: The records, newest first.
+        """
+        try:
+            self.writer.drain()
+            if json_file == "prices":
+                return self.db_handler.tail("prices", count)
+            return self.db_handler.query(json_file, limit=count, offset=offset, **filters)
+        except Exception as e:
+            logging.error(f"Error fetching data: {e}")
+            return None
+
+class arbitrage_shard(arbitrage_main):
+    """
+    Fetches and evaluates one shard of the symbols inside a worker process started by arbitrage_main.arbitrage_sharded.
+    Results are sent to the coordinating process instead of being stored or notified here.
+    """
+    def __init__(self, config, shard, shards, symbols, results, stop_event, control):
+        """
+        Initializes the arbitrage_shard class.
+
+        Args:
+            config (ConfigParser): The coordinator's settings.
+            shard (int): Number of this shard.
+            shards (int): Number of shards; every shard gets an equal share of each exchange's rate limit.
+            symbols (list): The symbols of this shard.
+            results (Queue): Where result batches are sent.
+            stop_event (Event): Set by the coordinator to stop the shard.
+            control (Queue): Where the coordinator sends new (config, symbols) after a reload.
+        """
+        self.config = config
+        self.shard = shard
+        self.shard_symbols = symbols
+        self.results = results
+        self.stop_event = stop_event
+        self.control = control
+        self.batch = []
+        self.quotes = QuoteCache.from_config(self.config)
+        self.fetch_engine = FetchEngine.from_config(self.config, self.quotes)
+        self.fees = FeeTable.from_config(self.config)
+        self.budget_share = 1 / shards
+        self.budget = RateBudget.from_config(self.config, share=self.budget_share)
+        self.config_setup()
+
+    def config_setup(self):
+        super().config_setup()
+        thresholds = dict(zip(self.SYMBOLS, self.ARBITRAGE_THRESHOLD))
+        self.SYMBOLS = self.shard_symbols
+        self.ARBITRAGE_THRESHOLD = [thresholds[symbol] for symbol in self.SYMBOLS]
+        self.SHARDS = 1
+
+    @property
+    def thread_start(self):
+        return not self.stop_event.is_set()
+
+    def reload_pending(self):
+        return not self.control.empty()
+
+    def take_reload(self):
+        try:
+            config, self.shard_symbols = self.control.get_nowait()
+        except queue.Empty:
+            return False
+        return self.reload_config(config)
+
+    def handle_result(self, symbol, data):
+        if data["valid_price"]:
+            self.batch.append((symbol, data))
+
+    def end_cycle(self, cycle_seconds=None, store=True):
+        if self.batch or cycle_seconds is not None or store:
+            self.results.put((self.shard, self.batch, cycle_seconds, store))
+            self.batch = []
+
+    def drain(self):
+        pass
+
+def run_shard(shard, shards, symbols, config, results, stop_event, control):
+    """
+    Entry point of a shard worker process.
+    """
+    os.makedirs('logs', exist_ok=True)
+    logging.basicConfig(filename=os.path.join('logs', 'arbitrage.log'), level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+    arbitrage_shard(config, shard, shards, symbols, results, stop_event, control).run()
+
 
 if __name__ == "__main__":
     main = arbitrage_main()
@@ -163,12 +605,17 @@ if __name__ == "__main__":
                     print("Arbitrage check is already running.")
                 else:
                     main.thread_start = True
-                    th = Thread(target=main.arbitrage_check)
+                    th = Thread(target=main.run)
                     th.start()
                     print("Arbitrage check started...")
 
             elif choice == "2":
                 print(f"Thread Status: {'Running' if main.thread_start else 'Stopped'}")
+                for host, stats in get_session_pool().stats().items():
+                    print(f"  {host}: {stats['requests']} requests over {stats['connections']} connections ({stats['reused']} reused)")
+                for exchange, (state, p95, timeout) in main.fetch_engine.health.status().items():
+                    print(f"  {exchange}: circuit {state}, p95 {f'{p95 * 1000:.0f} ms' if p95 is not None else 'n/a'}, timeout {timeout:.2f} s")
+                print(f"  {main.metrics_server.summary()}")
                 if main.thread_start:
                     choice_THREAD = input("Do you want to stop the arbitrage check? (y/n): ").strip().lower()
                     if choice_THREAD == "y":
@@ -179,9 +626,26 @@ if __name__ == "__main__":
                         print("Arbitrage check stopped.")
 
             elif choice == "3":
-                print("\n----- Data Menu -----\n1 - Arbitrage Opportunities\n2 - Successful Arbitrage Logs\n3 - Price Logs")
+                print("\n----- Data Menu -----\n1 - Arbitrage Opportunities\n2 - Successful Arbitrage Logs\n3 - Price Logs\n4 - Latest Quotes\n5 - Spread Statistics")
                 choice_DATA = input("Enter your choice: ").strip()
 
+                if choice_DATA == "4":
+                    print("\n--- Latest Quotes ---")
+                    for symbol in main.SYMBOLS:
+                        for exchange, entry in sorted(main.quotes.quotes(symbol).items()):
+                            age = main.quotes.age(entry)
+                            stale = " (stale)" if entry.quote.stale or age > main.quotes.max_age(exchange, entry.source) else ""
+                            print(f"  {symbol} {exchange}: bid {entry.quote.bid} ask {entry.quote.ask}, {age:.1f} s old via {entry.source}{stale}")
+                    print("--- End of data. ---")
+                    continue
+
+                if choice_DATA == "5":
+                    print(f"\n--- Spread Statistics ({main.spread_stats.mode} alerts) ---")
+                    for symbol, buy, sell, samples, mean, std, p50, p95, z in main.spread_stats.summary():
+                        print(f"  {symbol} {buy} -> {sell}: {samples} samples, mean {mean:.3f}% std {std:.3f}, p50 {p50:.3f}% p95 {p95:.3f}%, last z {z:.2f}")
+                    print("--- End of data. ---")
+                    continue
+
                 json_map = {"1": "arbitrage", "2": "success", "3": "prices"}
                 json_file = json_map.get(choice_DATA)
                 try :
@@ -190,20 +654,31 @@ if __name__ == "__main__":
                     count_input = 10
                 
                 if json_file:
-                    data = main.get_arbitrage_data(json_file)
-                    if data:
-                        if count_input > len(data.items()) :
-                            count_input = len(data.items())
+                    filters = {}
+                    if json_file != "prices":
+                        symbol_input = input("Filter by symbol (leave empty for all): ").strip().upper()
+                        if symbol_input:
+                            filters["symbol"] = symbol_input
+                        try :
+                            filters["min_spread"] = float(input("Minimum spread % (leave empty for any): ").strip())
+                        except ValueError:
+                            pass
+                    offset = 0
+                    while True:
+                        data = main.query_arbitrage_data(json_file, count_input, offset, **filters)
+                        if not data:
+                            print("\nNo data found." if offset == 0 else "\nNo older records.")
+                            break
                         print(f"\n--- {json_file.capitalize()} Data ---")
                         
-                        for key, value in list(data.items())[-count_input:]:
+                        for value in reversed(data):
                             print(value)
                             
-                        print("--- End of data. ---")                       
-                        print(f"\nTotal records: {len(data.items())}")
-                        print(f"Showing last {count_input} records.")
-                    else:
-                        print("\nNo data found.")
+                        print("--- End of data. ---")
+                        print(f"Showing records {offset + 1}-{offset + len(data)}, newest last.")
+                        offset += len(data)
+                        if json_file == "prices" or len(data) < count_input or input("Show older records? (y/n): ").strip().lower() != "y":
+                            break
                 else:
                     print("Invalid data choice.")
 
@@ -217,13 +692,29 @@ if __name__ == "__main__":
                 for symbol in main.SYMBOLS:
                     api_urls = main.get_api_urls(symbol)
                     print(f"  {symbol}: {list(api_urls.keys())}")
+                if input("Reload config.ini now? (y/n): ").strip().lower() == "y":
+                    if main.thread_start:
+                        main.request_reload()
+                        print("Reload requested; it applies before the next cycle.")
+                    elif main.reload_config():
+                        print("Config reloaded.")
+                    else:
+                        print("Config reload failed; see logs/arbitrage.log.")
 
             elif choice == "5":
                 print("Exiting program...")
+                if main.thread_start:
+                    main.thread_start = False
+                    th.join()
+                main.close()
                 break
 
             else:
                 print("Invalid choice. Please select a valid option.")
 
     except KeyboardInterrupt:
-        logging.info("Program terminated by user.")
\ No newline at end of file
+        logging.info("Program terminated by user.")
+        if main.thread_start:
+            main.thread_start = False
+            th.join()
+        main.close()
\ No newline at end of file
@@ -0,0 +1,63 @@
+# -*- coding: UTF-8 -*-
+"""
+Replays the recorded price log (PRICES_SAVE) through the arbitrage check and reports how many
+opportunities and alerts each threshold would have produced.
+
+    python replay.py --thresholds 0.05,0.1,0.2,0.5
+    python replay.py --threshold BTC-USDT=0.02,0.05 --threshold ETH-USDT=0.1 --target-alerts 20
+    python replay.py --file database/prices.jsonl --cooldown 0
+"""
+import time, argparse
+from config import read_config
+from core import FeeTable, NO_FEES, ReplayEngine, iter_price_log, create_data_handler
+
+def parse_thresholds(text):
+    return [float(value) for value in text.replace(' ', '').split(',') if value]
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded prices against alternative arbitrage thresholds.")
+    parser.add_argument("--file", help="prices .jsonl or .json file; defaults to the configured backend's price log")
+    parser.add_argument("--thresholds", help="comma-separated thresholds to try for every symbol")
+    parser.add_argument("--threshold", action="append", default=[], metavar="SYMBOL=T1,T2",
+                        help="thresholds to try for one symbol; may be repeated")
+    parser.add_argument("--cooldown", type=float, help="seconds between alerts for the same opportunity (default ALERT_COOLDOWN)")
+    parser.add_argument("--no-fees", action="store_true", help="compare raw prices instead of prices net of fees")
+    parser.add_argument("--target-alerts", type=int, help="suggest the lowest threshold per symbol with at most this many alerts")
+    args = parser.parse_args()
+
+    config = read_config()
+    symbols = config.get('Arbitrage Settings', 'SYMBOLS').replace(' ', '').split(',')
+    configured = dict(zip(symbols, parse_thresholds(config.get('Arbitrage Settings', 'ARBITRAGE_THRESHOLD'))))
+    grid = parse_thresholds(args.thresholds) if args.thresholds else []
+    thresholds = {symbol: grid + [threshold] for symbol, threshold in configured.items()}
+    for item in args.threshold:
+        symbol, _, values = item.partition("=")
+        thresholds[symbol] = parse_thresholds(values)
+    cooldown = args.cooldown if args.cooldown is not None else config.getfloat('Arbitrage Settings', 'ALERT_COOLDOWN', fallback=300.0)
+
+    if args.file:
+        records = iter_price_log(args.file)
+    else:
+        db_handler = create_data_handler()
+        db_handler.create_files()
+        records = db_handler.iter_records("prices")
+
+    engine = ReplayEngine(thresholds, NO_FEES if args.no_fees else FeeTable.from_config(config), cooldown, default_thresholds=grid or None)
+    start = time.perf_counter()
+    report = engine.run(records)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{'Symbol':<14}{'Threshold':>10}{'Opportunities':>15}{'Alerts':>10}")
+    for symbol, rows in report.items():
+        for threshold, opportunities, alerts in rows:
+            marker = " *" if configured.get(symbol) == threshold else ""
+            print(f"{symbol:<14}{threshold:>10g}{opportunities:>15}{alerts:>10}{marker}")
+        if args.target_alerts is not None:
+            suggested = next((threshold for threshold, _, alerts in rows if alerts <= args.target_alerts), None)
+            print(f"{'':<14}suggested threshold for at most {args.target_alerts} alerts: {suggested if suggested is not None else 'none in range'}")
+    print(f"\n* configured ARBITRAGE_THRESHOLD, alerts with a {cooldown:g} s cooldown")
+    rate = engine.snapshots / elapsed * 60 if elapsed > 0 else 0.0
+    print(f"Replayed {engine.snapshots} snapshots ({engine.skipped} skipped) in {elapsed:.2f} s, {rate:,.0f} snapshots/min.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import configparser
+import pytest
+from config import read_config
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """
+    A copy of config.ini that keeps the database and logs in tmp_path and serves no metrics endpoint.
+    """
+    monkeypatch.chdir(tmp_path)
+    config = configparser.ConfigParser()
+    config.read_dict(read_config())
+    config.set('Database', 'MAIN_FOLDER', str(tmp_path / "database"))
+    config.set('Metrics', 'ENABLED', '0')
+    return config
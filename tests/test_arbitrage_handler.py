@@ -0,0 +1,39 @@
+import pytest
+from core import IncrementalEvaluator, check_arbitrage
+from main import arbitrage_main
+
+def test_check_arbitrage_ignores_stale_legs():
+    result = check_arbitrage({"Binance": (100.0, 100.1), "OKX": (101.0, 101.1), "Mexc": (110.0, 110.1, True)}, 0.5)
+    assert result["success"]
+    assert (result["real_data"]["min_exchange"], result["real_data"]["max_exchange"]) == ("Binance", "OKX")
+
+def test_evaluate_dirty_keeps_other_symbols_when_one_fails():
+    evaluator = IncrementalEvaluator({"ETH-USDT": 0.5})
+    for symbol in ("ETH-USDT", "XRP-USDT"):
+        evaluator.update_symbol(symbol, {"Binance": (100.0, 100.1), "OKX": (101.0, 101.1)})
+    results = dict(evaluator.evaluate_dirty())
+    assert list(results) == ["ETH-USDT"]
+    assert results["ETH-USDT"]["success"]
+    assert not evaluator.dirty
+
+def test_config_setup_rejects_threshold_count_mismatch(config):
+    config.set('Arbitrage Settings', 'SYMBOLS', 'ETH-USDT,BTC-USDT,XRP-USDT')
+    config.set('Arbitrage Settings', 'ARBITRAGE_THRESHOLD', '0.5,1.0')
+    bot = arbitrage_main.__new__(arbitrage_main)
+    bot.config = config
+    with pytest.raises(ValueError):
+        bot.config_setup()
+
+def test_reload_keeps_settings_on_threshold_count_mismatch(config):
+    config.set('Arbitrage Settings', 'SYMBOLS', 'ETH-USDT,BTC-USDT')
+    config.set('Arbitrage Settings', 'ARBITRAGE_THRESHOLD', '0.5,1.0')
+    bot = arbitrage_main(config)
+    try:
+        broken = type(config)()
+        broken.read_dict(config)
+        broken.set('Arbitrage Settings', 'SYMBOLS', 'ETH-USDT,BTC-USDT,XRP-USDT')
+        assert not bot.reload_config(broken)
+        assert bot.SYMBOLS == ['ETH-USDT', 'BTC-USDT']
+        assert bot.symbol_thresholds() == {'ETH-USDT': 0.5, 'BTC-USDT': 1.0}
+    finally:
+        bot.close()
@@ -0,0 +1,103 @@
+import time, threading
+import pytest
+from core import PersistenceWriter
+
+class RecordingHandler:
+    """
+    Collects the inserted records, taking delay seconds per insert, or waiting for the release event,
+    to let the queue fill up.
+    """
+    def __init__(self, delay=0.0, release=None):
+        self.delay = delay
+        self.release = release
+        self.records = []
+        self.flushes = 0
+        self.closed = False
+
+    def insert_data(self, data, timestamp=None):
+        time.sleep(self.delay)
+        if self.release is not None:
+            self.release.wait()
+        self.records.append(data["n"])
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        self.closed = True
+
+def close_within(writer, seconds=5):
+    thread = threading.Thread(target=writer.close, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    return not thread.is_alive()
+
+def test_block_writes_every_record_in_order():
+    handler = RecordingHandler()
+    writer = PersistenceWriter(handler, max_queue=2, policy="block")
+    for n in range(20):
+        writer.insert_data({"n": n})
+    assert close_within(writer)
+    assert handler.records == list(range(20))
+    assert handler.closed
+
+def wait_for_depth(writer, depth):
+    while writer.queue_depth() != depth:
+        time.sleep(0.001)
+
+def test_drop_oldest_discards_the_oldest_records():
+    handler = RecordingHandler(delay=0.005)
+    writer = PersistenceWriter(handler, max_queue=3, policy="drop_oldest")
+    for n in range(60):
+        writer.insert_data({"n": n})
+        if n % 4 == 0:
+            writer.end_cycle()
+    writer.drain()
+    assert close_within(writer)
+    assert writer.dropped > 0
+    assert len(handler.records) + writer.dropped == 60
+    assert handler.records == sorted(handler.records)
+    assert handler.records[-1] == 59
+
+def test_drop_oldest_never_evicts_the_stop_marker():
+    release = threading.Event()
+    handler = RecordingHandler(release=release)
+    writer = PersistenceWriter(handler, max_queue=2, policy="drop_oldest")
+    writer.insert_data({"n": 0})
+    wait_for_depth(writer, 0)
+    closer = threading.Thread(target=writer.close, daemon=True)
+    closer.start()
+    wait_for_depth(writer, 1)
+    writer.insert_data({"n": 1})
+    writer.insert_data({"n": 2})
+    release.set()
+    closer.join(5)
+    assert not closer.is_alive()
+    assert handler.records == [0, 2]
+    assert writer.dropped == 1
+
+def test_drop_oldest_waits_when_only_markers_are_queued():
+    handler = RecordingHandler(delay=0.05)
+    writer = PersistenceWriter(handler, max_queue=2, policy="drop_oldest")
+    writer.insert_data({"n": 0})
+    writer.end_cycle()
+    writer.end_cycle()
+    writer.insert_data({"n": 1})
+    assert close_within(writer)
+    assert handler.records == [0, 1]
+    assert writer.dropped == 0
+
+def test_spill_replays_every_record(tmp_path):
+    handler = RecordingHandler(delay=0.002)
+    writer = PersistenceWriter(handler, max_queue=2, policy="spill", spill_path=str(tmp_path / "spill.jsonl"))
+    for n in range(30):
+        writer.insert_data({"n": n})
+    writer.drain()
+    assert close_within(writer)
+    assert writer.spilled > 0
+    assert sorted(handler.records) == list(range(30))
+    assert not (tmp_path / "spill.jsonl").exists()
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        PersistenceWriter(RecordingHandler(), policy="drop_newest")
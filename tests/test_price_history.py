@@ -0,0 +1,45 @@
+import os, datetime
+import pytest
+from core.price_history import PriceHistoryStore
+
+BASE = datetime.datetime(2024, 1, 1, 10, 0, 0)
+
+def timestamp(second):
+    return (BASE + datetime.timedelta(seconds=second)).strftime("%Y-%m-%d %H:%M:%S")
+
+def insert(store, seconds, exchange="Binance"):
+    for second in seconds:
+        store.insert_prices({exchange: [float(second), float(second) + 0.5]}, "ETH-USDT", timestamp(second))
+    store.flush()
+
+def query_bids(store, start, end):
+    time, bid, ask = store.query("ETH-USDT", ["Binance"], start=BASE.timestamp() + start, end=BASE.timestamp() + end)["Binance"]
+    assert list(time - BASE.timestamp()) == list(bid)
+    return sorted(bid.tolist())
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceHistoryStore(str(tmp_path / "history"))
+
+def test_range_in_order(store):
+    insert(store, range(1, 9))
+    assert query_bids(store, 2, 5) == [2, 3, 4]
+
+def test_range_after_out_of_order_append(store):
+    insert(store, [4, 5, 6, 7])
+    insert(store, [1, 2, 3, 4, 2])
+    assert query_bids(store, 2, 5) == [2, 2, 3, 4, 4]
+
+def test_range_once_a_chunk_turns_unordered(store):
+    insert(store, [1, 2, 3])
+    assert query_bids(store, 2, 5) == [2, 3]
+    insert(store, [4, 2])
+    assert query_bids(store, 2, 5) == [2, 2, 3, 4]
+
+def test_columns_realigned_after_torn_write(store):
+    insert(store, [1, 2])
+    chunk = store.chunks("ETH-USDT", "Binance")[0]
+    with open(os.path.join(store.folder, "ETH-USDT", "Binance", f"{chunk}.bid"), 'ab') as f:
+        f.write(b"\x00" * 12)
+    insert(store, [3])
+    assert query_bids(store, 0, 10) == [1, 2, 3]
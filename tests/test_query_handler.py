@@ -0,0 +1,48 @@
+import pytest
+from core.data_handler_JSONL import JsonlDataHandler
+
+def insert(handler, seconds, symbol="ETH-USDT"):
+    for second in seconds:
+        handler.insert_data({"symbol": symbol, "min_price": 100.0, "min_exchange": "Binance", "max_price": 101.0,
+                             "max_exchange": "OKX", "arbitrage_percentage": float(second)},
+                            timestamp=f"2024-01-01 00:00:{second:02d}")
+
+def spreads(records):
+    return sorted(record["arbitrage_percentage"] for record in records)
+
+@pytest.fixture
+def handler(config):
+    handler = JsonlDataHandler(config)
+    handler.create_files()
+    yield handler
+    handler.close()
+
+def test_time_range_in_order(handler):
+    insert(handler, range(1, 7))
+    records = handler.query("arbitrage", start="2024-01-01 00:00:02", end="2024-01-01 00:00:05", limit=None)
+    assert spreads(records) == [2, 3, 4]
+
+def test_time_range_after_out_of_order_append(handler):
+    insert(handler, [4, 5, 6])
+    insert(handler, [1, 2, 3])
+    records = handler.query("arbitrage", start="2024-01-01 00:00:02", end="2024-01-01 00:00:05", limit=None)
+    assert spreads(records) == [2, 3, 4]
+
+def test_reopened_index_keeps_out_of_order_ranges(config):
+    handler = JsonlDataHandler(config)
+    handler.create_files()
+    insert(handler, [4, 5, 6, 1, 2, 3])
+    handler.close()
+    handler = JsonlDataHandler(config)
+    handler.create_files()
+    try:
+        records = handler.query("arbitrage", start="2024-01-01 00:00:02", end="2024-01-01 00:00:05", limit=None)
+        assert spreads(records) == [2, 3, 4]
+    finally:
+        handler.close()
+
+def test_offsets_match_multibyte_records(handler):
+    insert(handler, [1, 2], symbol="ÉTH-USDT")
+    insert(handler, [3])
+    assert [record["arbitrage_percentage"] for record in handler.tail("arbitrage", 3)] == [3, 2, 1]
+    assert spreads(handler.query("arbitrage", symbol="ÉTH-USDT")) == [1, 2]